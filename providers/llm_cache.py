@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de respostas do LLMClient.
+
+Por padrão só vale para chamadas determinísticas (temperature == 0): a
+mesma combinação (provider, model, messages, temperature, max_tokens)
+devolve o mesmo texto sem nova ida à rede nem custo de tokens. Com
+LLMClient(cache_sampled=True) o texto amostrado (temperature > 0) também é
+reaproveitado enquanto o TTL valer.
+
+Backends:
+- MemoryCacheBackend  -> dict em processo com TTL e limite LRU
+- DiskCacheBackend    -> diskcache (opcional), persiste entre execuções
+- FileCacheBackend    -> um JSON por chave num diretório, sem dependências
+
+cache_from_env() monta o FileCacheBackend dos relatórios a partir de
+LLM_CACHE_DIR / LLM_CACHE_TTL (TTL 0 desliga).
+
+Uso típico:
+    from providers.llm_cache import DiskCacheBackend
+    from providers.llm_client import LLMClient
+
+    llm = LLMClient(cache=DiskCacheBackend())
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+try:
+    import diskcache
+except Exception:  # pragma: no cover
+    diskcache = None
+
+
+DEFAULT_TTL = 86400  # 1 dia
+REPORT_CACHE_TTL = 21600  # 6h: cobre reruns do job no mesmo dia
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """sha256 estável da requisição (json com sort_keys)."""
+    raw = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl: int = DEFAULT_TTL) -> None:
+        ...
+
+
+class MemoryCacheBackend:
+    """Cache em memória (LRU + TTL). Vale apenas para o processo atual."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int = DEFAULT_TTL) -> None:
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class DiskCacheBackend:
+    """Cache persistente em disco via 'diskcache' (padrão: ~/.cache/llm_client)."""
+
+    def __init__(self, directory: str = "~/.cache/llm_client"):
+        if diskcache is None:
+            raise RuntimeError("Biblioteca 'diskcache' não instalada.")
+        self._cache = diskcache.Cache(os.path.expanduser(directory))
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, ttl: int = DEFAULT_TTL) -> None:
+        self._cache.set(key, value, expire=ttl)
+
+
+class FileCacheBackend:
+    """
+    Cache persistente em arquivos JSON (<directory>/<chave>.json com o valor e
+    o instante de expiração). Gravação em temporário + os.replace, então
+    execuções simultâneas nunca leem um JSON pela metade.
+    """
+
+    def __init__(self, directory: str = "~/.cache/llm_client/files"):
+        self.directory = os.path.expanduser(directory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item.get("expires_at", 0) < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return item.get("value")
+
+    def set(self, key: str, value: str, ttl: int = DEFAULT_TTL) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": time.time() + ttl, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[llm_cache] não foi possível gravar {path}: {e}")
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def cache_from_env() -> Tuple[Optional[FileCacheBackend], int]:
+    """
+    (backend, ttl) para os relatórios: LLM_CACHE_DIR (padrão
+    ~/.cache/llm_client/files) e LLM_CACHE_TTL em segundos (padrão 6h).
+    LLM_CACHE_TTL=0 desliga: devolve (None, 0).
+    """
+    ttl = int(os.environ.get("LLM_CACHE_TTL", REPORT_CACHE_TTL))
+    if ttl <= 0:
+        return None, 0
+    return FileCacheBackend(os.environ.get("LLM_CACHE_DIR", "~/.cache/llm_client/files")), ttl
@@ -17,31 +17,178 @@ Uso típico:
         temperature=0.3,
         max_tokens=1600,
     )
+
+Prompt caching no provider (OpenAI/DeepSeek reaproveitam prefixos idênticos):
+    mantenha system_prompt e o cabeçalho do user fixos (sem data/hora/run-id)
+    e passe os dados do dia por último, em user_dynamic:
+
+    texto = llm.generate(SYSTEM, HEADER_FIXO, user_dynamic=contexto_do_dia)
+
+Streaming (texto chega em pedaços, antes do fim da geração):
+    for pedaco in llm.generate_stream(system_prompt, user_prompt):
+        print(pedaco, end="", flush=True)
+
+Uso assíncrono (várias chamadas multiplexadas via HTTP/2):
+    async with LLMClient() as llm:
+        textos = await llm.gather_many([(sys1, user1), (sys2, user2)])
 """
 
 import os
+import sys
 import json
 import time
-from typing import List, Dict, Any, Optional
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from providers.llm_cache import CacheBackend, DEFAULT_TTL, make_cache_key
+
+
+# Imports pesados/opcionais (requests, groq, openai, httpx) ficam adiados para
+# o primeiro uso: importar este módulo não paga o custo dos SDKs. Depois da
+# primeira chamada o Python devolve o módulo já carregado de sys.modules.
+def _load_groq():
+    try:
+        from groq import Groq
+    except Exception:  # pragma: no cover
+        return None
+    return Groq
+
+
+def _load_openai():
+    try:
+        from openai import OpenAI as OpenAIClient
+    except Exception:  # pragma: no cover
+        return None
+    return OpenAIClient
+
+
+def _load_httpx():
+    try:
+        import httpx
+    except Exception:  # pragma: no cover
+        return None
+    return httpx
+
+
+T = TypeVar("T")
+
+# status HTTP transitórios: vale repetir no mesmo provider antes do fallback
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+RETRY_AFTER_MAX = 60.0
 
-import requests
+# circuit breaker: após N falhas seguidas o provider fica "aberto" (pulado)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
 
-# Imports opcionais (só usados se as libs estiverem instaladas)
-try:
-    from groq import Groq
-except Exception:  # pragma: no cover
-    Groq = None
+# estado do breaker por provider, compartilhado por todos os LLMClient do
+# processo (cada relatório cria o seu; por instância o limite nunca era
+# atingido) e protegido por lock (generate_many chama de várias threads)
+_BREAKERS: Dict[str, Dict[str, float]] = {}
+_BREAKER_LOCK = threading.Lock()
 
-try:
-    from openai import OpenAI as OpenAIClient
-except Exception:  # pragma: no cover
-    OpenAIClient = None
+
+def _is_sdk_connection_error(exc: Exception) -> bool:
+    # os SDKs (groq/openai) embrulham falhas de rede em APIConnectionError
+    # (APITimeoutError é subclasse): sem status nem response, e não são
+    # erros do requests/httpx. Como os clientes usam max_retries=0, quem
+    # repete é o _with_retry.
+    for name in ("openai", "groq"):
+        mod = sys.modules.get(name)
+        err = getattr(mod, "APIConnectionError", None) if mod is not None else None
+        if isinstance(err, type) and isinstance(exc, err):
+            return True
+    return False
+
+
+def _retry_delay(exc: Exception, attempt: int, base: float, cap: float) -> Optional[float]:
+    """
+    Decide se `exc` é transitório. Retorna quantos segundos esperar antes da
+    próxima tentativa (backoff exponencial com full jitter, ou Retry-After),
+    ou None se o erro não deve ser repetido (ex.: 400, 401).
+    """
+    status = None
+    response = getattr(exc, "response", None)
+    if response is not None:
+        status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(exc, "status_code", None)
+
+    if status is not None:
+        if status not in RETRY_STATUS:
+            return None
+        retry_after = None
+        if response is not None and getattr(response, "headers", None) is not None:
+            retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), RETRY_AFTER_MAX)
+            except ValueError:
+                pass
+    else:
+        # só checa contra libs já carregadas: se não foram importadas, o erro
+        # não pode ter vindo delas
+        requests = sys.modules.get("requests")
+        httpx = sys.modules.get("httpx")
+        if requests is not None and isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            pass
+        elif httpx is not None and isinstance(exc, httpx.TransportError):
+            pass
+        elif _is_sdk_connection_error(exc):
+            pass
+        else:
+            return None
+
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _with_retry(
+    fn: Callable[[], T],
+    *,
+    attempts: int = 3,
+    base: float = 0.5,
+    cap: float = 4.0,
+) -> T:
+    """Executa fn() com até `attempts` tentativas para erros transitórios."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, base, cap)
+            if delay is None or attempt == attempts - 1:
+                raise
+            print(f"[LLMClient] Erro transitório ({e}); nova tentativa em {delay:.1f}s")
+            time.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+async def _awith_retry(
+    fn: Callable[[], Awaitable[T]],
+    *,
+    attempts: int = 3,
+    base: float = 0.5,
+    cap: float = 4.0,
+) -> T:
+    """Versão assíncrona de _with_retry (usa asyncio.sleep)."""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, base, cap)
+            if delay is None or attempt == attempts - 1:
+                raise
+            print(f"[LLMClient] Erro transitório ({e}); nova tentativa em {delay:.1f}s")
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
 
 
 class LLMClient:
     """
     Abstrai o uso de múltiplos provedores (PIAPI, Groq, OpenAI, DeepSeek)
-    com retry simples e fallback configurável via variáveis de ambiente.
+    com retry (backoff exponencial + jitter para erros transitórios) e
+    fallback configurável via variáveis de ambiente.
 
     Variáveis importantes:
       - LLM_PROVIDER          -> provider primário (piapi | groq | openai | deepseek)
@@ -50,9 +197,35 @@ class LLMClient:
       - GROQ_API_KEY, GROQ_MODEL
       - OPENAI_API_KEY, OPENAI_MODEL
       - DEEPSEEK_API_KEY, DEEPSEEK_MODEL
+      - LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT -> timeouts em segundos (padrão 5 / 45)
+      - LLM_MAX_CONCURRENCY   -> máximo de chamadas simultâneas em lote (padrão 8)
+
+    Cada provider tem um circuit breaker (no nível do módulo, comum a
+    todas as instâncias): após BREAKER_THRESHOLD falhas
+    seguidas ele é pulado por BREAKER_COOLDOWN segundos (depois disso uma
+    nova chamada funciona como sonda "half-open").
+
+    Cache opcional (providers.llm_cache): só é consultado quando
+    temperature == 0, a menos que cache_sampled=True (aí qualquer
+    temperature; o texto amostrado é reaproveitado até o TTL vencer);
+    contadores de hit/miss ficam em self.stats.
     """
 
-    def __init__(self, provider: Optional[str] = None):
+    # provider -> (variável de ambiente do modelo, modelo padrão)
+    _MODELS: Dict[str, Tuple[str, str]] = {
+        "piapi": ("PIAPI_MODEL", "gpt-4o-mini"),
+        "groq": ("GROQ_MODEL", "llama-3.1-70b-versatile"),
+        "openai": ("OPENAI_MODEL", "gpt-4o-mini"),
+        "deepseek": ("DEEPSEEK_MODEL", "deepseek-chat"),
+    }
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        cache: Optional[CacheBackend] = None,
+        cache_ttl: int = DEFAULT_TTL,
+        cache_sampled: bool = False,
+    ):
         self.env_provider = (provider or os.environ.get("LLM_PROVIDER") or "piapi").strip().lower()
 
         fallback_env = os.environ.get("LLM_FALLBACK_ORDER", "piapi,groq,openai,deepseek")
@@ -67,6 +240,65 @@ class LLMClient:
 
         self.active_provider: Optional[str] = None
 
+        # timeouts separados: conexão curta (endpoint morto falha rápido), leitura longa
+        self.connect_timeout = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.environ.get("LLM_READ_TIMEOUT", "45"))
+
+        # limite de chamadas simultâneas em generate_many/gather_many
+        self.max_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.cache_sampled = cache_sampled
+        self.stats: Dict[str, int] = {"cache_hits": 0, "cache_misses": 0}
+
+        # sessão HTTP reaproveitada (keep-alive) para os providers via REST,
+        # criada na primeira chamada REST (ver _get_session)
+        self._session = None
+        self._session_lock = threading.Lock()
+        # cliente assíncrono (HTTP/2), criado sob demanda em agenerate()
+        self._aclient = None
+
+    def __enter__(self) -> "LLMClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "LLMClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    def close(self) -> None:
+        """Fecha a sessão HTTP (libera conexões do pool)."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    session.mount(
+                        "https://",
+                        HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0),
+                    )
+                    self._session = session
+        return self._session
+
+    async def aclose(self) -> None:
+        """Fecha o cliente assíncrono (se criado) e a sessão HTTP."""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+        self.close()
+
     # ------------------------------------------------------------------ #
     # Interface pública
     # ------------------------------------------------------------------ #
@@ -76,20 +308,35 @@ class LLMClient:
         user_prompt: str,
         temperature: float = 0.3,
         max_tokens: int = 1600,
+        user_dynamic: Optional[str] = None,
     ) -> str:
         """
         Gera texto usando o provider principal + fallback.
 
+        user_dynamic (opcional): parte variável da mensagem do usuário
+        (contexto do dia, números). Vai no fim, depois de user_prompt, para
+        que system_prompt + user_prompt formem um prefixo estável que o
+        provider consegue reaproveitar do cache de prompt.
+
         Retorna:
           - texto (string)
         Lança RuntimeError se todos os providers falharem.
         """
+        user_prompt = self._compose_user(user_prompt, user_dynamic)
         last_error: Optional[Exception] = None
+        use_cache = self._use_cache(temperature)
+        if use_cache:
+            cached = self._cache_get(system_prompt, user_prompt, temperature, max_tokens)
+            if cached is not None:
+                return cached
 
         for provider in self.fallback_order:
             provider = provider.strip().lower()
             if not provider:
                 continue
+            if self._breaker_open(provider):
+                print(f"[LLMClient] Provider '{provider}' com circuit breaker aberto; pulando.")
+                continue
 
             try:
                 if provider == "piapi":
@@ -103,38 +350,321 @@ class LLMClient:
                 else:
                     continue
 
+                self._record_success(provider)
                 self.active_provider = provider
+                if use_cache:
+                    self._cache_set(provider, system_prompt, user_prompt, temperature, max_tokens, out)
                 return out
 
             except Exception as e:  # pragma: no cover
                 last_error = e
+                self._record_failure(provider)
                 print(f"[LLMClient] Erro ao usar provider '{provider}': {e}")
                 # tenta o próximo
 
         raise RuntimeError(f"Todos os providers falharam. Último erro: {last_error}")
 
+    def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.3,
+        max_tokens: int = 1600,
+        user_dynamic: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Como generate(), mas devolve um iterador com os pedaços do texto à
+        medida que o provider os envia (stream=True / SSE).
+
+        O fallback só acontece enquanto nenhum pedaço foi entregue: se o
+        stream cair no meio, o erro é propagado (o texto parcial já foi
+        consumido por quem chamou). Com cache e temperature == 0, um hit é
+        devolvido inteiro num único pedaço.
+        """
+        user_prompt = self._compose_user(user_prompt, user_dynamic)
+        last_error: Optional[Exception] = None
+        use_cache = self._use_cache(temperature)
+        if use_cache:
+            cached = self._cache_get(system_prompt, user_prompt, temperature, max_tokens)
+            if cached is not None:
+                yield cached
+                return
+
+        for provider in self.fallback_order:
+            provider = provider.strip().lower()
+            if not provider:
+                continue
+            if self._breaker_open(provider):
+                print(f"[LLMClient] Provider '{provider}' com circuit breaker aberto; pulando.")
+                continue
+
+            try:
+                if provider in self._REST_PROVIDERS:
+                    chunks = self._stream_rest(provider, system_prompt, user_prompt, temperature, max_tokens)
+                elif provider in ("groq", "openai"):
+                    chunks = self._stream_sdk(provider, system_prompt, user_prompt, temperature, max_tokens)
+                else:
+                    continue
+                # abre a conexão e lê o primeiro pedaço ainda dentro do fallback
+                first = next(chunks, None)
+            except Exception as e:  # pragma: no cover
+                last_error = e
+                self._record_failure(provider)
+                print(f"[LLMClient] Erro ao usar provider '{provider}': {e}")
+                continue
+
+            self.active_provider = provider
+            parts: List[str] = []
+            try:
+                if first is not None:
+                    parts.append(first)
+                    yield first
+                for chunk in chunks:
+                    parts.append(chunk)
+                    yield chunk
+            except GeneratorExit:
+                chunks.close()
+                raise
+            except Exception:
+                self._record_failure(provider)
+                raise
+
+            self._record_success(provider)
+            if use_cache:
+                self._cache_set(provider, system_prompt, user_prompt, temperature, max_tokens, "".join(parts))
+            return
+
+        raise RuntimeError(f"Todos os providers falharam. Último erro: {last_error}")
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.3,
+        max_tokens: int = 1600,
+        user_dynamic: Optional[str] = None,
+    ) -> str:
+        """
+        Versão assíncrona de generate(), com o mesmo fallback.
+
+        PIAPI/DeepSeek usam um httpx.AsyncClient (HTTP/2) compartilhado, de modo
+        que várias chamadas concorrentes multiplexam a mesma conexão TLS.
+        Groq/OpenAI (SDKs síncronos) rodam em thread via asyncio.to_thread.
+        """
+        user_prompt = self._compose_user(user_prompt, user_dynamic)
+        last_error: Optional[Exception] = None
+        use_cache = self._use_cache(temperature)
+        if use_cache:
+            cached = self._cache_get(system_prompt, user_prompt, temperature, max_tokens)
+            if cached is not None:
+                return cached
+
+        for provider in self.fallback_order:
+            provider = provider.strip().lower()
+            if not provider:
+                continue
+            if self._breaker_open(provider):
+                print(f"[LLMClient] Provider '{provider}' com circuit breaker aberto; pulando.")
+                continue
+
+            try:
+                if provider == "piapi":
+                    out = await self._acall_piapi(system_prompt, user_prompt, temperature, max_tokens)
+                elif provider == "groq":
+                    out = await asyncio.to_thread(
+                        self._call_groq, system_prompt, user_prompt, temperature, max_tokens
+                    )
+                elif provider == "openai":
+                    out = await asyncio.to_thread(
+                        self._call_openai, system_prompt, user_prompt, temperature, max_tokens
+                    )
+                elif provider == "deepseek":
+                    out = await self._acall_deepseek(system_prompt, user_prompt, temperature, max_tokens)
+                else:
+                    continue
+
+                self._record_success(provider)
+                self.active_provider = provider
+                if use_cache:
+                    self._cache_set(provider, system_prompt, user_prompt, temperature, max_tokens, out)
+                return out
+
+            except Exception as e:  # pragma: no cover
+                last_error = e
+                self._record_failure(provider)
+                print(f"[LLMClient] Erro ao usar provider '{provider}': {e}")
+
+        raise RuntimeError(f"Todos os providers falharam. Último erro: {last_error}")
+
+    def generate_many(
+        self,
+        prompts: Sequence[Tuple[str, ...]],
+        temperature: float = 0.3,
+        max_tokens: int = 1600,
+        max_concurrency: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Versão síncrona em lote: executa generate() para cada par
+        (system_prompt, user_prompt) — ou trio com user_dynamic — num
+        ThreadPoolExecutor, reaproveitando a mesma sessão keep-alive.
+        Devolve os textos na ordem da entrada.
+        """
+        workers = max(1, min(max_concurrency or self.max_concurrency, len(prompts) or 1))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [
+                ex.submit(self.generate, p[0], p[1], temperature, max_tokens, *p[2:])
+                for p in prompts
+            ]
+            return [f.result() for f in futures]
+
+    async def gather_many(
+        self,
+        prompts: Sequence[Tuple[str, ...]],
+        temperature: float = 0.3,
+        max_tokens: int = 1600,
+        max_concurrency: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Dispara vários pares (system_prompt, user_prompt) em paralelo com
+        asyncio.gather (limitado por um semáforo) e devolve os textos na mesma
+        ordem da entrada.
+        """
+        sem = asyncio.Semaphore(max(1, max_concurrency or self.max_concurrency))
+
+        async def _one(system_prompt: str, user_prompt: str, *dynamic: str) -> str:
+            async with sem:
+                return await self.agenerate(system_prompt, user_prompt, temperature, max_tokens, *dynamic)
+
+        return list(await asyncio.gather(*(_one(*p) for p in prompts)))
+
+    # ------------------------------------------------------------------ #
+    # Circuit breaker por provider
+    # ------------------------------------------------------------------ #
+    def _breaker_open(self, provider: str) -> bool:
+        with _BREAKER_LOCK:
+            state = _BREAKERS.get(provider)
+            return state is not None and time.time() < state["open_until"]
+
+    def _record_failure(self, provider: str) -> None:
+        with _BREAKER_LOCK:
+            state = _BREAKERS.setdefault(provider, {"fails": 0, "open_until": 0.0})
+            state["fails"] += 1
+            if state["fails"] >= BREAKER_THRESHOLD:
+                state["open_until"] = time.time() + BREAKER_COOLDOWN
+
+    def _record_success(self, provider: str) -> None:
+        with _BREAKER_LOCK:
+            state = _BREAKERS.setdefault(provider, {"fails": 0, "open_until": 0.0})
+            state["fails"] = 0
+            state["open_until"] = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Cache de respostas (apenas chamadas determinísticas)
+    # ------------------------------------------------------------------ #
+    def _model_for(self, provider: str) -> str:
+        env_name, default = self._MODELS[provider]
+        return os.environ.get(env_name, default)
+
+    def _use_cache(self, temperature: float) -> bool:
+        return self.cache is not None and (temperature == 0 or self.cache_sampled)
+
+    def _cache_key(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        return make_cache_key(
+            provider,
+            self._model_for(provider),
+            self._build_messages(system_prompt, user_prompt),
+            temperature,
+            max_tokens,
+        )
+
+    def _cache_get(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Optional[str]:
+        """Procura a resposta no cache seguindo a ordem de fallback."""
+        for provider in self.fallback_order:
+            if provider not in self._MODELS:
+                continue
+            key = self._cache_key(provider, system_prompt, user_prompt, temperature, max_tokens)
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.stats["cache_hits"] += 1
+                self.active_provider = provider
+                return hit
+        self.stats["cache_misses"] += 1
+        return None
+
+    def _cache_set(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        text: str,
+    ) -> None:
+        key = self._cache_key(provider, system_prompt, user_prompt, temperature, max_tokens)
+        self.cache.set(key, text, ttl=self.cache_ttl)
+
     # ------------------------------------------------------------------ #
     # Providers individuais
     # ------------------------------------------------------------------ #
+    @staticmethod
+    def _compose_user(user_prompt: str, user_dynamic: Optional[str]) -> str:
+        """Cabeçalho fixo primeiro, dados variáveis por último (prefixo cacheável)."""
+        if not user_dynamic:
+            return user_prompt
+        return f"{user_prompt}\n\n{user_dynamic}"
+
     def _build_messages(self, system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+        # ordem fixa system -> user; nada de conteúdo dinâmico antes do system
         return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
 
-    def _call_piapi(
+    # Providers REST (estilo OpenAI): PIAPI e DeepSeek compartilham o formato
+    _REST_PROVIDERS: Dict[str, Dict[str, str]] = {
+        "piapi": {
+            "label": "da PIAPI",
+            "key_env": "PIAPI_API_KEY",
+            "url_env": "PIAPI_BASE_URL",
+            "url_default": "https://api.piapi.ai/v1/chat/completions",
+        },
+        "deepseek": {
+            "label": "do DeepSeek",
+            "key_env": "DEEPSEEK_API_KEY",
+            "url_env": "DEEPSEEK_BASE_URL",
+            "url_default": "https://api.deepseek.com/v1/chat/completions",
+        },
+    }
+
+    def _rest_request(
         self,
+        provider: str,
         system_prompt: str,
         user_prompt: str,
         temperature: float,
         max_tokens: int,
-    ) -> str:
-        api_key = os.environ.get("PIAPI_API_KEY")
+    ):
+        """Monta (url, headers, payload) para um provider REST estilo OpenAI."""
+        cfg = self._REST_PROVIDERS[provider]
+        api_key = os.environ.get(cfg["key_env"])
         if not api_key:
-            raise RuntimeError("PIAPI_API_KEY não configurada.")
+            raise RuntimeError(f"{cfg['key_env']} não configurada.")
 
-        model = os.environ.get("PIAPI_MODEL", "gpt-4o-mini")
-        base_url = os.environ.get("PIAPI_BASE_URL", "https://api.piapi.ai/v1/chat/completions")
+        model = self._model_for(provider)
+        base_url = os.environ.get(cfg["url_env"], cfg["url_default"])
 
         headers = {
             "Authorization": f"Bearer {api_key}",
@@ -146,16 +676,48 @@ class LLMClient:
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
+        return base_url, headers, payload
 
-        resp = requests.post(base_url, headers=headers, data=json.dumps(payload), timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
-
+    def _parse_rest_response(self, provider: str, data: Dict[str, Any]) -> str:
         # assume formato OpenAI-like
         try:
             return data["choices"][0]["message"]["content"]
         except Exception as e:  # pragma: no cover
-            raise RuntimeError(f"Resposta inesperada da PIAPI: {data}") from e
+            label = self._REST_PROVIDERS[provider]["label"]
+            raise RuntimeError(f"Resposta inesperada {label}: {data}") from e
+
+    def _call_rest(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        base_url, headers, payload = self._rest_request(
+            provider, system_prompt, user_prompt, temperature, max_tokens
+        )
+
+        def _post():
+            resp = self._get_session().post(
+                base_url,
+                headers=headers,
+                json=payload,
+                timeout=(self.connect_timeout, self.read_timeout),
+            )
+            resp.raise_for_status()
+            return resp.json()
+
+        return self._parse_rest_response(provider, _with_retry(_post))
+
+    def _call_piapi(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        return self._call_rest("piapi", system_prompt, user_prompt, temperature, max_tokens)
 
     def _call_groq(
         self,
@@ -164,6 +726,7 @@ class LLMClient:
         temperature: float,
         max_tokens: int,
     ) -> str:
+        Groq = _load_groq()
         if Groq is None:
             raise RuntimeError("Biblioteca 'groq' não instalada.")
 
@@ -171,14 +734,17 @@ class LLMClient:
         if not api_key:
             raise RuntimeError("GROQ_API_KEY não configurada.")
 
-        model = os.environ.get("GROQ_MODEL", "llama-3.1-70b-versatile")
-
-        client = Groq(api_key=api_key)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=self._build_messages(system_prompt, user_prompt),
-            temperature=temperature,
-            max_tokens=max_tokens,
+        model = self._model_for("groq")
+
+        # max_retries=0: quem repete é o _with_retry (o SDK faria mais 2 por tentativa)
+        client = Groq(api_key=api_key, max_retries=0)
+        resp = _with_retry(
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=self._build_messages(system_prompt, user_prompt),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
         )
 
         try:
@@ -193,6 +759,7 @@ class LLMClient:
         temperature: float,
         max_tokens: int,
     ) -> str:
+        OpenAIClient = _load_openai()
         if OpenAIClient is None:
             raise RuntimeError("Biblioteca 'openai' não instalada (OpenAI v1).")
 
@@ -200,14 +767,17 @@ class LLMClient:
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY não configurada.")
 
-        model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
-
-        client = OpenAIClient(api_key=api_key)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=self._build_messages(system_prompt, user_prompt),
-            temperature=temperature,
-            max_tokens=max_tokens,
+        model = self._model_for("openai")
+
+        # max_retries=0: quem repete é o _with_retry (o SDK faria mais 2 por tentativa)
+        client = OpenAIClient(api_key=api_key, max_retries=0)
+        resp = _with_retry(
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=self._build_messages(system_prompt, user_prompt),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
         )
         try:
             return resp.choices[0].message.content
@@ -225,28 +795,148 @@ class LLMClient:
         DeepSeek usa um endpoint compatível com OpenAI em muitos setups.
         Aqui usamos uma chamada HTTP estilo OpenAI; ajuste se sua conta exigir outro formato.
         """
-        api_key = os.environ.get("DEEPSEEK_API_KEY")
-        if not api_key:
-            raise RuntimeError("DEEPSEEK_API_KEY não configurada.")
+        return self._call_rest("deepseek", system_prompt, user_prompt, temperature, max_tokens)
 
-        model = os.environ.get("DEEPSEEK_MODEL", "deepseek-chat")
-        base_url = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1/chat/completions")
+    # ------------------------------------------------------------------ #
+    # Streaming (SSE nos providers REST, stream=True nos SDKs)
+    # ------------------------------------------------------------------ #
+    def _stream_rest(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Iterator[str]:
+        base_url, headers, payload = self._rest_request(
+            provider, system_prompt, user_prompt, temperature, max_tokens
+        )
+        payload["stream"] = True
+
+        def _post():
+            resp = self._get_session().post(
+                base_url,
+                headers=headers,
+                json=payload,
+                timeout=(self.connect_timeout, self.read_timeout),
+                stream=True,
+            )
+            try:
+                resp.raise_for_status()
+            except Exception:
+                resp.close()
+                raise
+            return resp
+
+        # retry só no estabelecimento da conexão; depois disso é leitura do stream
+        resp = _with_retry(_post)
+        with resp:
+            # chunk_size=None: repassa cada chunk HTTP assim que chega (sem buffer fixo)
+            for line in resp.iter_lines(chunk_size=None):
+                if not line.startswith(b"data:"):
+                    continue  # linhas vazias, comentários ": ping", event:
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta") or {}
+                except Exception as e:  # pragma: no cover
+                    label = self._REST_PROVIDERS[provider]["label"]
+                    raise RuntimeError(f"Evento SSE inesperado {label}: {data!r}") from e
+                text = delta.get("content")
+                if text:
+                    yield text
+
+    def _stream_sdk(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Iterator[str]:
+        if provider == "groq":
+            Groq = _load_groq()
+            if Groq is None:
+                raise RuntimeError("Biblioteca 'groq' não instalada.")
+            api_key = os.environ.get("GROQ_API_KEY")
+            if not api_key:
+                raise RuntimeError("GROQ_API_KEY não configurada.")
+            client = Groq(api_key=api_key, max_retries=0)
+        else:
+            OpenAIClient = _load_openai()
+            if OpenAIClient is None:
+                raise RuntimeError("Biblioteca 'openai' não instalada (OpenAI v1).")
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY não configurada.")
+            client = OpenAIClient(api_key=api_key, max_retries=0)
+
+        stream = _with_retry(
+            lambda: client.chat.completions.create(
+                model=self._model_for(provider),
+                messages=self._build_messages(system_prompt, user_prompt),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+        )
+        for ev in stream:
+            if not ev.choices:
+                continue
+            text = ev.choices[0].delta.content
+            if text:
+                yield text
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "model": model,
-            "messages": self._build_messages(system_prompt, user_prompt),
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-        }
+    # ------------------------------------------------------------------ #
+    # Variantes assíncronas (httpx + HTTP/2)
+    # ------------------------------------------------------------------ #
+    def _get_aclient(self):
+        httpx = _load_httpx()
+        if httpx is None:
+            raise RuntimeError("Biblioteca 'httpx' não instalada (necessária para agenerate).")
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._aclient
+
+    async def _acall_rest(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        base_url, headers, payload = self._rest_request(
+            provider, system_prompt, user_prompt, temperature, max_tokens
+        )
+        aclient = self._get_aclient()
 
-        resp = requests.post(base_url, headers=headers, data=json.dumps(payload), timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
-        try:
-            return data["choices"][0]["message"]["content"]
-        except Exception as e:  # pragma: no cover
-            raise RuntimeError(f"Resposta inesperada do DeepSeek: {data}") from e
+        async def _post():
+            resp = await aclient.post(base_url, headers=headers, json=payload)
+            resp.raise_for_status()
+            return resp.json()
+
+        return self._parse_rest_response(provider, await _awith_retry(_post))
+
+    async def _acall_piapi(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        return await self._acall_rest("piapi", system_prompt, user_prompt, temperature, max_tokens)
+
+    async def _acall_deepseek(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        return await self._acall_rest("deepseek", system_prompt, user_prompt, temperature, max_tokens)
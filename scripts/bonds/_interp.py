@@ -0,0 +1,44 @@
+# coding: utf-8
+"""
+Interpolação da curva (2Y/10Y/30Y -> maturidades intermediárias) compartilhada
+pelos heatmaps, surface e animação.
+
+- interp_weights(maturities, base_mats) -> matriz (len(base_mats), len(maturities))
+- build_curve_grid(base_vals, base_mats, maturities) -> grid (T, len(maturities))
+
+A interpolação linear por partes é linear nos valores: os pesos saem de
+np.interp aplicado à base canônica e o grid inteiro é um único produto
+matricial, em vez de um np.interp por linha.
+"""
+
+import numpy as np
+
+
+def interp_weights(maturities: np.ndarray, base_mats: np.ndarray) -> np.ndarray:
+    """Pesos lineares: w[k] = interp da base canônica e_k; grid = vals @ w."""
+    return np.stack([np.interp(maturities, base_mats, e) for e in np.eye(len(base_mats))])
+
+
+def build_curve_grid(
+    base_vals: np.ndarray,
+    base_mats: np.ndarray,
+    maturities: np.ndarray,
+    dtype=np.float64,
+) -> np.ndarray:
+    """
+    base_vals: (T, len(base_mats)) com os yields observados por data.
+    NaN em uma linha é substituído pela média da própria linha (mesmo critério
+    do antigo loop com np.nan_to_num).
+
+    Se maturities == base_mats o grid é a própria base (sem produto).
+
+    dtype=np.float32 serve para os heatmaps: o imshow quantiza para 8 bits de
+    cor de qualquer forma, e o produto (T x 3) @ (3 x M) move metade dos bytes.
+    """
+    vals = np.asarray(base_vals, dtype=float)
+    vals = np.where(np.isnan(vals), np.nanmean(vals, axis=1, keepdims=True), vals)
+    base_mats = np.asarray(base_mats, dtype=float)
+    if np.array_equal(np.asarray(maturities, dtype=float), base_mats):
+        return vals.astype(dtype, copy=False)  # pesos seriam a identidade
+    w = interp_weights(maturities, base_mats)
+    return vals.astype(dtype, copy=False) @ w.astype(dtype, copy=False)
@@ -0,0 +1,422 @@
+# coding: utf-8
+"""
+Leitura compartilhada dos CSVs de yields pelos scripts de gráfico.
+
+- read_csv_fast(path, usecols, float_cols) -> DataFrame com "date" em
+  datetime e as colunas de yield em float64. Usa pyarrow.csv (tokenização
+  multi-thread, datas ISO convertidas em C) quando pyarrow está instalado;
+  senão, pd.read_csv com engine="c".
+
+- series_name(df, path) -> nome da série a partir da coluna "source"
+  ("FRED:DGS2" -> "DGS2") ou, sem ela, do nome do arquivo.
+
+- read_yield_series(path, name) -> (DataFrame date + uma coluna de yield com
+  o nome da série, nome). Leitor comum dos scripts de linha.
+
+- read_all(read, paths) -> [read(p) for p in paths], com as leituras em
+  threads (parse em C do pyarrow/pandas libera o GIL).
+
+- read_csv_cached(path) -> DataFrame com todas as colunas do CSV, "date" já
+  convertida para datetime. Na primeira leitura grava um <csv>.<hash>.parquet
+  ao lado (hash de mtime + tamanho do CSV); nas execuções seguintes, se o CSV
+  não mudou, carrega dele (colunar, comprimido, sem re-parse de texto). No
+  mesmo processo, cada CSV é lido uma única vez (memo em memória).
+
+- read_panel_cached(paths, build, tag) -> painel "largo" já alinhado (date +
+  uma coluna por série). Guarda o resultado de build() em
+  pipelines/bonds/.cache/<tag>-<hash>.parquet, com hash de (caminho, mtime,
+  tamanho) dos CSVs de entrada; enquanto nenhum CSV mudar, pula leitura,
+  concat e sort.
+
+Sem pyarrow/fastparquet instalado o cache é simplesmente ignorado.
+
+- fetch_fred_observations_cached(series_id, api_key) -> lista "observations"
+  do FRED, guardada em pipelines/bonds/.cache/<series>.json junto com
+  ETag/Last-Modified. Dentro de max_age não vai à rede; depois disso faz GET
+  condicional (If-None-Match/If-Modified-Since) e um 304 reaproveita o corpo.
+
+- fred_frame_cached(series_id, start, fetch) -> DataFrame date, yield_pct,
+  source dos scripts us*_daily, guardado em parquet por FileCache
+  (pipelines/bonds/.cache/fred/). Validade FRED_CACHE_TTL (segundos, default
+  43200); vencido, baixa só as observações desde a última data guardada.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except Exception:  # pragma: no cover
+    pa = pa_csv = None
+
+T = TypeVar("T")
+
+PANEL_CACHE_DIR = os.path.join("pipelines", "bonds", ".cache")
+FRED_OBS_URL = "https://api.stlouisfed.org/fred/series/observations"
+FRED_CACHE_TTL = 43200  # 12h: o FRED publica as DGS* uma vez por dia útil
+# "." é o valor ausente do FRED; o resto espelha os defaults do pandas
+NA_VALUES = [".", "", "NA", "N/A", "NaN", "nan", "null"]
+
+# read_csv_cached: DataFrames já lidos neste processo
+_CSV_MEMO: Dict[Tuple[str, int, int], pd.DataFrame] = {}
+
+
+def read_csv_fast(
+    path: str,
+    usecols: Optional[Sequence[str]] = None,
+    float_cols: Sequence[str] = ("yield_pct",),
+) -> pd.DataFrame:
+    """
+    Lê o CSV com "date" (ISO, YYYY-MM-DD) já convertida e float_cols em float64.
+    usecols=None lê todas as colunas. float_cols ausentes no arquivo são ignoradas.
+    """
+    if pa_csv is not None:
+        types = {"date": pa.timestamp("ns")}
+        types.update({c: pa.float64() for c in float_cols})
+        opts = pa_csv.ConvertOptions(
+            column_types=types,
+            include_columns=list(usecols) if usecols is not None else None,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,  # "" vira NaN, como no pandas
+            # "source" é uma string repetida por arquivo: vira Categorical
+            # (um valor no dicionário) em vez de N objetos str
+            auto_dict_encode=True,
+        )
+        try:
+            return pa_csv.read_csv(path, convert_options=opts).to_pandas()
+        except pa.ArrowInvalid:
+            pass  # data fora do formato ISO etc.: o caminho do pandas reporta o erro
+
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {c: "float64" for c in float_cols if c in header}
+    df = pd.read_csv(path, usecols=usecols, dtype=dtype or None, na_values=["."], engine="c")
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", cache=True)
+    return df
+
+
+def series_name(df: pd.DataFrame, path: str) -> str:
+    """
+    Nome da série: o que vem depois do último ":" no primeiro "source" não
+    nulo ("FRED:DGS2" -> "DGS2"); sem source, o nome do arquivo sem extensão.
+    Com "source" Categorical (read_csv_fast via pyarrow) o valor sai direto
+    do dicionário, sem varrer a coluna.
+    """
+    raw = None
+    if "source" in df.columns:
+        src = df["source"]
+        if isinstance(src.dtype, pd.CategoricalDtype):
+            cats = src.cat.categories  # ordem de aparição no arquivo
+            raw = cats[0] if len(cats) else None
+        else:
+            i = src.first_valid_index()
+            raw = None if i is None else src[i]
+    name = None
+    if raw is not None:
+        name = raw.split(":")[-1] if isinstance(raw, str) and ":" in raw else str(raw)
+    return name or os.path.splitext(os.path.basename(path))[0]
+
+
+def read_yield_series(path: str, name: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Lê um CSV de yields (via read_csv_cached) e devolve (df, nome), com df só
+    com "date" e a coluna de yield ("yield_pct" ou "yield") renomeada para o
+    nome da série. name=None usa series_name(). Sem sort: quem chama alinha
+    as séries num concat ordenado pelo índice de datas.
+    """
+    df = read_csv_cached(path)
+    ycol = next((c for c in df.columns if c.lower() in ("yield_pct", "yield")), None)
+    if ycol is None:
+        raise RuntimeError(f"Arquivo {path} não contém coluna 'yield_pct'.")
+    if df[ycol].dtype.kind != "f":
+        df[ycol] = pd.to_numeric(df[ycol], errors="coerce")
+    name = name or series_name(df, path)
+    return df[["date", ycol]].rename(columns={ycol: name}), name
+
+
+def read_all(read: Callable[[str], T], paths: Sequence[str]) -> List[T]:
+    """Aplica read() a cada caminho em paralelo; a ordem de paths é mantida."""
+    if len(paths) <= 1:
+        return [read(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=len(paths)) as ex:
+        return list(ex.map(read, paths))
+
+
+def _write_parquet(df: pd.DataFrame, pq: str) -> bool:
+    """Grava em arquivo temporário + os.replace (nunca deixa cache truncado)."""
+    tmp = f"{pq}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp, compression="zstd", index=False)
+        os.replace(tmp, pq)
+        return True
+    except ImportError:
+        return False  # sem engine parquet: segue sem cache
+    except Exception as e:
+        print(f"[_io] não foi possível gravar cache {pq}: {e}")
+        return False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_csv_cached(path: str) -> pd.DataFrame:
+    """
+    Lê o CSV (ou o parquet irmão, se ele corresponder à versão atual do CSV).
+    O parquet se chama <csv>.<hash>.parquet, com hash de (mtime_ns, tamanho):
+    um CSV trocado por outro com mtime mais antigo (checkout, cp -p) não
+    reaproveita cache velho, o que a comparação de mtimes deixava passar.
+    É escrito em arquivo temporário + os.replace para não deixar cache
+    truncado caso dois scripts rodem ao mesmo tempo; versões antigas do
+    mesmo CSV são apagadas.
+    Dentro do mesmo processo (plot_all.py) o resultado fica em memória,
+    chaveado por (caminho, mtime, tamanho): cada CSV é lido uma vez só.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return read_csv_fast(path)  # deixa o leitor reportar o arquivo ausente
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if key in _CSV_MEMO:
+        # cópia rasa: colunas trocadas pelo chamador não vazam para o memo
+        return _CSV_MEMO[key].copy(deep=False)
+
+    digest = hashlib.sha1(json.dumps(key[1:]).encode("utf-8")).hexdigest()[:12]
+    pq = f"{path}.{digest}.parquet"
+    df = None
+    if os.path.exists(pq):
+        try:
+            df = pd.read_parquet(pq)
+        except Exception:
+            pass  # cache ilegível/sem engine: relê o CSV
+
+    if df is None:
+        df = read_csv_fast(path)
+        if _write_parquet(df, pq):
+            # remove caches de versões anteriores (e o antigo <csv>.parquet)
+            for old in glob.glob(glob.escape(path) + ".*parquet"):
+                if old != pq:
+                    try:
+                        os.remove(old)
+                    except OSError:
+                        pass
+    _CSV_MEMO[key] = df
+    return df.copy(deep=False)
+
+
+def read_panel_cached(
+    paths: Sequence[str],
+    build: Callable[[], pd.DataFrame],
+    tag: str,
+    cache_dir: str = PANEL_CACHE_DIR,
+) -> pd.DataFrame:
+    """
+    Devolve build() (painel largo com coluna "date"), reaproveitando o parquet
+    do cache se os CSVs não mudaram desde a última execução.
+    tag separa scripts cujo build() monta colunas diferentes.
+    """
+    try:
+        stamp = [
+            (os.path.abspath(p), os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths
+        ]
+    except OSError:
+        return build()  # deixa o próprio build() reportar o arquivo ausente
+
+    digest = hashlib.sha1(json.dumps(stamp).encode("utf-8")).hexdigest()[:16]
+    pq = os.path.join(cache_dir, f"{tag}-{digest}.parquet")
+    if os.path.exists(pq):
+        try:
+            return pd.read_parquet(pq)
+        except Exception:
+            pass  # cache ilegível/sem engine: reconstrói
+
+    df = build()
+    os.makedirs(cache_dir, exist_ok=True)
+    if _write_parquet(df, pq):
+        # remove painéis antigos da mesma tag (CSVs com mtime anterior)
+        for old in glob.glob(os.path.join(cache_dir, f"{tag}-*.parquet")):
+            if old != pq:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+    return df
+
+
+@lru_cache(maxsize=None)
+def _http_session():
+    # uma sessão por processo: USREC/DGS* reaproveitam a mesma conexão TLS
+    # com o FRED; Retry com backoff em 429/5xx (só GET)
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry))
+    return session
+
+
+def fetch_fred_observations_cached(
+    series_id: str,
+    api_key: str,
+    timeout: float = 15,
+    max_age: float = 86400,
+    cache_dir: str = PANEL_CACHE_DIR,
+) -> List[dict]:
+    """
+    Observações de uma série do FRED com cache em disco.
+    A api_key não é gravada no cache. Se a rede falhar e houver cópia antiga,
+    devolve a cópia; sem cópia, o erro sobe para o chamador.
+    """
+    path = os.path.join(cache_dir, f"{series_id.lower()}.json")
+    cached = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if time.time() - os.path.getmtime(path) < max_age:
+            return cached["observations"]
+    except (OSError, ValueError, KeyError):
+        cached = None
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    params = {"series_id": series_id, "api_key": api_key, "file_type": "json"}
+    try:
+        r = _http_session().get(FRED_OBS_URL, params=params, headers=headers, timeout=timeout)
+        if r.status_code == 304 and cached:
+            os.utime(path)  # revalidado: conta max_age de novo
+            return cached["observations"]
+        r.raise_for_status()
+        obs = r.json().get("observations", [])
+    except Exception:
+        if cached:
+            return cached["observations"]
+        raise
+
+    entry = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "observations": obs,
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[_io] não foi possível gravar cache {path}: {e}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return obs
+
+
+class FileCache:
+    """
+    DataFrames de observações do FRED em parquet, um arquivo por
+    (series_id, observation_start): <directory>/<md5>.parquet. A validade é o
+    mtime do arquivo: com menos de ttl segundos, load() devolve fresh=True.
+    ttl=None lê FRED_CACHE_TTL do ambiente (default 12h); ttl <= 0 desliga o
+    cache (load() nunca acha nada e store() não grava).
+
+    A coluna date é sempre guardada e devolvida como datetime64[ns]: a mesma
+    entrada (series_id, start) é usada por us10y_daily.fetch_fred e pelos
+    fetchers de us2y/us30y, e misturar datetime.date com Timestamp quebraria
+    o sort/drop_duplicates do update(). Quem quiser datetime.date converte
+    na saída.
+    """
+
+    def __init__(self, directory: str = os.path.join(PANEL_CACHE_DIR, "fred"), ttl: Optional[float] = None):
+        self.directory = directory
+        self.ttl = float(os.environ.get("FRED_CACHE_TTL", FRED_CACHE_TTL)) if ttl is None else ttl
+
+    @staticmethod
+    def _normalize(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        if df is None or df["date"].dtype == "datetime64[ns]":
+            return df
+        return df.assign(date=pd.to_datetime(df["date"]).astype("datetime64[ns]"))
+
+    def path(self, series_id: str, observation_start: str) -> str:
+        digest = hashlib.md5(f"{series_id}|{observation_start}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.parquet")
+
+    def load(self, series_id: str, observation_start: str) -> Tuple[Optional[pd.DataFrame], bool]:
+        """(df, fresh); (None, False) sem cache, cache ilegível ou cache desligado."""
+        if self.ttl <= 0:
+            return None, False
+        pq = self.path(series_id, observation_start)
+        try:
+            age = time.time() - os.path.getmtime(pq)
+            df = pd.read_parquet(pq)
+        except Exception:
+            return None, False  # ausente, truncado ou sem engine parquet
+        # entradas antigas podem ter date como datetime.date
+        return self._normalize(df), age < self.ttl
+
+    def store(self, series_id: str, observation_start: str, df: pd.DataFrame) -> None:
+        if self.ttl <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        _write_parquet(self._normalize(df), self.path(series_id, observation_start))
+
+    @staticmethod
+    def resume_from(cached: Optional[pd.DataFrame], observation_start: str) -> str:
+        """observation_start da busca incremental: a última data já guardada."""
+        if cached is None or len(cached) == 0:
+            return observation_start
+        return str(cached["date"].iloc[-1])[:10]
+
+    def update(
+        self,
+        series_id: str,
+        observation_start: str,
+        cached: Optional[pd.DataFrame],
+        new: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """Junta as linhas novas às guardadas (a data repetida fica com o valor novo) e grava."""
+        cached, new = self._normalize(cached), self._normalize(new)
+        if cached is not None and len(cached) and len(new):
+            new = (
+                pd.concat([cached, new], ignore_index=True)
+                .drop_duplicates("date", keep="last")
+                .sort_values("date")
+                .reset_index(drop=True)
+            )
+        elif cached is not None and len(cached):
+            new = cached
+        self.store(series_id, observation_start, new)
+        return new
+
+
+def fred_frame_cached(
+    series_id: str,
+    observation_start: str,
+    fetch: Callable[[str], pd.DataFrame],
+    cache: Optional[FileCache] = None,
+) -> pd.DataFrame:
+    """
+    fetch(start) -> DataFrame date, yield_pct, source (já ordenado), com
+    FileCache na frente: dentro do ttl não vai à rede; vencido, busca só a
+    partir da última data guardada e concatena; sem cache, a série inteira.
+    """
+    cache = cache or FileCache()
+    cached, fresh = cache.load(series_id, observation_start)
+    if fresh:
+        return cached
+    new = fetch(FileCache.resume_from(cached, observation_start))
+    return cache.update(series_id, observation_start, cached, new)
@@ -0,0 +1,274 @@
+# coding: utf-8
+"""
+Kernels numba das janelas móveis dos gráficos de linha.
+
+- rolling_std(block, window, scale) -> rolling(window, min_periods=1).std()
+  de cada coluna de block (N, K), já multiplicada por scale.
+- rolling_zscore(block, window) -> (x - média móvel) / std móvel, com as duas
+  estatísticas da mesma janela, numa passada por coluna.
+- rolling_mean(block, window) / ewma(block, span) -> SMA (min_periods=1) e
+  EMA (adjust=False) por coluna, mesmas contas do Cython do pandas (soma de
+  Kahan na SMA, pesos que decaem também nos NaN na EMA).
+- moving_average(data, window, ema) -> Series/DataFrame com a SMA ou EMA:
+  kernels acima com o engine numba ligado, rolling/ewm do pandas senão.
+- lttb_indices(xf, y, edges, cx, cy) -> laço sequencial de baldes do LTTB
+  (usado por _utils.lttb com o engine ligado); mesmos índices do numpy.
+
+rolling_std e rolling_zscore usam Welford com entrada e saída da janela (cada
+elemento é somado uma vez e removido uma vez, qualquer que seja a janela),
+ignoram NaN e zeram a variância quando a janela inteira tem o mesmo valor, como o pandas.
+São compilados sob demanda, só quando rolling_engine() está ligado
+(BONDS_ROLLING_ENGINE=numba); cache=True guarda o código compilado em
+pipelines/bonds/.cache/numba (ou em NUMBA_CACHE_DIR, se definido), que o
+CI pode restaurar entre execuções; warmup_jit.py pré-compila tudo.
+Sem fastmath: ele assumiria ausência de NaN e quebraria os testes v == v.
+"""
+
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from scripts.bonds._utils import rolling_engine
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# diretório do cache de JIT: fora de __pycache__ (que o checkout do CI não
+# preserva) e junto dos demais caches dos gráficos
+NUMBA_CACHE_DIR = os.environ.get("NUMBA_CACHE_DIR") or os.path.join(
+    ROOT, "pipelines", "bonds", ".cache", "numba")
+
+
+def _rolling_std_cols(x, w, scale, out):
+    n, k = x.shape
+    for j in range(k):
+        c = 0
+        mean = 0.0
+        m2 = 0.0
+        prev = np.nan
+        same = 0
+        for i in range(n):
+            v = x[i, j]
+            if v == v:
+                c += 1
+                d = v - mean
+                mean += d / c
+                m2 += d * (v - mean)
+                if v == prev:
+                    same += 1
+                else:
+                    same = 1
+                    prev = v
+            if i >= w:
+                u = x[i - w, j]
+                if u == u:
+                    c -= 1
+                    if c == 0:
+                        mean = 0.0
+                        m2 = 0.0
+                    else:
+                        d = u - mean
+                        mean -= d / c
+                        m2 -= d * (u - mean)
+            if c < 2:
+                out[i, j] = np.nan
+            elif same >= c:
+                out[i, j] = 0.0
+            else:
+                out[i, j] = math.sqrt(max(m2, 0.0) / (c - 1)) * scale
+    return out
+
+
+def _rolling_zscore_cols(x, w, out):
+    n, k = x.shape
+    for j in range(k):
+        c = 0
+        mean = 0.0
+        m2 = 0.0
+        prev = np.nan
+        same = 0
+        for i in range(n):
+            v = x[i, j]
+            if v == v:
+                c += 1
+                d = v - mean
+                mean += d / c
+                m2 += d * (v - mean)
+                if v == prev:
+                    same += 1
+                else:
+                    same = 1
+                    prev = v
+            if i >= w:
+                u = x[i - w, j]
+                if u == u:
+                    c -= 1
+                    if c == 0:
+                        mean = 0.0
+                        m2 = 0.0
+                    else:
+                        d = u - mean
+                        mean -= d / c
+                        m2 -= d * (u - mean)
+            if c < 2 or v != v or same >= c:
+                # janela constante: x - média = 0 e std = 0 -> 0/0 no pandas
+                out[i, j] = np.nan
+            else:
+                out[i, j] = (v - mean) / math.sqrt(max(m2, 0.0) / (c - 1))
+    return out
+
+
+def _rolling_mean_cols(x, w, out):
+    n, k = x.shape
+    for j in range(k):
+        c = 0
+        sum_x = 0.0
+        comp_add = 0.0  # compensações de Kahan separadas, como no pandas
+        comp_rm = 0.0
+        neg = 0
+        prev = np.nan
+        same = 0
+        for i in range(n):
+            # como no pandas: primeiro sai o elemento antigo, depois entra o novo
+            if i >= w:
+                u = x[i - w, j]
+                if u == u:
+                    c -= 1
+                    y = -u - comp_rm
+                    t = sum_x + y
+                    comp_rm = t - sum_x - y
+                    sum_x = t
+                    if u < 0 or (u == 0 and math.copysign(1.0, u) < 0):
+                        neg -= 1
+            v = x[i, j]
+            if v == v:
+                c += 1
+                y = v - comp_add
+                t = sum_x + y
+                comp_add = t - sum_x - y
+                sum_x = t
+                if v < 0 or (v == 0 and math.copysign(1.0, v) < 0):
+                    neg += 1
+                if v == prev:
+                    same += 1
+                else:
+                    same = 1
+                    prev = v
+            if c == 0:
+                out[i, j] = np.nan
+            elif same >= c:
+                out[i, j] = prev
+            else:
+                r = sum_x / c
+                if neg == 0 and r < 0:
+                    r = 0.0
+                elif neg == c and r > 0:
+                    r = 0.0
+                out[i, j] = r
+    return out
+
+
+def _ewma_cols(x, alpha, out):
+    n, k = x.shape
+    f = 1.0 - alpha
+    for j in range(k):
+        wavg = x[0, j]
+        old_wt = 1.0
+        out[0, j] = wavg
+        for i in range(1, n):
+            v = x[i, j]
+            if wavg == wavg:
+                # ignore_na=False: o peso antigo decai também nos NaN
+                old_wt *= f
+                if v == v:
+                    if wavg != v:
+                        wavg = (old_wt * wavg + alpha * v) / (old_wt + alpha)
+                    old_wt = 1.0
+            elif v == v:
+                wavg = v
+            out[i, j] = wavg
+    return out
+
+
+def _lttb_loop(xf, y, edges, cx, cy, idx):
+    a = 0
+    for b in range(len(edges) - 1):
+        lo = edges[b]
+        hi = edges[b + 1]
+        ax_ = xf[a]
+        ay_ = y[a]
+        best = -1.0
+        best_i = lo
+        for i in range(lo, hi):
+            # mesma expressão (e ordem das contas) do _utils.lttb
+            area = abs((ax_ - cx[b + 1]) * (y[i] - ay_) - (ax_ - xf[i]) * (cy[b + 1] - ay_))
+            if area > best:  # primeiro máximo, como np.argmax
+                best = area
+                best_i = i
+        a = best_i
+        idx[b + 1] = a
+    return idx
+
+
+@lru_cache(maxsize=None)
+def _jit(func):
+    import numba
+
+    # o numba lê config.CACHE_DIR ao localizar o cache de cada função, então
+    # vale mesmo se ele já tiver sido importado (ex.: por rolling_engine())
+    if not numba.config.CACHE_DIR:
+        numba.config.CACHE_DIR = NUMBA_CACHE_DIR
+    return numba.njit(cache=True, nogil=True, error_model="numpy")(func)
+
+
+def _block(block) -> np.ndarray:
+    return np.asfortranarray(block, dtype=np.float64)
+
+
+def rolling_std(block, window: int, scale: float = 1.0) -> np.ndarray:
+    x = _block(block)
+    out = np.empty(x.shape, dtype=np.float64, order="F")
+    return _jit(_rolling_std_cols)(x, window, scale, out)
+
+
+def rolling_zscore(block, window: int) -> np.ndarray:
+    x = _block(block)
+    out = np.empty(x.shape, dtype=np.float64, order="F")
+    return _jit(_rolling_zscore_cols)(x, window, out)
+
+
+def rolling_mean(block, window: int) -> np.ndarray:
+    x = _block(block)
+    out = np.empty(x.shape, dtype=np.float64, order="F")
+    return _jit(_rolling_mean_cols)(x, window, out)
+
+
+def ewma(block, span: float) -> np.ndarray:
+    x = _block(block)
+    out = np.empty(x.shape, dtype=np.float64, order="F")
+    return _jit(_ewma_cols)(x, 2.0 / (span + 1.0), out)
+
+
+def moving_average(data, window: int, ema: bool = False):
+    """
+    SMA (rolling, min_periods=1) ou EMA (ewm span=window, adjust=False) de uma
+    Series ou de cada coluna de um DataFrame, devolvendo o mesmo tipo.
+    """
+    if not rolling_engine():
+        if ema:
+            return data.ewm(span=window, adjust=False, min_periods=1).mean()
+        return data.rolling(window=window, min_periods=1).mean()
+
+    vals = data.to_numpy(dtype=np.float64)
+    block = vals.reshape(len(vals), -1)
+    out = ewma(block, window) if ema else rolling_mean(block, window)
+    if isinstance(data, pd.Series):
+        return pd.Series(out[:, 0], index=data.index, name=data.name)
+    return pd.DataFrame(out, index=data.index, columns=data.columns, copy=False)
+
+
+def lttb_indices(xf, y, edges, cx, cy) -> np.ndarray:
+    idx = np.empty(len(edges) + 1, dtype=np.int64)
+    idx[0], idx[-1] = 0, len(xf) - 1
+    return _jit(_lttb_loop)(xf, y, edges, cx, cy, idx)
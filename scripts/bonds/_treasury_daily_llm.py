@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relatórios diários de Treasuries (US2Y / US10Y / US30Y) a partir de uma
+única implementação.
+
+Cada vértice é um TenorSpec (série do FRED, rótulo, prompt, parâmetros do
+LLM, notas fixas do contexto); TENORS reúne os três. us2y_daily_llm.py,
+us10y_daily_llm.py e us30y_daily_llm.py só chamam run(TENORS[...]);
+daily_llm_all.py usa as mesmas peças para rodar os três num processo.
+
+Diferenças que vêm do histórico de cada script e foram mantidas:
+- us30y usa scripts.bonds.tools (sentinel criada só após o envio, chat_id
+  com fallbacks) e, se o LLM falhar, envia um resumo simples do contexto;
+- us2y/us10y usam scripts.tools (a trava grava a data ao ser consultada) e
+  falham se o LLM falhar.
+"""
+
+import argparse
+import html
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from providers.llm_cache import cache_from_env
+from scripts import tools as _tools
+from scripts.bonds import tools as _bonds_tools
+from scripts.token_budget import MAX_INPUT_TOKENS, fit_to_budget
+
+# pandas (via us10y_daily) e LLMClient só são importados depois da trava
+# diária: com o relatório já enviado, o script sai sem carregá-los
+if TYPE_CHECKING:
+    import pandas as pd
+    from providers.llm_client import LLMClient
+
+@dataclass(frozen=True)
+class TenorSpec:
+    name: str                 # chave do contador/sentinel: "us10y"
+    label: str                # "US10Y"
+    series_id: str            # série padrão do FRED
+    series_env: str           # variável de ambiente que troca a série
+    description: str          # descrição do argparse
+    system_msg: str
+    user_msg: str             # cabeçalho fixo; o contexto do dia vai em user_dynamic
+    temperature: float
+    max_tokens: int
+    context_notes: Tuple[str, ...]
+    period_label: str = "Período observado na série"
+    range_label: str = "Faixa histórica de yield"
+    llm_fallback: bool = False  # resumo simples se o LLM falhar
+    bonds_tools: bool = False   # scripts.bonds.tools em vez de scripts.tools
+    emoji: str = "💵"
+
+    @property
+    def counter_key(self) -> str:
+        return f"diario_{self.name}"
+
+    @property
+    def sent_path(self) -> str:
+        return f"data/sentinels/{self.name}_daily.sent"
+
+    @property
+    def tools(self):
+        return _bonds_tools if self.bonds_tools else _tools
+
+
+TENORS: Dict[str, TenorSpec] = {
+    "us10y": TenorSpec(
+        name="us10y",
+        label="US10Y",
+        series_id="DGS10",
+        series_env="US10Y_FRED_SERIES_ID",
+        description="Relatório Diário — US10Y (Treasury 10 anos)",
+        system_msg=(
+            "Você é um gestor sênior de renda fixa global, com foco em Treasuries dos EUA. "
+            "Escreva em PT-BR, claro, objetivo, com foco em curva de juros, inflação implícita, "
+            "política monetária e apetite por risco em bonds."
+        ),
+        user_msg="""
+Gere um **Relatório Diário — US10Y (Treasury 10 anos)** estruturado nos **10 tópicos abaixo**.
+Numere exatamente de 1 a 10, texto contínuo (sem markdown de lista do tipo '- ').
+
+1) Nível atual do US10Y e variação diária
+2) Curva de juros EUA (2Y, 10Y, 30Y) — inclinação e movimento do dia
+3) Inflação implícita e expectativas de política monetária (Fed, dot plot, próximos meetings)
+4) Reprecificação de duration (apetite por juros longos vs curtos)
+5) Spreads de crédito e impacto em IG/HY (em linhas gerais)
+6) Risco global e fluxo para ativos de risco vs ativos de refúgio (equities vs bonds)
+7) Contexto macro recente (dados de inflação, emprego, atividade)
+8) Visão institucional (bancos, research, casas de análise) sobre a trajetória da curva
+9) Interpretação Executiva (bullet points objetivos, até 5 linhas, em PT-BR)
+10) Conclusão (1 parágrafo: curto e médio prazo para US10Y e curva de Treasuries)
+
+Baseie-se no contexto factual levantado:
+""".strip(),
+        temperature=0.35,
+        max_tokens=1600,
+        context_notes=(
+            "- US10Y é a referência global de taxa livre de risco de longo prazo em USD.",
+            "- Interpretação ligada a expectativas de inflação, prêmio de prazo e política monetária do Fed.",
+            "- A inclinação 2Y–10Y e 10Y–30Y é relevante para entender sinal de ciclo (steepening vs flattening).",
+        ),
+    ),
+    "us2y": TenorSpec(
+        name="us2y",
+        label="US2Y",
+        series_id="DGS2",
+        series_env="US2Y_FRED_SERIES_ID",
+        description="Relatório Diário — US2Y (Treasury 2 anos)",
+        system_msg=(
+            "Você é um gestor sênior de renda fixa global, com foco em Treasuries dos EUA. "
+            "Escreva em PT-BR, claro, objetivo, com foco em política monetária, inflação implícita "
+            "e dinâmica da curva curta (2 anos)."
+        ),
+        user_msg="""
+Gere um **Relatório Diário — US2Y (Treasury 2 anos)** estruturado nos **10 tópicos abaixo**.
+Numere exatamente de 1 a 10, texto contínuo (sem markdown de lista do tipo '- ').
+
+1) Nível atual do US2Y e variação diária  
+2) Curva de juros EUA (2Y, 10Y, 30Y) — inclinação e movimento do dia  
+3) Inflação implícita e expectativas de política monetária (Fed, dot plot, próximos meetings)  
+4) Reprecificação de duration curta (sensibilidade a Fed Funds)  
+5) Spreads de crédito e impacto em IG/HY  
+6) Risco global e fluxo para risco vs refúgio  
+7) Contexto macro recente (inflação, emprego, atividade)  
+8) Visão institucional sobre trajetória da curva curta  
+9) Interpretação Executiva (bullet points, até 5 linhas)  
+10) Conclusão (1 parágrafo: curto e médio prazo para US2Y e curva de Treasuries)  
+
+Baseie-se no contexto factual levantado:
+""".strip(),
+        temperature=0.35,
+        max_tokens=1600,
+        context_notes=(
+            "- US2Y é o vértice mais sensível à política monetária do Fed.",
+            "- Movimentos de 2 anos refletem expectativas para Fed Funds e juros terminais.",
+            "- A inclinação 2Y–10Y é referência clássica para inversão e sinalização de ciclo.",
+        ),
+    ),
+    "us30y": TenorSpec(
+        name="us30y",
+        label="US30Y",
+        series_id="DGS30",
+        series_env="US30Y_FRED_SERIES_ID",
+        description="Relatório Diário — US30Y (DGS30)",
+        system_msg="Você é um gestor sênior de renda fixa, escreva em PT-BR, objetivo, focado em juros longos e risco de prazo.",
+        user_msg="""
+Gere um **Relatório Diário — US30Y (Treasury 30 anos)** estruturado nos 10 tópicos abaixo.
+Numere exatamente de 1 a 10.
+
+1) Nível atual do US30Y e variação diária
+2) Term premium e interpretação estrutural
+3) Curva 2Y–10Y e 10Y–30Y: inclinação e movimento do dia
+4) Impacto em duration e portfólios longos
+5) Spreads de crédito longos (corporate, IG vs HY)
+6) Fluxos institucionais (pension funds, insurers)
+7) Dados macro relevantes (inflação, wages, atividade)
+8) Perspectiva de bancos centrais e impacto em yield longo
+9) Interpretação Executiva (bullet points)
+10) Conclusão (curto e médio prazo)
+Baseie-se no contexto factual:
+""".strip(),
+        temperature=0.25,
+        max_tokens=1200,
+        context_notes=(
+            "- US30Y reflete a parte longa da curva e é sensível a expectativas de inflação estrutural, term premium e longevidade de política monetária.",
+            "- Movimentos no US30Y impactam duration de portfólios longos e pricing de ativos sensíveis a yields de longo prazo.",
+        ),
+        period_label="Período observado",
+        range_label="Faixa histórica",
+        llm_fallback=True,
+        bonds_tools=True,
+    ),
+}
+
+
+def build_context_block(
+    spec: TenorSpec,
+    series_id: Optional[str] = None,
+    start: str = "2000-01-01",
+    df: Optional["pd.DataFrame"] = None,
+) -> str:
+    """
+    Busca a série via FRED e monta um bloco de contexto factual
+    (nível atual, variação, histórico) para o LLM.
+    df (date, yield_pct) já baixado pode ser passado por um orquestrador
+    (daily_llm_all.py, via us10y_daily.fetch_fred_many); aí não há ida ao FRED.
+    """
+    if df is None:
+        from scripts.bonds.us10y_daily import fetch_fred
+
+        api_key = os.getenv("FRED_API_KEY")
+        if not api_key:
+            raise RuntimeError("FRED_API_KEY não configurado no ambiente.")
+        df = fetch_fred(api_key, series_id or spec.series_id, start)
+
+    s = _tools.summarize_series(df)
+    lines = [
+        f"- {spec.label} ({spec.series_id} FRED): {s['last_yield']:.2f}% em {s['last_date']}.",
+    ]
+    if s["prev_date"] is not None:
+        lines.append(
+            f"- Leitura anterior: {s['prev_yield']:.2f}% em {s['prev_date']}. "
+            f"Variação diária: {s['delta']:+.2f} pp ({s['delta_bp']:+.1f} bps)."
+        )
+    lines.append(f"- {spec.period_label}: {s['start_date']} → {s['end_date']}.")
+    lines.append(f"- {spec.range_label}: mínimo {s['min_y']:.2f}%, máximo {s['max_y']:.2f}%.")
+    lines.extend(spec.context_notes)
+    return "\n".join(lines)
+
+
+def prompt_kwargs(spec: TenorSpec, contexto_textual: str) -> Dict[str, Any]:
+    """Argumentos de LLMClient.generate/agenerate do relatório."""
+    # acima do orçamento, sai primeiro a faixa histórica, depois o período
+    contexto_textual = fit_to_budget(
+        spec.system_msg, contexto_textual, MAX_INPUT_TOKENS,
+        drop=(spec.range_label, spec.period_label), fixed=spec.user_msg,
+    )
+    return dict(
+        system_prompt=spec.system_msg,
+        user_prompt=spec.user_msg,
+        user_dynamic=contexto_textual,
+        temperature=spec.temperature,
+        max_tokens=spec.max_tokens,
+    )
+
+
+def _llm(provider_hint: Optional[str]) -> "LLMClient":
+    from providers.llm_client import LLMClient
+
+    # respostas em cache (LLM_CACHE_DIR/LLM_CACHE_TTL): rerun com o mesmo
+    # contexto (falha no envio, fim de semana) não gera nem paga de novo
+    cache, ttl = cache_from_env()
+    return LLMClient(provider=provider_hint or None, cache=cache, cache_ttl=ttl, cache_sampled=True)
+
+
+def gerar_analise(spec: TenorSpec, contexto_textual: str, provider_hint: Optional[str] = None) -> Dict[str, Any]:
+    llm = _llm(provider_hint)
+    texto = llm.generate(**prompt_kwargs(spec, contexto_textual))
+    return {"texto": texto, "provider": llm.active_provider}
+
+
+async def agerar_analise(spec: TenorSpec, contexto_textual: str, provider_hint: Optional[str] = None) -> Dict[str, Any]:
+    """Versão assíncrona (LLMClient.agenerate), usada por daily_llm_all.py."""
+    async with _llm(provider_hint) as llm:
+        texto = await llm.agenerate(**prompt_kwargs(spec, contexto_textual))
+        return {"texto": texto, "provider": llm.active_provider}
+
+
+def simple_fallback_summary(context_text: str) -> str:
+    header = "Resumo RÁPIDO — (fallback automático, LLM indisponível)"
+    lines = [
+        header,
+        "",
+        "Contexto factual:",
+        context_text,
+        "",
+        "Interpretação rápida:",
+        "- Leitura principal: veja o bloco de contexto acima.",
+        "- Observação: reveja suas chaves/configuração LLM para receber análise completa.",
+        "",
+        "Este relatório foi gerado automaticamente em modo fallback."
+    ]
+    return "\n".join(lines)
+
+
+def claim(
+    spec: TenorSpec,
+    counter_path: str,
+    sent_path: str,
+    force: bool,
+    counters: Optional["_tools.CounterFile"] = None,
+) -> Optional[str]:
+    """
+    Trava diária + contador. Devolve o título, ou None se já foi enviado hoje.
+    counters: CounterFile aberto pelo chamador para juntar vários relatórios
+    numa transação só (daily_llm_all.py).
+
+    A checagem da trava roda dentro da transação do CounterFile (BEGIN
+    IMMEDIATE no SQLite dos contadores): duas execuções simultâneas do mesmo
+    relatório não passam as duas pelo "ler data / gravar data" do sent_guard.
+    """
+    if counters is None:
+        with _tools.CounterFile(counter_path) as c:
+            return claim(spec, counter_path, sent_path, force, counters=c)
+    if not force and spec.tools.sent_guard(sent_path):
+        return None
+    numero = spec.tools.title_counter(counter_path, key=spec.counter_key, counters=counters)
+    return f"{spec.emoji} {spec.label} — Relatório Diário — {_tools.today_brt_str()} — Nº {numero}"
+
+
+def render(titulo: str, llm_out: Dict[str, Any], dt: float) -> str:
+    corpo = llm_out["texto"].strip()
+    provider_usado = llm_out.get("provider", "?")
+    return (
+        f"<b>{html.escape(titulo)}</b>\n\n"
+        f"{corpo}\n\n"
+        f"<i>Provedor LLM: {html.escape(str(provider_usado))} • {dt:.1f}s</i>"
+    )
+
+
+def render_fallback(titulo: str, contexto: str) -> str:
+    corpo_fb = simple_fallback_summary(contexto)
+    return (
+        f"<b>{html.escape(titulo)}</b>\n\n{html.escape(corpo_fb)}\n\n"
+        f"<i>Fallback gerado por ausência/erro do LLM • 0.0s</i>"
+    )
+
+
+def deliver(spec: TenorSpec, texto_final: str, sent_path: str, preview: bool) -> None:
+    """Envia ao Telegram; com scripts.bonds.tools, cria a sentinel depois do envio."""
+    if not spec.bonds_tools:
+        # send_to_telegram deve ler TELEGRAM_CHAT_ID do ambiente
+        spec.tools.send_to_telegram(texto_final, preview=preview)
+        return
+    try:
+        spec.tools.send_to_telegram(texto_final, preview=preview)
+        try:
+            spec.tools.mark_sent(sent_path)
+        except Exception as e_mark:
+            print("[mark_sent] aviso: não foi possível criar sentinel:", e_mark)
+    except Exception as e_send:
+        print("[Telegram] erro ao enviar mensagem:", e_send)
+        raise
+
+
+def run(spec: TenorSpec, argv=None) -> None:
+    parser = argparse.ArgumentParser(description=spec.description)
+    parser.add_argument("--send-telegram", action="store_true")
+    parser.add_argument("--preview", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--counter-path", default="data/counters.json")
+    parser.add_argument("--sent-path", default=None)
+    parser.add_argument("--provider", default=None)
+    parser.add_argument("--series-id", default=os.environ.get(spec.series_env, spec.series_id))
+    parser.add_argument("--start", default="2000-01-01")
+    args = parser.parse_args(argv)
+
+    sent_path = args.sent_path or spec.sent_path
+
+    # trava diária (evita envio duplicado)
+    titulo = claim(spec, args.counter_path, sent_path, args.force)
+    if titulo is None:
+        print("Já foi enviado hoje (trava .sent). Use --force para ignorar.")
+        return
+
+    contexto = build_context_block(spec, series_id=args.series_id, start=args.start)
+
+    t0 = time.time()
+    try:
+        llm_out = gerar_analise(spec, contexto, provider_hint=args.provider)
+        texto_final = render(titulo, llm_out, time.time() - t0)
+    except Exception as e:
+        if not spec.llm_fallback:
+            raise
+        print("[LLM] falha ao gerar análise LLM:", e)
+        texto_final = render_fallback(titulo, contexto)
+
+    print(texto_final)
+
+    if args.send_telegram:
+        deliver(spec, texto_final, sent_path, args.preview)
@@ -0,0 +1,308 @@
+# coding: utf-8
+"""
+Utilitários pequenos compartilhados pelos scripts de gráfico.
+
+- find_column(cols, patterns) -> primeira coluna cujo nome contém um dos
+  padrões (sem diferenciar maiúsculas). A prioridade é a ordem de `patterns`:
+  ["dgs2", "2y", "2"] prefere "DGS2" a qualquer coluna que só contenha "2".
+- find_tenor(cols, years) -> primeira coluna cujo nome traz o prazo como
+  número isolado ("DGS2", "us2y", "2y" para 2; "DGS20"/"us12y" não casam).
+- neg_runs(values) -> (starts, ends) dos trechos consecutivos com valor < 0
+  (inversões), em uma única passada vetorizada.
+- shade_runs(ax, dates, starts, ends, **kw) -> sombreia todos os trechos num
+  único PolyCollection (um artista) em vez de um axvspan por trecho.
+- monthly_mean(df) -> resample("MS").mean().interpolate() sem o resampler.
+- colormap_rgba(grid, cmap) -> bitmap RGBA uint8 já colorido + ScalarMappable
+  para a colorbar (imshow não refaz normalização/colormap no draw).
+- add_spreads(df) -> df com S_10_2, S_30_2 e S_30_10 calculados de uma vez
+  sobre a matriz (T, 3) de US2Y/US10Y/US30Y.
+- rolling_engine() -> kwargs (engine/engine_kwargs) para .mean()/.std() de
+  rolling/ewm: numba se BONDS_ROLLING_ENGINE=numba e numba instalado; senão {}.
+- clip_dates(df, start, end) -> df[start <= date <= end] de um df já ordenado
+  por "date", via searchsorted (O(log N), sem máscara booleana) + iloc.
+- lttb(x, y, n_out) -> (x, y) reduzidos a ~n_out pontos (Largest-Triangle-
+  Three-Buckets) para séries longas; curtas voltam intactas.
+- usrec_spans(observations) -> [(início, fim)] das recessões na série USREC
+  do FRED (0/1), detectadas por np.diff em vez de um loop por observação.
+"""
+
+import os
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# engine_kwargs do pandas para o engine numba (nopython é o default dele)
+NUMBA_ENGINE_KWARGS = {"nopython": True, "nogil": True, "parallel": False}
+
+# savefig dos PNGs: zlib nível 3 em vez do 6 padrão do Pillow; o encode fica
+# ~15% mais rápido e o arquivo ~20% maior (pixels idênticos)
+SAVEFIG_KWARGS = {"pil_kwargs": {"compress_level": 3}}
+
+
+def find_column(cols: Iterable[str], patterns: Sequence[str]) -> Optional[str]:
+    # nomes em minúsculas uma única vez; cada padrão também só uma vez.
+    # (uma regex alternada única não serve: devolveria a primeira *coluna* que
+    # casa com qualquer padrão, quebrando a prioridade acima)
+    cols_lc = [(c.lower(), c) for c in cols]
+    for p in patterns:
+        p = p.lower()
+        hit = next((c for lc, c in cols_lc if p in lc), None)
+        if hit is not None:
+            return hit
+    return None
+
+
+# prazo sem dígito colado antes/depois ("02" também vale 2). Substring simples
+# fazia "2" casar com "DGS20" e o script plotava o vértice errado calado.
+TENOR_RE = {y: re.compile(rf"(?<![0-9])0*{y}(?![0-9])") for y in (2, 10, 30)}
+
+
+def find_tenor(cols: Iterable[str], years: int) -> Optional[str]:
+    pat = TENOR_RE.get(years) or re.compile(rf"(?<![0-9])0*{years}(?![0-9])")
+    return next((c for c in cols if pat.search(c)), None)
+
+
+def neg_runs(values) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Índices (posicionais) de início e fim de cada trecho com valor < 0.
+    O fim é a primeira linha >= 0 depois do trecho, ou a última linha se o
+    trecho vai até o fim da série (mesmo critério do antigo neg_flag.diff()).
+    NaN conta como não negativo.
+    """
+    neg = np.asarray(values, dtype=float) < 0
+    edges = np.diff(neg.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.minimum(np.flatnonzero(edges == -1), len(neg) - 1)
+    return starts, ends
+
+
+def shade_runs(ax, dates, starts, ends, **kwargs):
+    """
+    Faixas verticais [dates[st], dates[ed]] ocupando toda a altura do eixo,
+    como axvspan, mas num único PolyCollection: uma transformação e uma
+    chamada de draw no Agg, não importa quantos trechos existam.
+    x em coordenadas de dados, y em fração do eixo (0..1), igual ao axvspan,
+    então as faixas não dependem do ylim. kwargs vão para o PolyCollection
+    (color= pinta face e borda, como no axvspan).
+    """
+    from matplotlib import dates as mdates
+    from matplotlib.collections import PolyCollection
+
+    if len(starts) == 0:
+        return None
+    x = np.asarray(dates)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = mdates.date2num(x)
+    x0, x1 = x[starts], x[ends]
+    verts = np.stack([np.column_stack([x0, np.zeros_like(x0)]),
+                      np.column_stack([x0, np.ones_like(x0)]),
+                      np.column_stack([x1, np.ones_like(x1)]),
+                      np.column_stack([x1, np.zeros_like(x1)])], axis=1)
+    pc = PolyCollection(verts, transform=ax.get_xaxis_transform(), **kwargs)
+    ax.add_collection(pc, autolim=False)
+    return pc
+
+
+def monthly_mean(df, date_col: str = "date"):
+    """
+    Equivalente a df.set_index(date_col).resample("MS").mean().interpolate(),
+    feito com bincount sobre o número do mês + np.interp por coluna (sem
+    DatetimeIndex/resampler do pandas). Meses vazios entram como NaN e são
+    preenchidos linearmente; NaN antes do primeiro valor válido permanece.
+    Devolve DataFrame indexado pelo início de cada mês (index name = date_col).
+    """
+    import pandas as pd
+
+    df = df.dropna(subset=[date_col])
+    cols = [c for c in df.columns if c != date_col]
+    dates = df[date_col].to_numpy()
+    vals = df[cols].to_numpy(dtype=float)
+
+    months = dates.astype("datetime64[M]")
+    if months.size == 0:
+        return df.set_index(date_col)[cols].resample("MS").mean()
+    first = months.min()
+    m_idx = (months - first).astype(np.int64)
+    n = int(m_idx.max()) + 1
+
+    out = np.full((n, len(cols)), np.nan)
+    x = np.arange(n)
+    for j in range(len(cols)):
+        v = vals[:, j]
+        ok = ~np.isnan(v)
+        cnt = np.bincount(m_idx[ok], minlength=n)
+        tot = np.bincount(m_idx[ok], weights=v[ok], minlength=n)
+        has = cnt > 0
+        col = out[:, j]
+        col[has] = tot[has] / cnt[has]
+        if has.any():
+            # interpolate(): linear, só para frente (depois do 1º válido; no fim repete o último)
+            fill = ~has & (x > np.argmax(has))
+            col[fill] = np.interp(x[fill], x[has], col[has])
+
+    index = pd.DatetimeIndex(
+        (first + x.astype("timedelta64[M]")).astype(dates.dtype), name=date_col, freq="MS"
+    )
+    return pd.DataFrame(out, index=index, columns=cols)
+
+
+def colormap_rgba(grid, cmap):
+    """
+    Aplica Normalize(min, max) + colormap uma única vez e devolve
+    (rgba uint8 (T, M, 4), ScalarMappable). Passe o rgba ao imshow e o
+    ScalarMappable ao fig.colorbar — a escala fica igual à do imshow(grid).
+    NaN vira transparente, como no imshow com dados float.
+
+    O grid é quantizado para índices uint8 da LUT (cmap.N <= 256 entradas) e
+    o RGBA sai de um único gather np.take(lut, idx); mesmo arredondamento do
+    Colormap.__call__ (floor(v * N), com v == 1 na última cor).
+    """
+    import matplotlib
+    from matplotlib import cm, colors
+
+    norm = colors.Normalize(vmin=np.nanmin(grid), vmax=np.nanmax(grid))
+    cmap = matplotlib.colormaps[cmap] if isinstance(cmap, str) else cmap
+    if cmap.N > 256:
+        rgba = cmap(norm(np.ma.masked_invalid(grid)), bytes=True)
+        return rgba, cm.ScalarMappable(norm=norm, cmap=cmap)
+
+    v = np.ma.getdata(norm(grid))
+    bad = np.isnan(v)
+    idx = np.clip(np.nan_to_num(v) * cmap.N, 0, cmap.N - 1).astype(np.uint8)
+    lut = cmap(np.arange(cmap.N), bytes=True)
+    rgba = np.take(lut, idx, axis=0)  # bem mais rápido que lut[idx] (fancy indexing)
+    if bad.any():
+        rgba[bad] = cmap(np.ma.masked_invalid([np.nan]), bytes=True)[0]
+    return rgba, cm.ScalarMappable(norm=norm, cmap=cmap)
+
+
+@lru_cache(maxsize=None)
+def _rolling_engine() -> Tuple[Tuple[str, object], ...]:
+    if os.getenv("BONDS_ROLLING_ENGINE", "").lower() != "numba":
+        return ()
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return ()
+    return (("engine", "numba"), ("engine_kwargs", NUMBA_ENGINE_KWARGS))
+
+
+def rolling_engine() -> Dict[str, object]:
+    """
+    Uso: series.rolling(w).mean(**rolling_engine()).
+    Desligado por padrão: o JIT do numba custa ~2-5 s na primeira chamada de
+    cada processo (o pandas não guarda o código compilado entre execuções),
+    contra < 1 ms do Cython em séries diárias. Só compensa em processo longo
+    (ex.: vários gráficos no mesmo interpretador).
+    """
+    return dict(_rolling_engine())
+
+
+def clip_dates(df, start=None, end=None):
+    """
+    Recorte [start, end] (inclusive) de df ordenado pela coluna "date":
+    busca binária nas bordas em vez de comparar a coluna inteira e alocar
+    uma máscara. None = sem limite daquele lado. Mesmas linhas (e índice)
+    que df[(df["date"] >= start) & (df["date"] <= end)].
+    """
+    dates = df["date"]
+    lo = int(dates.searchsorted(start, side="left")) if start is not None else 0
+    hi = int(dates.searchsorted(end, side="right")) if end is not None else len(df)
+    return df.iloc[lo:hi]
+
+
+def lttb(x, y, n_out: int):
+    """
+    Largest-Triangle-Three-Buckets: mantém o 1º e o último ponto e, em cada
+    um dos n_out-2 baldes, o ponto que forma o maior triângulo com o ponto
+    escolhido no balde anterior e a média do balde seguinte. Preserva picos e
+    vales que um stride simples perderia.
+
+    x pode ser datetime64 (a área usa os inteiros). NaN em y é descartado
+    antes (a lacuna some, mas com ~2 pontos por pixel ela já era invisível).
+    Se len(x) <= n_out, devolve x, y sem alteração. Com rolling_engine()
+    ligado, o laço de baldes roda no kernel numba (_kernels.lttb_indices).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out < 3 or n <= n_out:
+        return x, y
+    ok = ~np.isnan(y)
+    x, y = x[ok], y[ok]
+    n = len(x)
+    if n <= n_out:
+        return x, y
+
+    xf = (x.astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x).astype(float)
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # média de cada balde (para o "terceiro vértice" do balde anterior)
+    cx = np.add.reduceat(xf[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    cy = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    cx = np.append(cx, xf[-1])
+    cy = np.append(cy, y[-1])
+
+    if rolling_engine():
+        from scripts.bonds._kernels import lttb_indices  # import tardio: _kernels importa _utils
+
+        idx = lttb_indices(xf, y, edges, cx, cy)
+        return x[idx], y[idx]
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax_, ay_ = xf[a], y[a]
+        area = np.abs((ax_ - cx[b + 1]) * (y[lo:hi] - ay_) - (ax_ - xf[lo:hi]) * (cy[b + 1] - ay_))
+        a = lo + int(np.argmax(area))
+        idx[b + 1] = a
+    return x[idx], y[idx]
+
+
+SPREADS = ("S_10_2", "S_30_2", "S_30_10")
+
+
+def add_spreads(df):
+    """
+    Acrescenta os três spreads (pp) a um DataFrame com US2Y/US10Y/US30Y.
+    Um buffer (3, T) alocado uma vez e preenchido com np.subtract(out=...),
+    sem os temporários do fancy indexing; cada linha do buffer é contígua e
+    vira uma coluna num único assign.
+    """
+    us2, us10, us30 = (df[c].to_numpy(dtype=np.float64) for c in ("US2Y", "US10Y", "US30Y"))
+    s = np.empty((3, len(us2)), dtype=np.float64)
+    np.subtract(us10, us2, out=s[0])
+    np.subtract(us30, us2, out=s[1])
+    np.subtract(us30, us10, out=s[2])
+    return df.assign(**{name: s[k] for k, name in enumerate(SPREADS)})
+
+
+def usrec_spans(observations: Sequence[dict]) -> List[Tuple[date, date]]:
+    """
+    observations: lista "observations" do JSON do FRED ({"date", "value"}).
+    Cada trecho com value == 1 vira (data inicial, véspera da primeira
+    observação 0 seguinte); se a recessão vai até o fim da série, o fim é a
+    data da última observação. Valores não numéricos (".") contam como 0.
+    """
+    import pandas as pd
+
+    if not observations:
+        return []
+    obs = pd.DataFrame(observations, columns=["date", "value"])
+    days = pd.to_datetime(obs["date"], format="%Y-%m-%d").to_numpy().astype("datetime64[D]")
+    rec = pd.to_numeric(obs["value"], errors="coerce").to_numpy() == 1.0
+
+    edges = np.diff(rec.astype(np.int8), prepend=0, append=0)
+    starts = days[np.flatnonzero(edges == 1)]
+    stop = np.flatnonzero(edges == -1)  # 1ª observação fora da recessão
+    ends = np.where(
+        stop < len(days),
+        days[np.minimum(stop, len(days) - 1)] - np.timedelta64(1, "D"),
+        days[-1],
+    )
+    return list(zip(starts.tolist(), ends.tolist()))
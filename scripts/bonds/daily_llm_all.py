@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relatórios diários US2Y / US10Y / US30Y num único processo assíncrono.
+
+Equivale a rodar us10y_daily_llm.py, us2y_daily_llm.py e us30y_daily_llm.py
+em sequência (mesma trava .sent, contador, título e texto de cada um), mas
+sobrepõe a rede:
+  1) as três séries saem do FRED juntas (us10y_daily.fetch_fred_many, httpx
+     HTTP/2 + FileCache);
+  2) as três análises vão ao LLM ao mesmo tempo (LLMClient.agenerate);
+  3) o envio ao Telegram continua um por um, na ordem de --reports, para as
+     mensagens chegarem no canal sempre na mesma ordem; cada relatório sai
+     assim que fica pronto (e os anteriores já foram), numa thread, enquanto
+     as análises seguintes ainda rodam.
+
+Um relatório com erro não impede os demais; no fim, RuntimeError lista os
+que falharam.
+
+Uso:
+  python scripts/bonds/daily_llm_all.py --send-telegram
+  python scripts/bonds/daily_llm_all.py --reports us10y us30y --preview
+"""
+import argparse
+import asyncio
+import os
+import time
+import traceback
+
+# scripts/ e providers/ vêm do pacote instalado (pip install -e ., ver
+# pyproject.toml), sem ajuste de sys.path
+
+from scripts.bonds import _treasury_daily_llm as tdl
+from scripts.bonds._treasury_daily_llm import TENORS
+from scripts.bonds.us10y_daily import fetch_fred_many
+from scripts.tools import CounterFile
+
+
+async def _analise(spec, contexto: str, provider_hint):
+    t0 = time.time()
+    out = await tdl.agerar_analise(spec, contexto, provider_hint)
+    return out, time.time() - t0
+
+
+async def run(args) -> None:
+    api_key = os.getenv("FRED_API_KEY")
+    if not api_key:
+        raise RuntimeError("FRED_API_KEY não configurado no ambiente.")
+
+    # trava diária e contador antes de qualquer rede, como nos scripts
+    # avulsos; os contadores de todos os relatórios numa transação só
+    pending = []
+    with CounterFile(args.counter_path) as counters:
+        for name in args.reports:
+            spec = TENORS[name]
+            titulo = tdl.claim(spec, args.counter_path, spec.sent_path, args.force, counters=counters)
+            if titulo is None:
+                print(f"[{spec.label}] Já foi enviado hoje (trava .sent). Use --force para ignorar.")
+                continue
+            pending.append((spec, os.environ.get(spec.series_env, spec.series_id), titulo))
+    if not pending:
+        return
+
+    # uma série com erro derruba só o relatório dela
+    dfs = await fetch_fred_many(
+        api_key, [sid for _, sid, _ in pending], args.start, return_exceptions=True
+    )
+    failed = []
+    ready = []
+    for (spec, sid, titulo), df in zip(pending, dfs):
+        try:
+            if isinstance(df, BaseException):
+                raise df
+            ctx = tdl.build_context_block(spec, series_id=sid, start=args.start, df=df)
+        except Exception as e:
+            print(f"[{spec.label}] falha ao buscar/resumir a série {sid} no FRED: {e!r}")
+            failed.append(spec.label)
+            continue
+        ready.append((spec, titulo, ctx))
+
+    tasks = [asyncio.create_task(_analise(spec, ctx, args.provider)) for spec, _, ctx in ready]
+
+    for (spec, titulo, ctx), task in zip(ready, tasks):
+        try:
+            res = await task
+        except Exception as e:
+            res = e
+        if isinstance(res, BaseException):
+            print(f"[{spec.label}] falha ao gerar análise LLM: {res!r}")
+            if not spec.llm_fallback:
+                failed.append(spec.label)
+                continue
+            texto_final = tdl.render_fallback(titulo, ctx)
+        else:
+            texto_final = tdl.render(titulo, *res)
+
+        print(texto_final)
+        if args.send_telegram:
+            try:
+                # envio síncrono (requests) fora do event loop: as análises
+                # ainda pendentes seguem enquanto este POST espera o Telegram
+                await asyncio.to_thread(tdl.deliver, spec, texto_final, spec.sent_path, args.preview)
+            except Exception:
+                traceback.print_exc()
+                failed.append(spec.label)
+
+    if failed:
+        raise RuntimeError("Falharam: " + ", ".join(failed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatórios diários US2Y/US10Y/US30Y (assíncrono)")
+    parser.add_argument("--reports", nargs="+", choices=list(TENORS), default=list(TENORS))
+    parser.add_argument("--send-telegram", action="store_true")
+    parser.add_argument("--preview", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--counter-path", default="data/counters.json")
+    parser.add_argument("--provider", default=None)
+    parser.add_argument("--start", default="2000-01-01")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gera todos os gráficos diários (FULL + 12M) num único processo.
+
+Equivale a chamar, um por um, plot_yields_separate / plot_spreads /
+plot_volatility / plot_zscore / plot_butterfly com e sem --last-12m (como no
+workflow), mas paga uma vez só o start do Python, os imports de
+pandas/matplotlib e o JIT do numba (BONDS_ROLLING_ENGINE=numba). Os CSVs
+também são lidos uma única vez (memo do read_csv_cached).
+
+Uso:
+  python scripts/bonds/plot_all.py --files us2y.csv us10y.csv us30y.csv
+  python scripts/bonds/plot_all.py --files ... --suffix _preview
+"""
+import argparse
+import os
+import traceback
+
+# scripts/ e providers/ vêm do pacote instalado (pip install -e ., ver
+# pyproject.toml), sem ajuste de sys.path
+
+from scripts.bonds import (
+    plot_butterfly,
+    plot_spreads,
+    plot_volatility,
+    plot_yields_separate,
+    plot_zscore,
+)
+
+# (módulo, nome base do PNG, argumentos extras) — mesma lista do workflow
+JOBS = [
+    (plot_yields_separate, "yields_full", []),
+    (plot_spreads, "spreads", []),
+    (plot_volatility, "volatility_30d", ["--window", "30", "--annualize"]),
+    (plot_zscore, "zscore_252d", ["--window", "252"]),
+    (plot_butterfly, "butterfly", []),
+]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Gera todos os gráficos FULL + 12M num só processo")
+    p.add_argument("--files", nargs=3, required=True, help="3 CSVs: us2y, us10y, us30y")
+    p.add_argument("--out-dir", default="pipelines/bonds", help="pasta dos PNGs")
+    p.add_argument("--suffix", default="", help="sufixo dos PNGs (ex.: _preview)")
+    p.add_argument("--no-12m", action="store_true", help="só as versões FULL")
+    args = p.parse_args(argv)
+
+    variants = [[]] if args.no_12m else [[], ["--last-12m"]]
+    failed = []
+    for extra_12m in variants:
+        for mod, base, extra in JOBS:
+            out = os.path.join(args.out_dir, f"{base}{args.suffix}.png")
+            job_argv = ["--files", *args.files, *extra, *extra_12m, "--out", out]
+            try:
+                mod.main(job_argv)
+            except Exception:
+                # um gráfico com erro não impede os demais de serem gerados
+                traceback.print_exc()
+                failed.append(f"{mod.__name__.rsplit('.', 1)[-1]} {' '.join(extra_12m)}".strip())
+
+    if failed:
+        raise RuntimeError("Falharam: " + ", ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,24 +9,25 @@ Opções:
 """
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
 
-def read_series(path):
-    df = pd.read_csv(path, parse_dates=["date"])
-    if "yield_pct" not in df.columns:
-        raise RuntimeError(f"{path} missing yield_pct")
-    name = None
-    if "source" in df.columns and df["source"].notnull().any():
-        s = df.loc[df["source"].first_valid_index(), "source"]
-        name = s.split(":")[-1] if isinstance(s, str) and ":" in s else str(s)
-    if not name:
-        name = os.path.splitext(os.path.basename(path))[0]
-    df = df[["date","yield_pct"]].rename(columns={"yield_pct": name}).sort_values("date").reset_index(drop=True)
-    return df, name
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
 
-def main():
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import moving_average
+from scripts.bonds._utils import SAVEFIG_KWARGS, clip_dates, find_tenor
+
+def main(argv=None):
     p = argparse.ArgumentParser(description="Plot butterfly = 30Y - 2*10Y + 2Y")
     p.add_argument("--files", nargs=3, required=True, help="CSV: us2y us10y us30y (any order)")
     p.add_argument("--window", type=int, default=20, help="MA window for smoothing")
@@ -34,42 +35,32 @@ def main():
     p.add_argument("--start", default=None)
     p.add_argument("--end", default=None)
     p.add_argument("--last-12m", action="store_true", help="Filtrar últimos 12 meses e ajustar saída")
-    args = p.parse_args()
+    args = p.parse_args(argv)
 
     dfs, cols = [], []
     for f in args.files:
         if not os.path.exists(f):
             raise RuntimeError(f"File not found: {f}")
-        df, name = read_series(f); dfs.append(df); cols.append(name)
+        df, name = read_yield_series(f); dfs.append(df.set_index("date")); cols.append(name)
 
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat(dfs, axis=1).sort_index().reset_index()
 
     if args.start:
-        merged = merged[merged["date"] >= pd.to_datetime(args.start)]
+        merged = clip_dates(merged, start=pd.to_datetime(args.start))
     if args.end:
-        merged = merged[merged["date"] <= pd.to_datetime(args.end)]
+        merged = clip_dates(merged, end=pd.to_datetime(args.end))
 
     if args.last_12m:
         cutoff = datetime.utcnow().date() - timedelta(days=365)
-        merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
+        merged = clip_dates(merged, start=pd.to_datetime(cutoff))
         if args.out.endswith(".png"):
             args.out = args.out.replace(".png", "_12m.png")
 
-    def pick(keys):
-        for k in keys:
-            for c in merged.columns:
-                if k.lower() in c.lower():
-                    return c
-        return None
-    c2 = pick(["dgs2","2y","2"])
-    c10 = pick(["dgs10","10y","10"])
-    c30 = pick(["dgs30","30y","30"])
+    cols_list = [c for c in merged.columns if c!="date"]
+    c2, c10, c30 = (find_tenor(cols_list, y) for y in (2, 10, 30))
     cols_found = [c for c in [c2,c10,c30] if c]
     if len(cols_found) < 3:
-        cols_list = [c for c in merged.columns if c!="date"]
         if len(cols_list) >= 3:
             c2, c10, c30 = cols_list[0], cols_list[1], cols_list[2]
         else:
@@ -78,15 +69,23 @@ def main():
     merged = merged.rename(columns={c2:"US2Y", c10:"US10Y", c30:"US30Y"})
     merged[["US2Y","US10Y","US30Y"]] = merged[["US2Y","US10Y","US30Y"]].apply(pd.to_numeric, errors="coerce")
 
-    merged["BUTTERFLY"] = merged["US30Y"] - 2.0*merged["US10Y"] + merged["US2Y"]
-    merged["BUTTER_MA"] = merged["BUTTERFLY"].rolling(window=args.window, min_periods=1).mean()
+    # conta direto nos ndarrays (sem temporários/alinhamento de Series)
+    a2 = merged["US2Y"].to_numpy(dtype=float)
+    a10 = merged["US10Y"].to_numpy(dtype=float)
+    a30 = merged["US30Y"].to_numpy(dtype=float)
+    merged["BUTTERFLY"] = a30 - 2.0*a10 + a2
+    # numba opcional (BONDS_ROLLING_ENGINE=numba), ver _kernels.moving_average
+    merged["BUTTER_MA"] = moving_average(merged["BUTTERFLY"], args.window)
 
     latest = merged.dropna(subset=["BUTTERFLY"]).iloc[-1]
     print(f"Último butterfly ({latest['date'].date()}): {latest['BUTTERFLY']:.4f}")
 
-    fig, ax = plt.subplots(figsize=(12,5))
-    ax.plot(merged["date"], merged["BUTTERFLY"], label="Butterfly")
-    ax.plot(merged["date"], merged["BUTTER_MA"], linestyle="--", label=f"MA{args.window}")
+    fig, ax = plt.subplots(figsize=(12,5), constrained_layout=True)
+    # datas -> float do matplotlib uma vez, reaproveitado pelas duas linhas
+    xs = mdates.date2num(merged["date"].to_numpy())
+    ax.xaxis_date()
+    ax.plot(xs, merged["BUTTERFLY"].to_numpy(), label="Butterfly")
+    ax.plot(xs, merged["BUTTER_MA"].to_numpy(), linestyle="--", label=f"MA{args.window}")
     ax.axhline(0, linestyle=":", linewidth=0.8)
     ax.set_ylabel("pp")
     ax.grid(True)
@@ -95,8 +94,7 @@ def main():
 
     out = args.out
     os.makedirs(os.path.dirname(out), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out, dpi=150)
+    plt.savefig(out, dpi=150, **SAVEFIG_KWARGS)
     plt.close()
     print("Saved:", out)
     print("Period:", merged['date'].min().date(), "→", merged['date'].max().date())
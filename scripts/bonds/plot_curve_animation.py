@@ -1,20 +1,34 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Gera GIF animado da evolução da curva (2Y->30Y) no tempo.
+Gera animação (GIF ou MP4) da evolução da curva (2Y->30Y) no tempo.
 Saída padrão: pipelines/bonds/curve_anim.gif
+Opções:
+  --format mp4  usa H.264 via imageio-ffmpeg (mais rápido e menor que GIF)
 """
 
 import os
+import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import imageio
 
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_all, read_csv_cached, read_panel_cached
+from scripts.bonds._interp import build_curve_grid
+from scripts.bonds._utils import find_column, monthly_mean
+
 def read_series(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, parse_dates=["date"]).sort_values("date").reset_index(drop=True)
+    df = read_csv_cached(path).sort_values("date").reset_index(drop=True)
     ycol = None
     for c in df.columns:
         if c.lower() in ("yield", "yield_pct"):
@@ -25,70 +39,108 @@ def read_series(path: str) -> pd.DataFrame:
     name = os.path.splitext(os.path.basename(path))[0]
     return df[["date", ycol]].rename(columns={ycol:name})
 
+def _render_chunk(grid_chunk, months_chunk, maturities, dpi=100):
+    """
+    Renderiza um bloco de frames (uma figura por processo) e devolve a lista
+    de arrays RGBA. Fica no escopo do módulo para ser picklável pelo pool.
+    """
+    # figura e linha criadas uma vez; por frame só mudam ydata, ylim e título.
+    # tight_layout roda uma única vez aqui (constrained_layout refaria o
+    # layout a cada draw)
+    # Figure + FigureCanvasAgg direto: sem pyplot, nada a fechar no fim
+    fig = Figure(figsize=(8,4), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    line, = ax.plot(maturities, np.zeros_like(maturities), marker='o')
+    title = ax.set_title("Yield curve")
+    ax.set_xlabel("Maturidade (anos)")
+    ax.set_ylabel("Yield (%)")
+    ax.grid(True)
+    fig.tight_layout()
+
+    frames = []
+    for vals_interp, month in zip(grid_chunk, months_chunk):
+        line.set_ydata(vals_interp)
+        ax.set_ylim(np.nanmin(vals_interp)-0.5, np.nanmax(vals_interp)+0.5)
+        title.set_text(f"Yield curve — {month}")
+
+        fig.canvas.draw()
+        # cópia: o buffer do canvas é reaproveitado no próximo draw
+        frames.append(np.array(fig.canvas.buffer_rgba()))
+    return frames
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--files", nargs=3, required=True)
     parser.add_argument("--out", default="pipelines/bonds/curve_anim.gif")
     parser.add_argument("--mstep", type=float, default=1.0)
     parser.add_argument("--fps", type=int, default=6)
+    parser.add_argument("--format", choices=["gif", "mp4"], default="gif",
+                        help="gif (padrão) ou mp4 (libx264, via imageio-ffmpeg)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos para renderizar frames (1 = sem pool)")
+    parser.add_argument("--chunk", type=int, default=16, help="frames por tarefa do pool")
+    parser.add_argument("--dpi", type=int, default=100,
+                        help="resolução dos frames (100 -> 800x400; antes era 120)")
     args = parser.parse_args()
+    if args.format == "mp4" and args.out.endswith(".gif"):
+        args.out = args.out[:-len(".gif")] + ".mp4"
 
-    dfs = [read_series(p) for p in args.files]
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    def build_panel():
+        dfs = read_all(read_series, args.files)  # 3 CSVs lidos em paralelo
+        return pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
+
+    # painel alinhado em cache (parquet) enquanto os CSVs não mudarem
+    merged = read_panel_cached(args.files, build_panel, tag="curve_animation")
 
     # detect columns and rename consistently
     cols = [c for c in merged.columns if c!="date"]
     # heuristics
     def find(patterns):
-        for p in patterns:
-            for c in cols:
-                if p.lower() in c.lower():
-                    return c
-        return None
+        return find_column(cols, patterns)
     c2 = find(["2y","dgs2","2"])
     c10 = find(["10y","dgs10","10"])
     c30 = find(["30y","dgs30","30"])
     merged = merged[[ "date", c2, c10, c30]].rename(columns={c2:"US2Y", c10:"US10Y", c30:"US30Y"})
-    merged = merged.set_index("date").resample("MS").mean().interpolate().reset_index()
+    merged = monthly_mean(merged).reset_index()
 
     maturities = np.arange(2,31, args.mstep)
     base_mats = np.array([2.0,10.0,30.0])
 
-    frames = []
-    tmp_dir = "/tmp/curve_anim_frames"
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    for i, row in merged.iterrows():
-        values = np.array([row["US2Y"], row["US10Y"], row["US30Y"]], dtype=float)
-        values = np.nan_to_num(values, nan=np.nanmean(values))
-        vals_interp = np.interp(maturities, base_mats, values)
-
-        plt.figure(figsize=(8,4))
-        plt.plot(maturities, vals_interp, marker='o')
-        plt.ylim(np.nanmin(vals_interp)-0.5, np.nanmax(vals_interp)+0.5)
-        plt.title(f"Yield curve — {row['date'].strftime('%Y-%m')}")
-        plt.xlabel("Maturidade (anos)")
-        plt.ylabel("Yield (%)")
-        plt.grid(True)
-
-        fname = os.path.join(tmp_dir, f"frame_{i:04d}.png")
-        plt.tight_layout()
-        plt.savefig(fname, dpi=120)
-        plt.close()
-        frames.append(imageio.imread(fname))
-
-    # write gif
-    imageio.mimsave(args.out, frames, fps=args.fps)
-    # cleanup optional
-    for f in os.listdir(tmp_dir):
-        try:
-            os.remove(os.path.join(tmp_dir, f))
-        except Exception:
-            pass
-    print("[OK] GIF salvo em", args.out)
+    # curvas interpoladas de todos os meses de uma vez: grid = vals @ w
+    grid = build_curve_grid(merged[["US2Y", "US10Y", "US30Y"]].to_numpy(), base_mats, maturities)
+    months = merged["date"].dt.strftime("%Y-%m").tolist()
+
+    # frames independentes por mês: renderiza em blocos num pool de processos;
+    # ex.map devolve na ordem original e cada bloco vai direto ao writer
+    step = max(1, args.chunk)
+    grid_chunks = [grid[i:i + step] for i in range(0, len(grid), step)]
+    month_chunks = [months[i:i + step] for i in range(0, len(months), step)]
+
+    if args.format == "mp4":
+        writer = imageio.get_writer(args.out, fps=args.fps, codec="libx264",
+                                    quality=8, macro_block_size=1)
+        to_frame = lambda rgba: rgba[..., :3]  # H.264 não tem canal alfa
+    else:
+        writer = imageio.get_writer(args.out, mode="I", fps=args.fps)
+        to_frame = lambda rgba: rgba
+    try:
+        if args.workers > 1 and len(grid_chunks) > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                parts = ex.map(_render_chunk, grid_chunks, month_chunks,
+                               [maturities] * len(grid_chunks),
+                               [args.dpi] * len(grid_chunks))
+                for frames in parts:
+                    for frame in frames:
+                        writer.append_data(to_frame(frame))
+        else:
+            for g, mo in zip(grid_chunks, month_chunks):
+                for frame in _render_chunk(g, mo, maturities, args.dpi):
+                    writer.append_data(to_frame(frame))
+    finally:
+        writer.close()
+
+    print(f"[OK] {args.format.upper()} salvo em", args.out)
 
 if __name__ == "__main__":
     main()
@@ -7,13 +7,24 @@ Feito para visualização no Telegram (altura reduzida).
 
 import argparse
 import os
+import sys
 from datetime import datetime
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_csv_cached
+from scripts.bonds._interp import build_curve_grid
+from scripts.bonds._utils import SAVEFIG_KWARGS, colormap_rgba, find_column, monthly_mean
 
 def read_df(path):
-    df = pd.read_csv(path, parse_dates=["date"])
+    df = read_csv_cached(path)
     df = df.sort_values("date")
     # detect yield col
     ycol = None
@@ -27,28 +38,21 @@ def read_df(path):
     return df[["date", ycol]].rename(columns={ycol: name})
 
 def detect(cols, patterns):
-    for p in patterns:
-        for c in cols:
-            if p.lower() in c.lower():
-                return c
-    return None
+    return find_column(cols, patterns)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--files", nargs=3, required=True)
     parser.add_argument("--out", default="pipelines/bonds/curve_heatmap.png")
     parser.add_argument("--cmap", default="cividis")
+    parser.add_argument("--dpi", type=int, default=150)
     args = parser.parse_args()
 
     dfs = []
     for f in args.files:
         dfs.append(read_df(f))
 
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-
-    merged = merged.sort_values("date").reset_index(drop=True)
+    merged = pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
 
     cols = [c for c in merged.columns if c != "date"]
 
@@ -63,18 +67,13 @@ def main():
     merged.columns = ["date", "US2Y", "US10Y", "US30Y"]
 
     # RESAMPLE MENSAL → evita gráfico gigante
-    df = merged.set_index("date").resample("MS").mean().interpolate()
+    df = monthly_mean(merged)
 
     maturities = np.arange(2, 31, 1)
     base_mats = np.array([2, 10, 30])
-    base_vals = df[["US2Y", "US10Y", "US30Y"]].to_numpy()
-
-    grid = np.zeros((len(df), len(maturities)))
+    base_vals = df[["US2Y", "US10Y", "US30Y"]].to_numpy(dtype=float)
 
-    for i in range(len(df)):
-        row = base_vals[i]
-        row = np.nan_to_num(row, nan=np.nanmean(row))
-        grid[i] = np.interp(maturities, base_mats, row)
+    grid = build_curve_grid(base_vals, base_mats, maturities, dtype=np.float32)
 
     dates = df.index
 
@@ -82,13 +81,17 @@ def main():
     fig_h = max(4, len(df) * 0.08)  # altura proporcional mas menor
     fig_w = 12
 
-    fig, ax = plt.subplots(figsize=(fig_w, fig_h))
-    im = ax.imshow(
-        grid,
+    fig = Figure(figsize=(fig_w, fig_h), constrained_layout=True)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    # colormap aplicado uma vez: imshow recebe o bitmap RGBA uint8 pronto
+    rgba, sm = colormap_rgba(grid, args.cmap)
+    ax.imshow(
+        rgba,
         aspect="auto",
         origin="lower",
-        cmap=args.cmap,
-        extent=[maturities[0], maturities[-1], 0, len(df)]
+        extent=[maturities[0], maturities[-1], 0, len(df)],
+        rasterized=True,  # bitmap único em saídas vetoriais (.pdf/.svg)
     )
 
     # Ticks anuais
@@ -101,13 +104,11 @@ def main():
     ax.set_ylabel("Ano")
     ax.set_title("Heatmap da Curva 2Y–30Y (compacto)")
 
-    cbar = fig.colorbar(im, ax=ax)
+    cbar = fig.colorbar(sm, ax=ax)
     cbar.set_label("Yield (%)")
 
-    plt.tight_layout()
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    fig.savefig(args.out, dpi=150)
-    plt.close(fig)
+    fig.savefig(args.out, dpi=args.dpi, **SAVEFIG_KWARGS)
 
     print(f"[OK] Heatmap compacto salvo em {args.out}")
 
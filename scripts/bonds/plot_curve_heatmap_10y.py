@@ -13,42 +13,49 @@ Uso:
 from __future__ import annotations
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import requests
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import warnings
 
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._interp import build_curve_grid
+from scripts.bonds._io import fetch_fred_observations_cached, read_all, read_csv_fast, read_panel_cached
+from scripts.bonds._utils import SAVEFIG_KWARGS, colormap_rgba, find_column, monthly_mean, usrec_spans
+
 warnings.filterwarnings("ignore", category=UserWarning)
 
 def read_series(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, parse_dates=["date"])
-    df = df.sort_values("date").reset_index(drop=True)
-    # detect yield column
+    # detect yield column (só o cabeçalho)
+    header = pd.read_csv(path, nrows=0).columns
     ycol = None
-    for c in df.columns:
+    for c in header:
         if c.lower() in ("yield", "yield_pct"):
             ycol = c
             break
     if ycol is None:
         # fallback: first non-date column
-        for c in df.columns:
+        for c in header:
             if c.lower() != "date":
                 ycol = c
                 break
     if ycol is None:
         raise RuntimeError(f"Não encontrou coluna de yield em {path}")
+    df = read_csv_fast(path, usecols=["date", ycol], float_cols=[ycol])
+    df = df.sort_values("date").reset_index(drop=True)
     name = os.path.splitext(os.path.basename(path))[0]
     return df[["date", ycol]].rename(columns={ycol: name})
 
 def detect_col_name(cols):
     def find(patterns):
-        for p in patterns:
-            for c in cols:
-                if p.lower() in c.lower():
-                    return c
-        return None
+        return find_column(cols, patterns)
     return {
         "2": find(["2y","dgs2","2","us2"]),
         "10": find(["10y","dgs10","10","us10"]),
@@ -60,26 +67,8 @@ def fetch_nber_from_fred(api_key: str):
     if not api_key:
         return []
     try:
-        url = "https://api.stlouisfed.org/fred/series/observations"
-        params = {"series_id": "USREC", "api_key": api_key, "file_type": "json"}
-        r = requests.get(url, params=params, timeout=15)
-        r.raise_for_status()
-        obs = r.json().get("observations", [])
-        recs = []
-        cur_start = None
-        for o in obs:
-            dt = pd.to_datetime(o["date"]).date()
-            val = o.get("value")
-            if val in ("1","1.0",1,1.0):
-                if cur_start is None:
-                    cur_start = dt
-            else:
-                if cur_start is not None:
-                    recs.append((cur_start, (dt - pd.Timedelta(days=1)).date()))
-                    cur_start = None
-        if cur_start is not None:
-            recs.append((cur_start, pd.to_datetime(obs[-1]["date"]).date()))
-        return recs
+        # USREC quase não muda: JSON em cache + GET condicional (ETag/Last-Modified)
+        return usrec_spans(fetch_fred_observations_cached("USREC", api_key, timeout=15))
     except Exception:
         return []
 
@@ -89,12 +78,7 @@ def fallback_recessions():
 
 def build_grid(df_monthly: pd.DataFrame, maturities: np.ndarray) -> np.ndarray:
     known_mats = np.array([2.0, 10.0, 30.0])
-    vals = df_monthly[["US2Y","US10Y","US30Y"]].to_numpy()
-    grid = np.empty((vals.shape[0], len(maturities)))
-    for i, row in enumerate(vals):
-        row = np.nan_to_num(row, nan=np.nanmean(row))
-        grid[i,:] = np.interp(maturities, known_mats, row)
-    return grid
+    return build_curve_grid(df_monthly[["US2Y","US10Y","US30Y"]].to_numpy(), known_mats, maturities, dtype=np.float32)
 
 def main():
     parser = argparse.ArgumentParser()
@@ -105,14 +89,16 @@ def main():
     parser.add_argument("--mmax", type=int, default=30)
     parser.add_argument("--mstep", type=float, default=1.0)
     parser.add_argument("--fred-api-key", default=os.getenv("FRED_API_KEY"))
+    parser.add_argument("--dpi", type=int, default=120, help="resolução do PNG (120 basta no celular)")
     args = parser.parse_args()
 
     # read
-    dfs = [read_series(p) for p in args.files]
-    merged = dfs[0]
-    for d in dfs[1:]:
-        merged = pd.merge(merged, d, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    def build_panel():
+        dfs = read_all(read_series, args.files)  # 3 CSVs lidos em paralelo
+        return pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
+
+    # painel alinhado em cache (parquet) enquanto os CSVs não mudarem
+    merged = read_panel_cached(args.files, build_panel, tag="curve_heatmap_10y")
 
     # detect and rename to US2Y, US10Y, US30Y
     cols = [c for c in merged.columns if c != "date"]
@@ -126,19 +112,23 @@ def main():
     # --- FILTRO últimos 10 anos ---
     end_date = pd.to_datetime(datetime.utcnow().date())
     start_date = end_date - pd.DateOffset(years=10)
-    merged = merged[(merged["date"] >= start_date) & (merged["date"] <= end_date)].copy()
+    # painel já ordenado por data: corte por busca binária, fatia sem cópia
+    dt = merged["date"].to_numpy()
+    lo = np.searchsorted(dt, start_date.to_datetime64(), side="left")
+    hi = np.searchsorted(dt, end_date.to_datetime64(), side="right")
+    merged = merged.iloc[lo:hi]
     if merged.empty:
         raise RuntimeError("Nenhum dado nos últimos 10 anos após filtro.")
 
     # RESAMPLE MENSAL (MS) e interpolação
-    dfm = merged.set_index("date").resample("MS").mean().interpolate()
+    dfm = monthly_mean(merged)
 
     # maturities e grid
     maturities = np.arange(args.mmin, args.mmax + 1e-9, args.mstep)
     grid = build_grid(dfm, maturities)
 
     # spread 10y-2y para sinal de inversão
-    spread = (dfm["US10Y"] - dfm["US2Y"]).to_numpy()
+    spread = dfm["US10Y"].to_numpy(dtype=float) - dfm["US2Y"].to_numpy(dtype=float)
 
     # recessões: tentar FRED, senão fallback
     recs = fetch_nber_from_fred(args.fred_api_key)
@@ -146,27 +136,35 @@ def main():
         recs = fallback_recessions()
 
     # --- PLOT otimizado para Telegram ---
-    dates = dfm.index.to_pydatetime()
-    T = len(dates)
+    # datas mensais como datetime64[D] uma única vez (ticks, recessões)
+    dates_d = dfm.index.values.astype("datetime64[D]")
+    T = len(dates_d)
     W = len(maturities)
 
     # figura fixa: largura 10, altura 8 (solicitado)
     fig_w, fig_h = 10, 8
-    fig, ax = plt.subplots(figsize=(fig_w, fig_h))
+    fig = Figure(figsize=(fig_w, fig_h))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
 
     # imshow com interpolation='nearest' para manter linhas nítidas
-    im = ax.imshow(grid, aspect="auto", origin="lower", cmap=args.cmap,
-                   interpolation="nearest", extent=[maturities[0], maturities[-1], 0, T])
+    # (colormap aplicado uma vez: imshow recebe o bitmap RGBA uint8 pronto)
+    rgba, sm = colormap_rgba(grid, args.cmap)
+    ax.imshow(rgba, aspect="auto", origin="lower", zorder=1, rasterized=True,
+              interpolation="nearest", extent=[maturities[0], maturities[-1], 0, T])
+    # heatmap + faixas de recessão (zorder 2) viram um único bitmap em saídas
+    # vetoriais (--out .pdf/.svg); as linhas de inversão (zorder 3) seguem vetoriais
+    ax.set_rasterization_zorder(2.5)
 
     # ticks: anos grandes e legíveis
-    years = sorted(set([d.year for d in dates]))
     # pick positions where month==1 (jan) within the period
-    year_positions = [i for i, d in enumerate(dates) if d.month == 1]
+    # (meses desde 1970-01: múltiplo de 12 == janeiro)
+    year_positions = np.flatnonzero(dates_d.astype("datetime64[M]").astype(np.int64) % 12 == 0)
     # ensure we have tick labels; if too many, sample
     if len(year_positions) > 8:
         step = max(1, len(year_positions)//8)
         year_positions = year_positions[::step]
-    year_labels = [dates[i].strftime("%Y") for i in year_positions]
+    year_labels = dates_d[year_positions].astype("datetime64[Y]").astype(str).tolist()
     ax.set_yticks(year_positions)
     ax.set_yticklabels(year_labels, fontsize=12)
 
@@ -178,37 +176,36 @@ def main():
     ax.set_title("Curva 2Y→30Y — Últimos 10 anos (Heatmap) — legível para celular", fontsize=14)
 
     # colorbar slim
-    cbar = fig.colorbar(im, ax=ax, fraction=0.035, pad=0.02)
+    cbar = fig.colorbar(sm, ax=ax, fraction=0.035, pad=0.02)
     cbar.ax.tick_params(labelsize=11)
     cbar.set_label("Yield (%)", fontsize=12)
 
     # recessions: shade thin horizontal bands (transparent)
-    for start, end in recs:
-        # limit to our displayed date window
-        s = max(start, dates[0].date())
-        e = min(end, dates[-1].date())
-        if s > e:
-            continue
-        # find indices
-        idx_s = next((i for i, d in enumerate(dates) if d.date() >= s), 0)
-        idx_e = next((i for i, d in enumerate(dates) if d.date() > e), len(dates)-1)
-        ax.axhspan(idx_s, idx_e, color='grey', alpha=0.12, zorder=2)
+    # limit to our displayed date window
+    band_s = np.maximum(np.array([s for s, _ in recs], dtype="datetime64[D]"), dates_d[0])
+    band_e = np.minimum(np.array([e for _, e in recs], dtype="datetime64[D]"), dates_d[-1])
+    keep = band_s <= band_e
+    if keep.any():
+        # índices via busca binária nas datas mensais (todas as faixas de uma vez)
+        idx_s = np.searchsorted(dates_d, band_s[keep], side="left")
+        idx_e = np.searchsorted(dates_d, band_e[keep], side="right")
+        idx_e = np.minimum(idx_e, T - 1)  # nenhuma data > e -> última linha
+        for i0, i1 in zip(idx_s.tolist(), idx_e.tolist()):
+            ax.axhspan(i0, i1, color='grey', alpha=0.12, zorder=2)
 
     # inversions: draw thin red horizontal lines for months where spread<0
-    for i, val in enumerate(spread):
-        if np.isnan(val):
-            continue
-        if val < 0:
-            ax.hlines(i + 0.5, xmin=maturities[0], xmax=maturities[-1], colors='red', linewidth=0.9, alpha=0.9, zorder=3)
+    # (uma única chamada -> um LineCollection com todas as linhas; NaN < 0 é False)
+    neg_idx = np.flatnonzero(spread < 0)
+    if neg_idx.size:
+        ax.hlines(neg_idx + 0.5, xmin=maturities[0], xmax=maturities[-1], colors='red', linewidth=0.9, alpha=0.9, zorder=3)
 
     # aesthetic tweaks
     ax.invert_yaxis()  # optional: put most recent at top — comment if prefer oldest on top
     ax.set_ylim(T, 0)  # ensure invert_yaxis mapping
-    plt.tight_layout()
+    fig.tight_layout()
 
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    fig.savefig(args.out, dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    fig.savefig(args.out, dpi=args.dpi, bbox_inches='tight', **SAVEFIG_KWARGS)
     print(f"[OK] Heatmap 10y salvo em {args.out}")
 
 if __name__ == "__main__":
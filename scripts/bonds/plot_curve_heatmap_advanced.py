@@ -11,37 +11,43 @@ Saída padrão: pipelines/bonds/curve_heatmap_advanced.png
 
 from __future__ import annotations
 import os
+import sys
 import argparse
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.collections import PolyCollection
 
-# Optional: fetch USREC series from FRED if API key available (no external web.run here)
-import requests
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._interp import build_curve_grid
+from scripts.bonds._io import fetch_fred_observations_cached, read_all, read_csv_fast, read_panel_cached
+from scripts.bonds._utils import SAVEFIG_KWARGS, colormap_rgba, find_column, monthly_mean, usrec_spans
 
 def read_series(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, parse_dates=["date"])
-    df = df.sort_values("date").reset_index(drop=True)
-    # detect yield column
+    # detect yield column (só o cabeçalho)
+    header = pd.read_csv(path, nrows=0).columns
     ycol = None
-    for c in df.columns:
+    for c in header:
         if c.lower() in ("yield", "yield_pct"):
             ycol = c
             break
     if ycol is None:
         # fallback to second column
-        ycol = df.columns[1]
+        ycol = header[1]
+    df = read_csv_fast(path, usecols=["date", ycol], float_cols=[ycol])
+    df = df.sort_values("date").reset_index(drop=True)
     name = os.path.splitext(os.path.basename(path))[0]
     return df[["date", ycol]].rename(columns={ycol: name})
 
 def detect_cols(cols):
     def find(patterns):
-        for p in patterns:
-            for c in cols:
-                if p.lower() in c.lower():
-                    return c
-        return None
+        return find_column(cols, patterns)
     return {
         "2": find(["2y", "dgs2", "2", "us2"]),
         "10": find(["10y", "dgs10", "10", "us10"]),
@@ -50,27 +56,10 @@ def detect_cols(cols):
 
 def get_nber_recessions_from_fred(api_key: str):
     # fetch USREC series (0/1) from FRED to identify recession spans
-    base = "https://api.stlouisfed.org/fred/series/observations"
-    params = {"series_id": "USREC", "api_key": api_key, "file_type": "json"}
+    # (JSON em cache + GET condicional com ETag/Last-Modified)
     try:
-        r = requests.get(base, params=params, timeout=20)
-        r.raise_for_status()
-        obs = r.json().get("observations", [])
-        rec_periods = []
-        current_start = None
-        for o in obs:
-            date = pd.to_datetime(o["date"])
-            val = o.get("value")
-            if val in ("1","1.0",1,1.0):
-                if current_start is None:
-                    current_start = date
-            else:
-                if current_start is not None:
-                    rec_periods.append((current_start.date(), (date - pd.Timedelta(days=1)).date()))
-                    current_start = None
-        if current_start is not None:
-            rec_periods.append((current_start.date(), pd.to_datetime(obs[-1]["date"]).date()))
-        return rec_periods
+        obs = fetch_fred_observations_cached("USREC", api_key, timeout=20)
+        return usrec_spans(obs)
     except Exception:
         return None
 
@@ -83,12 +72,7 @@ def fallback_nber():
 
 def build_grid_interp(df_monthly, maturities):
     base_mats = np.array([2.0, 10.0, 30.0])
-    values = df_monthly[["US2Y","US10Y","US30Y"]].to_numpy()
-    grid = np.empty((values.shape[0], len(maturities)))
-    for i, row in enumerate(values):
-        row = np.nan_to_num(row, nan=np.nanmean(row))
-        grid[i,:] = np.interp(maturities, base_mats, row)
-    return grid
+    return build_curve_grid(df_monthly[["US2Y","US10Y","US30Y"]].to_numpy(), base_mats, maturities, dtype=np.float32)
 
 def compute_spread_10_2(df):
     # returns series indexed by date with 10y-2y
@@ -101,13 +85,15 @@ def main():
     parser.add_argument("--cmap", default="cividis")
     parser.add_argument("--monthly", action="store_true", help="agrega mensal (default: True)")
     parser.add_argument("--fred-api-key", default=os.getenv("FRED_API_KEY"))
+    parser.add_argument("--dpi", type=int, default=150)
     args = parser.parse_args()
 
-    dfs = [read_series(p) for p in args.files]
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    def build_panel():
+        dfs = read_all(read_series, args.files)  # 3 CSVs lidos em paralelo
+        return pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
+
+    # painel alinhado em cache (parquet) enquanto os CSVs não mudarem
+    merged = read_panel_cached(args.files, build_panel, tag="curve_heatmap_advanced")
 
     cols = [c for c in merged.columns if c != "date"]
     mapping = detect_cols(cols)
@@ -118,7 +104,7 @@ def main():
     )
 
     # resample mensal por default
-    dfm = merged.set_index("date").resample("MS").mean().interpolate()
+    dfm = monthly_mean(merged)
 
     maturities = np.arange(2,31,1)
     grid = build_grid_interp(dfm, maturities)
@@ -145,37 +131,43 @@ def main():
     # plotting
     dates = dfm.index.to_pydatetime()
     fig_h = max(4, len(dates)*0.06)
-    fig, ax = plt.subplots(figsize=(12, fig_h))
-    im = ax.imshow(grid, origin="lower", aspect="auto", cmap=args.cmap,
-                   extent=[maturities[0], maturities[-1], 0, len(dates)-1])
+    fig = Figure(figsize=(12, fig_h))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    # colormap aplicado uma vez: imshow recebe o bitmap RGBA uint8 pronto
+    rgba, sm = colormap_rgba(grid, args.cmap)
+    ax.imshow(rgba, origin="lower", aspect="auto", rasterized=True,
+              extent=[maturities[0], maturities[-1], 0, len(dates)-1])
+    # heatmap + recessões + faixas de inversão (zorder <= 1) viram um único
+    # bitmap em saídas vetoriais; marcadores de eventos e textos seguem vetoriais
+    ax.set_rasterization_zorder(1.5)
+
+    # índices por busca binária nas datas mensais (em vez de varrer a lista)
+    dates_d = dfm.index.values.astype("datetime64[D]")
 
     # shade recession bands across entire maturity for rows that fall in recessions
-    for start, end in recs:
-        # find index positions in dates
-        idx_start = 0
-        idx_end = -1
-        for i, d in enumerate(dates):
-            if d.date() >= start:
-                idx_start = i
-                break
-        for i, d in enumerate(dates):
-            if d.date() > end:
-                idx_end = i-1
-                break
-        if idx_end < 0:
-            idx_end = len(dates)-1
-        ax.axhspan(idx_start, idx_end, color='gray', alpha=0.10, zorder=1)
+    if recs:
+        starts = np.searchsorted(dates_d, np.array([s for s, _ in recs], dtype="datetime64[D]"), side="left")
+        ends = np.searchsorted(dates_d, np.array([e for _, e in recs], dtype="datetime64[D]"), side="right") - 1
+        for idx_start, idx_end in zip(starts.tolist(), ends.tolist()):
+            if idx_start >= len(dates) or idx_end < 0:
+                continue  # recessão fora da janela exibida
+            ax.axhspan(idx_start, idx_end, color='gray', alpha=0.10, zorder=1)
 
     # overlay inversion (10y-2y < 0) as translucent red overlay along rows where negative
-    neg_mask = (spread < 0).to_numpy()
-    for i, neg in enumerate(neg_mask):
-        if neg:
-            ax.axhspan(i, i+1, xmin=0, xmax=1, color='red', alpha=0.12)
+    # um único PolyCollection com todas as faixas (x em coords do eixo, y em linhas)
+    neg_idx = np.flatnonzero((spread < 0).to_numpy())
+    if neg_idx.size:
+        verts = [[(0, i), (0, i+1), (1, i+1), (1, i)] for i in neg_idx.tolist()]
+        ax.add_collection(PolyCollection(verts, transform=ax.get_yaxis_transform(),
+                                         facecolors='red', edgecolors='red', alpha=0.12),
+                          autolim=False)
 
     # macro event markers (vertical dashed line at approx time position)
-    for ev_date, label in events:
-        # find nearest index
-        idx = min(range(len(dates)), key=lambda i: abs(dates[i].date() - ev_date))
+    ev_days = np.array([d for d, _ in events], dtype="datetime64[D]")
+    # find nearest index (argmin devolve o primeiro em caso de empate, como o min anterior)
+    ev_idx = np.abs(dates_d[None, :] - ev_days[:, None]).argmin(axis=1).tolist()
+    for (ev_date, label), idx in zip(events, ev_idx):
         ax.plot([maturities[0], maturities[-1]], [idx+0.5, idx+0.5], linestyle='--', color='white', linewidth=0.8)
         ax.text(maturities[-1]+0.2, idx+0.5, label, va='center', fontsize=8, color='white', alpha=0.9)
 
@@ -192,13 +184,12 @@ def main():
     ax.set_ylabel("Ano")
     ax.set_title("Curva 2Y→30Y — Heatmap Avançado (inversões em vermelho; recessões cinza)")
 
-    cbar = fig.colorbar(im, ax=ax)
+    cbar = fig.colorbar(sm, ax=ax)
     cbar.set_label("Yield (%)")
 
-    plt.tight_layout()
+    fig.tight_layout()
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    fig.savefig(args.out, dpi=150)
-    plt.close(fig)
+    fig.savefig(args.out, dpi=args.dpi, **SAVEFIG_KWARGS)
     print("[OK] heatmap avançado salvo em", args.out)
 
 if __name__ == "__main__":
@@ -6,22 +6,36 @@ Saída: pipelines/bonds/curve_surface.png
 """
 
 import os
+import sys
 import argparse
 from datetime import datetime
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
 
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._interp import build_curve_grid
+from scripts.bonds._io import read_all, read_csv_fast, read_panel_cached
+from scripts.bonds._utils import SAVEFIG_KWARGS, find_column, monthly_mean
+
 def read_series(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, parse_dates=["date"]).sort_values("date").reset_index(drop=True)
+    header = pd.read_csv(path, nrows=0).columns
     ycol = None
-    for c in df.columns:
+    for c in header:
         if c.lower() in ("yield", "yield_pct"):
             ycol = c
             break
     if ycol is None:
-        ycol = df.columns[1]
+        ycol = header[1]
+    # lê só date + yield (pyarrow.csv quando instalado; data ISO fixa)
+    df = read_csv_fast(path, usecols=["date", ycol], float_cols=[ycol])
+    df = df.sort_values("date").reset_index(drop=True)
     name = os.path.splitext(os.path.basename(path))[0]
     return df[["date", ycol]].rename(columns={ycol:name})
 
@@ -30,56 +44,60 @@ def main():
     parser.add_argument("--files", nargs=3, required=True)
     parser.add_argument("--out", default="pipelines/bonds/curve_surface.png")
     parser.add_argument("--mstep", type=float, default=1.0)
+    parser.add_argument("--max-rows", type=int, default=50,
+                        help="faixas de tempo na superfície (média de blocos de meses)")
     args = parser.parse_args()
 
-    dfs = [read_series(p) for p in args.files]
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    def build_panel():
+        dfs = read_all(read_series, args.files)  # 3 CSVs lidos em paralelo
+        return pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
+
+    # painel alinhado em cache (parquet) enquanto os CSVs não mudarem
+    merged = read_panel_cached(args.files, build_panel, tag="curve_surface")
 
     # map cols
     cols = [c for c in merged.columns if c!="date"]
     def find(patterns):
-        for p in patterns:
-            for c in cols:
-                if p.lower() in c.lower():
-                    return c
-        return None
+        return find_column(cols, patterns)
     c2 = find(["2y","dgs2","2"])
     c10 = find(["10y","dgs10","10"])
     c30 = find(["30y","dgs30","30"])
     merged = merged[[ "date", c2, c10, c30]].rename(columns={c2:"US2Y", c10:"US10Y", c30:"US30Y"})
 
     # resample monthly
-    merged = merged.set_index("date").resample("MS").mean().interpolate().reset_index()
+    merged = monthly_mean(merged).reset_index()
     maturities = np.arange(2,31,args.mstep)
     base_mats = np.array([2.0,10.0,30.0])
 
-    grid = []
-    for i, row in merged.iterrows():
-        vals = np.array([row["US2Y"], row["US10Y"], row["US30Y"]], dtype=float)
-        vals = np.nan_to_num(vals, nan=np.nanmean(vals))
-        grid.append(np.interp(maturities, base_mats, vals))
-    grid = np.array(grid)  # shape (T, M)
+    # interpolação vetorizada: pesos lineares calculados uma vez, grid = vals @ w
+    grid = build_curve_grid(merged[["US2Y", "US10Y", "US30Y"]].to_numpy(), base_mats, maturities)  # shape (T, M)
 
-    # prepare mesh
+    # downsample no tempo por média de blocos (~max_rows faixas). O último
+    # bloco pode ser menor: os meses mais recentes não são descartados.
     T = grid.shape[0]
-    X, Y = np.meshgrid(maturities, np.arange(T))  # X=maturities, Y=time index
-    Z = grid
+    block_t = max(1, -(-T // max(1, args.max_rows)))
+    starts = np.arange(0, T, block_t)
+    counts = np.diff(np.append(starts, T))
+    Z = (np.add.reduceat(grid, starts, axis=0) / counts[:, None]).astype(np.float32)
+    t_pos = starts + (counts - 1) / 2.0  # centro de cada bloco, no índice original
+
+    # prepare mesh
+    X, Y = np.meshgrid(maturities, t_pos)  # X=maturities, Y=time index
 
-    fig = plt.figure(figsize=(12,6))
+    fig = Figure(figsize=(12,6))
+    FigureCanvasAgg(fig)
     ax = fig.add_subplot(111, projection='3d')
-    surf = ax.plot_surface(X, Y, Z, cmap='viridis', linewidth=0, antialiased=False)
+    # malha já reduzida: stride 1 (sem a amostragem implícita rcount/ccount=50)
+    surf = ax.plot_surface(X, Y, Z, cmap='viridis', linewidth=0, antialiased=False,
+                           rstride=1, cstride=1)
     ax.set_xlabel('Maturidade (anos)')
     ax.set_ylabel('Tempo (index)')
     ax.set_zlabel('Yield (%)')
     fig.colorbar(surf, shrink=0.5, aspect=10)
-    plt.title("Surface: Curva 2Y-30Y (tempo x maturidade x yield)")
-    plt.tight_layout()
+    ax.set_title("Surface: Curva 2Y-30Y (tempo x maturidade x yield)")
+    fig.tight_layout()
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    fig.savefig(args.out, dpi=150)
-    plt.close(fig)
+    fig.savefig(args.out, dpi=150, **SAVEFIG_KWARGS)
     print("[OK] surface salvo em", args.out)
 
 if __name__ == "__main__":
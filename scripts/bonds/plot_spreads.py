@@ -8,98 +8,83 @@ Opções:
 """
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
+
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import moving_average
+from scripts.bonds._utils import SAVEFIG_KWARGS, SPREADS, add_spreads, clip_dates, find_tenor, lttb, neg_runs, shade_runs
 
-def read_series(path):
-    df = pd.read_csv(path, parse_dates=["date"])
-    if "yield_pct" not in df.columns:
-        raise RuntimeError(f"{path} missing yield_pct")
-    name = None
-    if "source" in df.columns and df["source"].notnull().any():
-        s = df.loc[df["source"].first_valid_index(), "source"]
-        name = s.split(":")[-1] if isinstance(s, str) and ":" in s else str(s)
-    if not name:
-        name = os.path.splitext(os.path.basename(path))[0]
-    df = df[["date", "yield_pct"]].rename(columns={"yield_pct": name})
-    df = df.sort_values("date").reset_index(drop=True)
-    return df, name
-
-def moving(series, window, ema=False):
-    if ema:
-        return series.ewm(span=window, adjust=False, min_periods=1).mean()
-    return series.rolling(window=window, min_periods=1).mean()
 
 def ensure_out_name(out: str, last12: bool) -> str:
     if last12 and out.endswith(".png"):
         return out.replace(".png", "_12m.png")
     return out
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Plot spreads (2y-10y etc.) and signal inversions")
     parser.add_argument("--files", nargs=3, required=True, help="3 CSVs: us2y, us10y, us30y (any order)")
     parser.add_argument("--window", type=int, default=20, help="rolling window for smoothing")
     parser.add_argument("--ema", action="store_true", help="use EMA for smoothing (default SMA)")
     parser.add_argument("--out", default="pipelines/bonds/spreads.png", help="output PNG")
+    parser.add_argument("--dpi", type=int, default=120, help="resolução do PNG (default 120)")
     parser.add_argument("--start", default=None)
     parser.add_argument("--end", default=None)
     parser.add_argument("--last-12m", action="store_true", help="Filtrar últimos 12 meses e ajustar nome do arquivo")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     dfs = []
     for p in args.files:
         if not os.path.exists(p):
             raise RuntimeError(f"File not found: {p}")
-        df, name = read_series(p)
+        df, name = read_yield_series(p)
         dfs.append(df)
 
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
 
     if args.start:
-        merged = merged[merged["date"] >= pd.to_datetime(args.start)]
+        merged = clip_dates(merged, start=pd.to_datetime(args.start))
     if args.end:
-        merged = merged[merged["date"] <= pd.to_datetime(args.end)]
+        merged = clip_dates(merged, end=pd.to_datetime(args.end))
 
     if args.last_12m:
         cutoff = datetime.utcnow().date() - timedelta(days=365)
-        merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
+        merged = clip_dates(merged, start=pd.to_datetime(cutoff))
         args.out = ensure_out_name(args.out, True)
 
-    # Try to map columns to DGS2, DGS10, DGS30 heuristically
-    def pick_candidate(keys):
-        for k in keys:
-            for c in [col for col in merged.columns if col != "date"]:
-                if k.lower() in c.lower():
-                    return c
-        return None
-
-    c2 = pick_candidate(["DGS2", "2y", "2", "us2y"])
-    c10 = pick_candidate(["DGS10", "10y", "10", "us10y"])
-    c30 = pick_candidate(["DGS30", "30y", "30", "us30y"])
-
+    # DGS2/DGS10/DGS30 pelo prazo isolado no nome (find_tenor)
     cols = [c for c in merged.columns if c != "date"]
+    c2, c10, c30 = (find_tenor(cols, y) for y in (2, 10, 30))
+
     if not (c2 and c10 and c30):
         if len(cols) >= 3:
             c2, c10, c30 = cols[0], cols[1], cols[2]
         else:
             raise RuntimeError("Não foi possível identificar 2y/10y/30y entre as colunas.")
 
+    # yields já chegam float64 de read_yield_series: sem pd.to_numeric
     merged = merged[["date", c2, c10, c30]].rename(columns={c2: "US2Y", c10: "US10Y", c30: "US30Y"})
-    for col in ["US2Y", "US10Y", "US30Y"]:
-        merged[col] = pd.to_numeric(merged[col], errors="coerce")
-
-    merged = merged.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
 
-    merged["S_10_2"] = merged["US10Y"] - merged["US2Y"]
-    merged["S_30_2"] = merged["US30Y"] - merged["US2Y"]
-    merged["S_30_10"] = merged["US30Y"] - merged["US10Y"]
+    # concat + sort_index já deixou as datas ordenadas
+    merged = merged.dropna(subset=["date"]).reset_index(drop=True)
+    merged = add_spreads(merged)
 
-    for s in ["S_10_2", "S_30_2", "S_30_10"]:
-        merged[f"{s}_MA"] = moving(merged[s], args.window, ema=args.ema)
+    # as três médias num único rolling/ewm sobre o bloco (T, 3)
+    ma = moving_average(merged[list(SPREADS)], args.window, ema=args.ema)
+    merged = merged.assign(**{f"{s}_MA": ma[s] for s in SPREADS})
 
     # latest values & inversion flags
     last = merged.dropna(subset=["S_10_2", "S_30_2", "S_30_10"]).iloc[-1]
@@ -113,37 +98,35 @@ def main():
 
     spreads = ["S_10_2", "S_30_2", "S_30_10"]
     n = len(spreads)
-    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 3.5*n), sharex=True)
+    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 3.5*n), sharex=True, constrained_layout=True)
+    # arrays materializados uma vez, fora do loop; cada subplot indexa a coluna
+    # (datas já no float do matplotlib: uma conversão só para todos os eixos)
+    xs = mdates.date2num(merged["date"].to_numpy())
+    vals = merged[spreads].to_numpy(dtype=np.float64)
+    mas = merged[[f"{s}_MA" for s in spreads]].to_numpy(dtype=np.float64)
+    # ~2 pontos por pixel de largura no PNG final: acima disso o Agg só
+    # sobrepõe segmentos; LTTB reduz mantendo picos/vales
+    n_px = int(fig.get_figwidth() * args.dpi * 2)
 
     for i, s in enumerate(spreads):
         ax = axes[i]
-        ax.plot(merged["date"], merged[s], label=s)
-        ax.plot(merged["date"], merged[f"{s}_MA"], linestyle="--", label=f"{s} MA{args.window}")
-        neg = merged[s] < 0
-        if neg.any():
-            merged["neg_flag"] = neg.astype(int)
-            merged["neg_shift"] = merged["neg_flag"].diff().fillna(0).astype(int)
-            starts = merged[merged["neg_shift"]==1].index.tolist()
-            ends = merged[merged["neg_shift"]==-1].index.tolist()
-            if neg.iloc[0]:
-                starts = [0] + starts
-            if neg.iloc[-1]:
-                ends = ends + [len(merged)-1]
-            for st, ed in zip(starts, ends):
-                ax.axvspan(merged.loc[st,"date"], merged.loc[ed,"date"], alpha=0.12, color='grey')
-            merged.drop(columns=["neg_flag","neg_shift"], inplace=True, errors=True)
+        ax.xaxis_date()
+        ax.plot(*lttb(xs, vals[:, i], n_px), label=s, rasterized=True)
+        ax.plot(*lttb(xs, mas[:, i], n_px), linestyle="--", label=f"{s} MA{args.window}", rasterized=True)
+        # sombreado de inversão sempre sobre a série completa
+        starts, ends = neg_runs(vals[:, i])
+        shade_runs(ax, xs, starts, ends, alpha=0.12, color='grey', rasterized=True)
         ax.axhline(0, linewidth=0.6, linestyle=":", alpha=0.8)
         ax.set_ylabel("pp")
         ax.legend(loc="upper left")
         ax.grid(True)
 
     axes[-1].set_xlabel("Data")
-    plt.suptitle("Spreads da Curva — áreas sombreadas = spread < 0")
-    plt.tight_layout(rect=[0,0,1,0.96])
+    fig.suptitle("Spreads da Curva — áreas sombreadas = spread < 0")
 
     out_path = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    plt.savefig(out_path, dpi=150)
+    plt.savefig(out_path, dpi=args.dpi, **SAVEFIG_KWARGS)
     plt.close(fig)
     print(f"Gráfico de spreads salvo em: {out_path}")
 
@@ -8,63 +8,50 @@ Funciona com colunas DGS2 / DGS10 / DGS30 ou qualquer nome contendo 2 / 10 / 30.
 
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
 
-def read_df(path):
-    df = pd.read_csv(path, parse_dates=["date"])
-    df = df.sort_values("date").reset_index(drop=True)
-
-    # detectar coluna yield_pct automaticamente
-    col = None
-    for c in df.columns:
-        if c.lower() in ["yield", "yield_pct"]:
-            col = c
-            break
-    if col is None:
-        # fallback: segunda coluna
-        col = df.columns[1]
-
-    asset = os.path.basename(path).replace(".csv", "")
-    df = df[["date", col]].rename(columns={col: asset})
-    return df, asset
-
-def detect_col(cols, patterns):
-    """Retorna nome da coluna que contém qualquer padrão"""
-    for p in patterns:
-        for c in cols:
-            if p.lower() in c.lower():
-                return c
-    return None
-
-def main():
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import moving_average
+from scripts.bonds._utils import SAVEFIG_KWARGS, SPREADS, add_spreads, find_tenor, neg_runs, shade_runs
+
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--files", nargs=3, required=True)
     parser.add_argument("--window", type=int, default=20)
     parser.add_argument("--ema", action="store_true")
     parser.add_argument("--out", default="pipelines/bonds/spreads_12m.png")
-    args = parser.parse_args()
+    parser.add_argument("--dpi", type=int, default=120, help="resolução do PNG (default 120)")
+    args = parser.parse_args(argv)
 
-    # ler arquivos
+    # ler arquivos (corte de 12 meses já em cada série, antes do concat)
+    cutoff = pd.Timestamp(datetime.utcnow().date() - timedelta(days=365))
     dfs = []
     for f in args.files:
-        df, name = read_df(f)
-        dfs.append(df)
+        df, name = read_yield_series(f, name=os.path.basename(f).replace(".csv", ""))
+        dfs.append(df[df["date"] >= cutoff])
 
-    # merge
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-
-    merged = merged.sort_values("date").reset_index(drop=True)
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
 
     # --- detectar colunas reais automaticamente ---
     cols = [c for c in merged.columns if c != "date"]
 
-    col_2y  = detect_col(cols, ["2", "2y", "02", "dgs2", "us2"])
-    col_10y = detect_col(cols, ["10", "10y", "dgs10", "us10"])
-    col_30y = detect_col(cols, ["30", "30y", "dgs30", "us30"])
+    col_2y  = find_tenor(cols, 2)
+    col_10y = find_tenor(cols, 10)
+    col_30y = find_tenor(cols, 30)
 
     if not (col_2y and col_10y and col_30y):
         raise RuntimeError(f"Colunas não encontradas. Detectado: {cols}")
@@ -76,57 +63,40 @@ def main():
     merged = merged[["date", col_2y, col_10y, col_30y]]
     merged.columns = ["date", "US2Y", "US10Y", "US30Y"]
 
-    # --- FILTRO 12 MESES ---
-    cutoff = datetime.utcnow().date() - timedelta(days=365)
-    merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
-
     # spreads
-    merged["S_10_2"] = merged["US10Y"] - merged["US2Y"]
-    merged["S_30_2"] = merged["US30Y"] - merged["US2Y"]
-    merged["S_30_10"] = merged["US30Y"] - merged["US10Y"]
+    merged = add_spreads(merged)
 
-    # média móvel
-    def smooth(x):
-        return x.ewm(span=args.window, adjust=False).mean() if args.ema else x.rolling(args.window, min_periods=1).mean()
-
-    for s in ["S_10_2", "S_30_2", "S_30_10"]:
-        merged[f"{s}_MA"] = smooth(merged[s])
+    # média móvel: as três num único rolling/ewm sobre o bloco (T, 3)
+    ma = moving_average(merged[list(SPREADS)], args.window, ema=args.ema)
+    merged = merged.assign(**{f"{s}_MA": ma[s] for s in SPREADS})
 
     # plot
-    fig, axes = plt.subplots(3, 1, figsize=(12, 11), sharex=True)
+    fig, axes = plt.subplots(3, 1, figsize=(12, 11), sharex=True, constrained_layout=True)
     spreads = ["S_10_2", "S_30_2", "S_30_10"]
+    # arrays materializados uma vez, fora do loop; cada subplot indexa a coluna
+    # (datas já no float do matplotlib: uma conversão só para todos os eixos)
+    xs = mdates.date2num(merged["date"].to_numpy())
+    vals = merged[spreads].to_numpy(dtype=np.float64)
+    mas = merged[[f"{s}_MA" for s in spreads]].to_numpy(dtype=np.float64)
 
-    for ax, s in zip(axes, spreads):
-        ax.plot(merged["date"], merged[s], label=s, linewidth=1.2)
-        ax.plot(merged["date"], merged[f"{s}_MA"], label=f"{s} MA{args.window}", linestyle="--")
-
-        # inversão
-        neg = merged[s] < 0
-        if neg.any():
-            merged["flag"] = neg.astype(int)
-            merged["shift"] = merged["flag"].diff().fillna(0)
-
-            starts = merged[merged["shift"] == 1].index.tolist()
-            ends = merged[merged["shift"] == -1].index.tolist()
-
-            if neg.iloc[0]:
-                starts = [0] + starts
-            if neg.iloc[-1]:
-                ends = ends + [len(merged) - 1]
+    for i, (ax, s) in enumerate(zip(axes, spreads)):
+        ax.xaxis_date()
+        ax.plot(xs, vals[:, i], label=s, linewidth=1.2, rasterized=True)
+        ax.plot(xs, mas[:, i], label=f"{s} MA{args.window}", linestyle="--", rasterized=True)
 
-            for st, ed in zip(starts, ends):
-                ax.axvspan(merged.loc[st, "date"], merged.loc[ed, "date"], color="gray", alpha=0.15)
+        # inversão: trechos < 0 por posição (neg_runs), num único PolyCollection
+        starts, ends = neg_runs(vals[:, i])
+        shade_runs(ax, xs, starts, ends, color="gray", alpha=0.15, rasterized=True)
 
         ax.axhline(0, linestyle=":", linewidth=0.7)
         ax.grid(True)
         ax.legend()
 
     axes[-1].set_xlabel("Data")
-    plt.suptitle("Spreads — Últimos 12 Meses (inversões sombreadas)")
-    plt.tight_layout(rect=[0,0,1,0.96])
+    fig.suptitle("Spreads — Últimos 12 Meses (inversões sombreadas)")
 
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    plt.savefig(args.out, dpi=150)
+    plt.savefig(args.out, dpi=args.dpi, **SAVEFIG_KWARGS)
     plt.close(fig)
     print(f"OK → {args.out}")
 
@@ -10,86 +10,105 @@ Plota volatilidade realizada (rolling std) das yields.
 """
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
 from math import sqrt
 
-def read_series(path):
-    df = pd.read_csv(path, parse_dates=["date"])
-    if "yield_pct" not in df.columns:
-        raise RuntimeError(f"{path} must contain 'yield_pct'")
-    name = None
-    if "source" in df.columns and df["source"].notnull().any():
-        s = df.loc[df["source"].first_valid_index(), "source"]
-        name = s.split(":")[-1] if isinstance(s, str) and ":" in s else str(s)
-    if not name:
-        name = os.path.splitext(os.path.basename(path))[0]
-    df = df[["date", "yield_pct"]].rename(columns={"yield_pct": name}).sort_values("date").reset_index(drop=True)
-    return df, name
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import rolling_std
+from scripts.bonds._utils import SAVEFIG_KWARGS, clip_dates, lttb, rolling_engine
 
 def ensure_out_name(out: str, last12: bool) -> str:
     if last12 and out.endswith(".png"):
         return out.replace(".png", "_12m.png")
     return out
 
-def main():
+def main(argv=None):
     p = argparse.ArgumentParser(description="Volatilidade realizada de yields (rolling std dos delta em bps)")
     p.add_argument("--files", nargs="+", required=True, help="CSV(s) de entrada (date,yield_pct,source)")
     p.add_argument("--window", type=int, default=30, help="janela em dias (default 30)")
     p.add_argument("--annualize", action="store_true", help="anualiza multiplicando por sqrt(252)")
     p.add_argument("--out", default=None, help="PNG de saída (opcional)")
+    p.add_argument("--dpi", type=int, default=120, help="resolução do PNG (default 120)")
     p.add_argument("--start", default=None)
     p.add_argument("--end", default=None)
     p.add_argument("--last-12m", action="store_true", help="Filtrar últimos 12 meses e ajustar nome do arquivo")
-    args = p.parse_args()
+    args = p.parse_args(argv)
 
     dfs, names = [], []
     for f in args.files:
         if not os.path.exists(f):
             print(f"Warning: {f} not found; skipping")
             continue
-        df, name = read_series(f)
+        df, name = read_yield_series(f)
         dfs.append(df); names.append(name)
     if not dfs:
         raise RuntimeError("Nenhum arquivo válido")
 
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
 
     if args.start:
-        merged = merged[merged["date"] >= pd.to_datetime(args.start)]
+        merged = clip_dates(merged, start=pd.to_datetime(args.start))
     if args.end:
-        merged = merged[merged["date"] <= pd.to_datetime(args.end)]
+        merged = clip_dates(merged, end=pd.to_datetime(args.end))
 
     if args.last_12m:
         cutoff = datetime.utcnow().date() - timedelta(days=365)
-        merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
+        merged = clip_dates(merged, start=pd.to_datetime(cutoff))
         if args.out:
             args.out = ensure_out_name(args.out, True)
 
-    # calc daily changes in bps
-    for col in [c for c in merged.columns if c != "date"]:
-        merged[f"{col}_delta_bps"] = merged[col].diff() * 100.0
+    # calc daily changes in bps: um buffer (N, K) alocado uma vez (colunas
+    # contíguas), diff via np.subtract(out=) e escala em bps in-place
+    ycols = [c for c in merged.columns if c != "date"]
+    buf = np.empty((len(merged), len(ycols)), dtype=np.float64, order="F")
+    buf[:1] = np.nan
+    for k, col in enumerate(ycols):
+        a = merged[col].to_numpy(dtype=np.float64)
+        np.subtract(a[1:], a[:-1], out=buf[1:, k])
+    buf *= 100.0
+    delta = pd.DataFrame(buf, columns=ycols, index=merged.index, copy=False)
 
-    # rolling std
-    for col in [c for c in merged.columns if c.endswith("_delta_bps")]:
+    # rolling std: com o engine numba ligado, kernel próprio (Welford, já com
+    # a anualização); senão, um único rolling do pandas sobre o bloco
+    scale = sqrt(252) if args.annualize else 1.0
+    if rolling_engine():
+        vol = pd.DataFrame(rolling_std(buf, args.window, scale),
+                           columns=ycols, index=merged.index, copy=False)
+    else:
+        vol = delta.rolling(window=args.window, min_periods=1).std()
         if args.annualize:
-            merged[col.replace("_delta_bps","_vol")] = merged[col].rolling(window=args.window, min_periods=1).std() * sqrt(252)
-        else:
-            merged[col.replace("_delta_bps","_vol")] = merged[col].rolling(window=args.window, min_periods=1).std()
+            vol = vol * scale
 
-    vol_cols = [c for c in merged.columns if c.endswith("_vol")]
+    merged = merged.assign(**{f"{c}_delta_bps": delta[c] for c in ycols},
+                           **{f"{c}_vol": vol[c] for c in ycols})
+    vol_cols = [f"{c}_vol" for c in ycols]
 
     n = len(vol_cols)
-    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 3.5*n), sharex=True)
+    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 3.5*n), sharex=True, constrained_layout=True)
     if n == 1: axes = [axes]
+    # datas -> float do matplotlib uma vez só, compartilhadas pelos subplots
+    xs = mdates.date2num(merged["date"].to_numpy())
+    # ~2 pontos por pixel de largura no PNG final (LTTB mantém os picos)
+    n_px = int(fig.get_figwidth() * args.dpi * 2)
     for i, vc in enumerate(vol_cols):
         ax = axes[i]
+        ax.xaxis_date()
         label = vc.replace("_vol","")
-        ax.plot(merged["date"], merged[vc], label=f"Vol {label} (window={args.window}d){' annualized' if args.annualize else ''}")
+        ax.plot(*lttb(xs, merged[vc].to_numpy(), n_px), label=f"Vol {label} (window={args.window}d){' annualized' if args.annualize else ''}", rasterized=True)
         ax.set_ylabel("bps" + (" (ann.)" if args.annualize else ""))
         ax.grid(True)
         ax.legend(loc="upper left")
@@ -98,8 +117,7 @@ def main():
     if args.last_12m and out.endswith(".png"):
         out = out.replace(".png", "_12m.png")
     os.makedirs(os.path.dirname(out), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out, dpi=150)
+    plt.savefig(out, dpi=args.dpi, **SAVEFIG_KWARGS)
     plt.close()
     print("Saved:", out)
     print("Period:", merged['date'].min().date(), "→", merged['date'].max().date())
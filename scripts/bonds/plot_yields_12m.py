@@ -6,68 +6,69 @@ Internamente usa os mesmos parâmetros do plot_yields_separate.
 """
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
 
-# reuse logic similar to plot_yields_separate but simplified:
-def read_series(path: str):
-    df = pd.read_csv(path, parse_dates=["date"])
-    if "yield_pct" not in df.columns:
-        raise RuntimeError(f"Arquivo {path} não contém coluna 'yield_pct'.")
-    name = None
-    if "source" in df.columns and df["source"].notnull().any():
-        src = df.loc[df["source"].first_valid_index(), "source"]
-        name = src.split(":")[-1] if isinstance(src, str) and ":" in src else str(src)
-    if not name:
-        name = os.path.splitext(os.path.basename(path))[0]
-    df = df[["date", "yield_pct"]].copy().sort_values("date").reset_index(drop=True)
-    df.rename(columns={"yield_pct": name}, inplace=True)
-    return df, name
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import moving_average
+from scripts.bonds._utils import SAVEFIG_KWARGS
 
-def main():
+# reuse logic similar to plot_yields_separate but simplified:
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Plota últimos 12 meses (convenience wrapper).")
     parser.add_argument("--files", nargs="+", required=True, help="CSV(s) de entrada")
     parser.add_argument("--window", type=int, default=20)
     parser.add_argument("--ema", action="store_true")
     parser.add_argument("--out", default="pipelines/bonds/yields_12m.png")
-    args = parser.parse_args()
+    parser.add_argument("--dpi", type=int, default=120, help="resolução do PNG (default 120)")
+    args = parser.parse_args(argv)
 
-    # build merged
+    # build merged (corte de 12 meses já em cada série, antes do concat)
+    cutoff = pd.Timestamp(datetime.utcnow().date() - timedelta(days=365))
     dfs, names = [], []
     for f in args.files:
         if not os.path.exists(f):
             print(f"Warning: {f} not found; skipping")
             continue
-        df, name = read_series(f)
-        dfs.append(df); names.append(name)
+        df, name = read_yield_series(f)
+        dfs.append(df[df["date"] >= cutoff]); names.append(name)
     if not dfs:
         raise RuntimeError("Nenhum arquivo válido")
 
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
-
-    cutoff = datetime.utcnow().date() - timedelta(days=365)
-    merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
     if merged.empty:
         raise RuntimeError("Nenhum dado nos últimos 12 meses.")
 
     # plotting using same style as plot_yields_separate
     cols = [c for c in merged.columns if c != "date"]
     n = len(cols)
-    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 4*n), sharex=True)
+    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 4*n), sharex=True, constrained_layout=True)
     if n == 1: axes = [axes]
 
+    # datas -> float do matplotlib uma vez só; cada série recorta pela máscara
+    xs = mdates.date2num(merged["date"].to_numpy())
     for i, col in enumerate(cols):
         ax = axes[i]
-        s = merged[["date", col]].dropna()
-        if s.empty:
+        ax.xaxis_date()
+        ok = merged[col].notna().to_numpy()
+        if not ok.any():
             continue
-        ax.plot(s["date"], s[col], label=f"{col} (yield)")
-        ma = s[col].ewm(span=args.window, adjust=False, min_periods=1).mean() if args.ema else s[col].rolling(window=args.window, min_periods=1).mean()
-        ax.plot(s["date"], ma, linestyle="--", label=f"MA{args.window}")
+        s = merged[col][ok]
+        ax.plot(xs[ok], s.to_numpy(), label=f"{col} (yield)", rasterized=True)
+        ma = moving_average(s, args.window, ema=args.ema)
+        ax.plot(xs[ok], ma.to_numpy(), linestyle="--", label=f"MA{args.window}", rasterized=True)
         ax.set_title(f"{col} — Últimos 12 meses (MA{args.window})")
         ax.set_ylabel("Yield (%)")
         ax.grid(True)
@@ -76,8 +77,7 @@ def main():
     axes[-1].set_xlabel("Data")
     out_path = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
+    plt.savefig(out_path, dpi=args.dpi, **SAVEFIG_KWARGS)
     plt.close()
     print(f"Gráfico 12M salvo em: {out_path}")
     print("Período:", merged["date"].min().date(), "→", merged["date"].max().date())
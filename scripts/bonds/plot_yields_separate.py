@@ -15,47 +15,41 @@ Exemplo:
 """
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
 
-def read_series(path: str):
-    df = pd.read_csv(path, parse_dates=["date"])
-    if "yield_pct" not in df.columns:
-        raise RuntimeError(f"Arquivo {path} não contém coluna 'yield_pct'.")
-    name = None
-    if "source" in df.columns and df["source"].notnull().any():
-        src = df.loc[df["source"].first_valid_index(), "source"]
-        if isinstance(src, str) and ":" in src:
-            name = src.split(":")[-1]
-        else:
-            name = str(src)
-    if not name:
-        name = os.path.splitext(os.path.basename(path))[0]
-    df = df[["date", "yield_pct"]].copy().sort_values("date").reset_index(drop=True)
-    df.rename(columns={"yield_pct": name}, inplace=True)
-    return df, name
-
-def moving_average(series: pd.Series, window: int, ema: bool) -> pd.Series:
-    if ema:
-        return series.ewm(span=window, adjust=False, min_periods=1).mean()
-    return series.rolling(window=window, min_periods=1).mean()
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import moving_average
+from scripts.bonds._utils import SAVEFIG_KWARGS, clip_dates, lttb
 
 def ensure_out_name(out: str, last12: bool) -> str:
     if last12 and out.endswith(".png"):
         return out.replace(".png", "_12m.png")
     return out
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Plota gráficos separados para yields (2Y,10Y,30Y).")
     parser.add_argument("--files", nargs="+", required=True, help="CSV(s) de entrada (date,yield_pct,source). Recomendo 3 arquivos (2Y,10Y,30Y).")
     parser.add_argument("--window", type=int, default=20, help="janela para média móvel (dias)")
     parser.add_argument("--ema", action="store_true", help="usar EMA ao invés de SMA")
     parser.add_argument("--out", default="pipelines/bonds/yields_separate.png", help="PNG de saída")
+    parser.add_argument("--dpi", type=int, default=120, help="resolução do PNG (default 120)")
     parser.add_argument("--start", default=None, help="Data inicial filter YYYY-MM-DD")
     parser.add_argument("--end", default=None, help="Data final filter YYYY-MM-DD")
     parser.add_argument("--last-12m", action="store_true", help="Filtra apenas últimos 12 meses e ajusta nome do arquivo")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     series_list = []
     names = []
@@ -63,29 +57,27 @@ def main():
         if not os.path.exists(path):
             print(f"Warning: arquivo não encontrado: {path} — pulando.")
             continue
-        df, name = read_series(path)
+        df, name = read_yield_series(path)
         series_list.append(df)
         names.append(name)
 
     if not series_list:
         raise RuntimeError("Nenhum arquivo válido fornecido. Saindo.")
 
-    merged = series_list[0]
-    for df in series_list[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat([d.set_index("date") for d in series_list], axis=1).sort_index().reset_index()
 
     # filtra período
     if args.start:
         start_dt = pd.to_datetime(args.start)
-        merged = merged[merged["date"] >= start_dt]
+        merged = clip_dates(merged, start=start_dt)
     if args.end:
         end_dt = pd.to_datetime(args.end)
-        merged = merged[merged["date"] <= end_dt]
+        merged = clip_dates(merged, end=end_dt)
 
     if args.last_12m:
         cutoff = datetime.utcnow().date() - timedelta(days=365)
-        merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
+        merged = clip_dates(merged, start=pd.to_datetime(cutoff))
         args.out = ensure_out_name(args.out, True)
 
     if merged.empty:
@@ -95,20 +87,30 @@ def main():
     cols = [c for c in merged.columns if c != "date"]
     n = len(cols)
     figsize = (12, 4 * n)
-    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=figsize, sharex=True)
+    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=figsize, sharex=True, constrained_layout=True)
     if n == 1:
         axes = [axes]
 
+    # séries longas (histórico completo) reduzidas por LTTB a ~2 pontos por
+    # pixel de largura antes do plot; as de 12 meses passam intactas
+    n_px = int(fig.get_figwidth() * args.dpi * 2)
+    # datas convertidas para o float do matplotlib uma única vez; cada série
+    # só recorta pela máscara de não-NaN
+    xs = mdates.date2num(merged["date"].to_numpy())
+    for ax in axes:
+        ax.xaxis_date()
+
     for idx, col in enumerate(cols):
         ax = axes[idx]
-        series = merged[["date", col]].copy().dropna()
-        if series.empty:
+        vals = merged[col].to_numpy(dtype=float)
+        ok = ~np.isnan(vals)
+        if not ok.any():
             print(f"Warning: série {col} está vazia após filtro — pulando.")
             continue
 
-        ax.plot(series["date"], series[col], label=f"{col} (yield)")
+        ax.plot(*lttb(xs[ok], vals[ok], n_px), label=f"{col} (yield)", rasterized=True)
         ma = moving_average(merged[col], args.window, args.ema)
-        ax.plot(merged["date"], ma, linestyle="--", label=f"{col} MA{args.window}{' EMA' if args.ema else ''}")
+        ax.plot(*lttb(xs, ma.to_numpy(), n_px), linestyle="--", label=f"{col} MA{args.window}{' EMA' if args.ema else ''}", rasterized=True)
 
         ax.set_title(f"{col} — Yield e Média Móvel (window={args.window})")
         ax.set_ylabel("Yield (%)")
@@ -119,8 +121,7 @@ def main():
 
     out_path = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
+    plt.savefig(out_path, dpi=args.dpi, **SAVEFIG_KWARGS)
     plt.close(fig)
 
     print(f"Gráfico salvo em: {out_path}")
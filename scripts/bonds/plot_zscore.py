@@ -8,73 +8,83 @@ Opções:
 """
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg", force=True)  # só salva PNG: sem backend GUI nem busca de DISPLAY
 import matplotlib.pyplot as plt
+from matplotlib import dates as mdates
+matplotlib.rcParams["figure.max_open_warning"] = 0
 
-def read_series(path):
-    df = pd.read_csv(path, parse_dates=["date"])
-    if "yield_pct" not in df.columns:
-        raise RuntimeError(f"{path} missing yield_pct")
-    name = None
-    if "source" in df.columns and df["source"].notnull().any():
-        s = df.loc[df["source"].first_valid_index(), "source"]
-        name = s.split(":")[-1] if isinstance(s, str) and ":" in s else str(s)
-    if not name:
-        name = os.path.splitext(os.path.basename(path))[0]
-    df = df[["date","yield_pct"]].rename(columns={"yield_pct": name}).sort_values("date").reset_index(drop=True)
-    return df, name
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
 
-def main():
+from scripts.bonds._io import read_yield_series
+from scripts.bonds._kernels import rolling_zscore
+from scripts.bonds._utils import SAVEFIG_KWARGS, clip_dates, rolling_engine
+
+def main(argv=None):
     p = argparse.ArgumentParser(description="Z-score (rolling) das yields")
     p.add_argument("--files", nargs="+", required=True)
     p.add_argument("--window", type=int, default=252, help="janela para média e std (default 252)")
     p.add_argument("--out", default=None)
+    p.add_argument("--dpi", type=int, default=120, help="resolução do PNG (default 120)")
     p.add_argument("--start", default=None)
     p.add_argument("--end", default=None)
     p.add_argument("--last-12m", action="store_true", help="Filtrar últimos 12 meses e ajustar saída")
-    args = p.parse_args()
+    args = p.parse_args(argv)
 
     dfs, names = [], []
     for f in args.files:
         if not os.path.exists(f):
             print("Warning:", f, "not found; skipping")
             continue
-        df, name = read_series(f); dfs.append(df); names.append(name)
+        df, name = read_yield_series(f); dfs.append(df); names.append(name)
     if not dfs:
         raise RuntimeError("Nenhum arquivo válido")
 
-    merged = dfs[0]
-    for df in dfs[1:]:
-        merged = pd.merge(merged, df, on="date", how="outer")
-    merged = merged.sort_values("date").reset_index(drop=True)
+    # alinhamento único pelo índice de datas (outer join) em vez de merges encadeados
+    merged = pd.concat([d.set_index("date") for d in dfs], axis=1).sort_index().reset_index()
 
     if args.start:
-        merged = merged[merged["date"] >= pd.to_datetime(args.start)]
+        merged = clip_dates(merged, start=pd.to_datetime(args.start))
     if args.end:
-        merged = merged[merged["date"] <= pd.to_datetime(args.end)]
+        merged = clip_dates(merged, end=pd.to_datetime(args.end))
 
     if args.last_12m:
         cutoff = datetime.utcnow().date() - timedelta(days=365)
-        merged = merged[merged["date"] >= pd.to_datetime(cutoff)]
+        merged = clip_dates(merged, start=pd.to_datetime(cutoff))
         if args.out and args.out.endswith(".png"):
             args.out = args.out.replace(".png", "_12m.png")
 
+    # z-score de todas as séries de uma vez: com o engine numba ligado, kernel
+    # fundido (média e std da mesma janela numa passada); senão, um único
+    # rolling do pandas sobre o bloco
     cols = [c for c in merged.columns if c != "date"]
-    for c in cols:
-        rolling_mean = merged[c].rolling(window=args.window, min_periods=1).mean()
-        rolling_std = merged[c].rolling(window=args.window, min_periods=1).std()
-        merged[f"{c}_z"] = (merged[c] - rolling_mean) / rolling_std
+    if rolling_engine():
+        z = pd.DataFrame(rolling_zscore(merged[cols].to_numpy(dtype=float), args.window),
+                         columns=cols, index=merged.index, copy=False)
+    else:
+        block = merged[cols]
+        roll = block.rolling(window=args.window, min_periods=1)
+        z = (block - roll.mean()) / roll.std()
+    merged = merged.assign(**{f"{c}_z": z[c] for c in cols})
 
     zcols = [c for c in merged.columns if c.endswith("_z")]
 
     n = len(zcols)
-    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 3.5*n), sharex=True)
+    fig, axes = plt.subplots(nrows=n, ncols=1, figsize=(12, 3.5*n), sharex=True, constrained_layout=True)
     if n == 1: axes = [axes]
+    # datas -> float do matplotlib uma vez só, compartilhadas pelos subplots
+    xs = mdates.date2num(merged["date"].to_numpy())
     for i, zc in enumerate(zcols):
         ax = axes[i]
+        ax.xaxis_date()
         name = zc.replace("_z","")
-        ax.plot(merged["date"], merged[zc], label=f"Z-score {name}")
+        ax.plot(xs, merged[zc].to_numpy(), label=f"Z-score {name}", rasterized=True)
         ax.axhline(0, linestyle=":", linewidth=0.8)
         ax.axhline(2, linestyle="--", linewidth=0.6)
         ax.axhline(-2, linestyle="--", linewidth=0.6)
@@ -87,8 +97,7 @@ def main():
     if args.last_12m and out.endswith(".png"):
         out = out.replace(".png", "_12m.png")
     os.makedirs(os.path.dirname(out), exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out, dpi=150)
+    plt.savefig(out, dpi=args.dpi, **SAVEFIG_KWARGS)
     plt.close()
     print("Saved:", out)
     print("Period:", merged['date'].min().date(), "→", merged['date'].max().date())
@@ -8,10 +8,14 @@ Helpers reutilizáveis para os scripts de relatório:
 """
 
 import os
-import json
 import time
 from datetime import datetime
 
+# o envio (partes, Session com pool/Retry, backoff em 429, erro HTTP), a
+# gravação atômica, o JSON e o contador em SQLite vêm de scripts/tools.py;
+# aqui ficam só as regras próprias de chat_id/tópico e a sentinel por arquivo
+from scripts.tools import CounterFile, _atomic_write, _json_dumps, send_parts
+
 
 def _ensure_dir_for_file(path: str):
     d = os.path.dirname(path)
@@ -19,33 +23,21 @@ def _ensure_dir_for_file(path: str):
         os.makedirs(d, exist_ok=True)
 
 
-def title_counter(counter_path: str = "data/counters.json", key: str = "default"):
+def title_counter(counter_path: str = "data/counters.json", key: str = "default", counters=None):
     """
-    Lê um arquivo JSON com contadores, incrementa o contador 'key' e salva.
-    Retorna o número novo (int).
+    Incrementa o contador 'key' e retorna o número novo (int).
+    Os contadores ficam num SQLite ao lado do JSON (data/counters.db): o
+    incremento é uma transação por chave, então relatórios concorrentes não
+    perdem números. Na primeira vez o banco é semeado com o JSON existente;
+    depois o JSON só é regravado (atomicamente) como espelho legível.
+    JSON inválido na migração levanta RuntimeError (em vez de recomeçar a
+    numeração). counters: CounterFile já aberto (scripts.tools), para vários
+    incrementos na mesma transação.
     """
-    _ensure_dir_for_file(counter_path)
-
-    if os.path.exists(counter_path):
-        try:
-            with open(counter_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-    else:
-        data = {}
-
-    current = int(data.get(key, 0))
-    current += 1
-    data[key] = current
-
-    try:
-        with open(counter_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"[title_counter] erro ao salvar {counter_path}: {e}")
-
-    return current
+    if counters is not None:
+        return counters.increment(key)
+    with CounterFile(counter_path) as c:
+        return c.increment(key)
 
 
 def sent_guard(sent_path: str):
@@ -58,18 +50,15 @@ def sent_guard(sent_path: str):
 
 def mark_sent(sent_path: str):
     """
-    Marca o envio criando o arquivo sentinel com timestamp.
+    Marca o envio criando o arquivo sentinel com timestamp (gravação atômica;
+    erro de I/O sobe para quem chamou).
     """
     _ensure_dir_for_file(sent_path)
     payload = {
         "sent_at": datetime.utcnow().isoformat() + "Z",
         "ts": int(time.time()),
     }
-    try:
-        with open(sent_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"[mark_sent] erro ao criar sentinel {sent_path}: {e}")
+    _atomic_write(sent_path, _json_dumps(payload))
 
 
 def send_to_telegram(text: str, preview: bool = False, html_mode: bool = True):
@@ -85,8 +74,6 @@ def send_to_telegram(text: str, preview: bool = False, html_mode: bool = True):
     Retorna o JSON de resposta da API Telegram se sucesso.
     Lança RuntimeError em caso de configuração inválida ou erro HTTP.
     """
-    import requests
-
     bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
     if not bot_token:
         raise RuntimeError("TELEGRAM_BOT_TOKEN não configurado no ambiente.")
@@ -122,7 +109,6 @@ def send_to_telegram(text: str, preview: bool = False, html_mode: bool = True):
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
     payload = {
         "chat_id": chat_id,
-        "text": text,
         "disable_web_page_preview": True,
     }
     if html_mode:
@@ -134,16 +120,7 @@ def send_to_telegram(text: str, preview: bool = False, html_mode: bool = True):
             # se não for inteiro, ignora (não quebra)
             pass
 
-    resp = requests.post(url, json=payload, timeout=30)
-    try:
-        resp.raise_for_status()
-    except Exception as e:
-        # log detalhado e raise
-        print("[send_to_telegram] ERRO ao enviar mensgem Telegram:", e)
-        print("[send_to_telegram] status_code:", resp.status_code, "response:", resp.text)
-        raise RuntimeError(f"Telegram API devolveu erro HTTP {resp.status_code}: {resp.text}")
-
-    j = resp.json()
+    j = send_parts(url, payload, text).json()
     if not j.get("ok"):
         raise RuntimeError(f"Telegram API devolveu erro: {j}")
 
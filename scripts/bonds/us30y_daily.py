@@ -9,6 +9,9 @@ Requisitos:
  - FRED_API_KEY (no ambiente)
  - requests, pandas
 
+Cache: pipelines/bonds/.cache/fred/ (parquet), válido por FRED_CACHE_TTL
+segundos (default 12h; 0 desliga); vencido, baixa só o trecho novo.
+
 Saída:
  - CSV com colunas: date, yield_pct, source
 
@@ -17,13 +20,29 @@ Uso:
 """
 import argparse
 import os
-from datetime import datetime
+from functools import lru_cache
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# scripts/ e providers/ vêm do pacote instalado (pip install -e ., ver
+# pyproject.toml), sem ajuste de sys.path
+
+from scripts.bonds._io import fred_frame_cached
 
 FRED_BASE_URL = "https://api.stlouisfed.org/fred/series/observations"
 
-def fetch_us30y_from_fred(
+
+@lru_cache(maxsize=None)
+def _session() -> requests.Session:
+    # keep-alive + Retry com backoff em 429/5xx (GET é idempotente)
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry))
+    return session
+
+def _download_us30y(
     api_key: str,
     series_id: str = "DGS30",
     observation_start: str = "2000-01-01",
@@ -35,31 +54,32 @@ def fetch_us30y_from_fred(
         "observation_start": observation_start,
     }
 
-    resp = requests.get(FRED_BASE_URL, params=params, timeout=30)
+    resp = _session().get(FRED_BASE_URL, params=params, timeout=30)
     resp.raise_for_status()
     data = resp.json()
     observations = data.get("observations", [])
 
-    rows = []
-    for obs in observations:
-        date_str = obs.get("date")
-        value_str = obs.get("value")
-        if value_str in (None, ".", ""):
-            continue
-        try:
-            value = float(value_str)
-        except ValueError:
-            continue
-        dt = datetime.strptime(date_str, "%Y-%m-%d").date()
-        rows.append({
-            "date": dt,
-            "yield_pct": value,
-            "source": f"FRED:{series_id}",
-        })
-
-    df = pd.DataFrame(rows).sort_values("date").reset_index(drop=True)
+    # parse vetorizado: ausentes ("." ou vazio) e valores inválidos viram
+    # NaN no to_numeric e saem no dropna; datas num único to_datetime em C
+    df = pd.DataFrame(observations, columns=["date", "value"])
+    df["yield_pct"] = pd.to_numeric(df["value"].replace({".": None, "": None}), errors="coerce")
+    df = df.dropna(subset=["yield_pct"]).drop(columns="value")
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", cache=True)
+    df["source"] = f"FRED:{series_id}"
+    df = df.sort_values("date").reset_index(drop=True)
     return df
 
+
+def fetch_us30y_from_fred(
+    api_key: str,
+    series_id: str = "DGS30",
+    observation_start: str = "2000-01-01",
+) -> pd.DataFrame:
+    return fred_frame_cached(
+        series_id, observation_start, lambda start: _download_us30y(api_key, series_id, start)
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Baixa yield do US30Y (DGS30) via FRED.")
     parser.add_argument("--out", required=True, help="Caminho do CSV de saída (ex: pipelines/bonds/us30y_daily.csv)")
@@ -72,6 +92,8 @@ def main():
         raise RuntimeError("FRED_API_KEY não configurado no ambiente.")
 
     df = fetch_us30y_from_fred(api_key=api_key, series_id=args.series_id, observation_start=args.start)
+    # o cache guarda datetime64; no CSV e no log, só a data
+    df = df.assign(date=df["date"].dt.date)
 
     out_path = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pré-compila os kernels numba de _kernels.py e grava o cache em
+pipelines/bonds/.cache/numba (ou NUMBA_CACHE_DIR).
+
+Rodar uma vez no build da imagem / antes dos gráficos no CI (com o diretório
+de cache restaurado entre execuções): os scripts com BONDS_ROLLING_ENGINE=numba
+passam a carregar o código compilado em vez de pagar o JIT a cada processo.
+
+Uso:
+  python scripts/bonds/warmup_jit.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+# garante que o root do repo está no PYTHONPATH
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.bonds import _kernels
+
+
+def main():
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        raise RuntimeError("numba não instalado: nada para pré-compilar.")
+
+    # mesmos tipos das chamadas reais (float64 em ordem F, int64 nos índices),
+    # senão o cache guardaria outra assinatura
+    block = np.asfortranarray(np.random.default_rng(0).normal(size=(64, 3)).cumsum(axis=0))
+    xf = np.arange(64, dtype=np.float64)
+    y = block[:, 0].copy()
+    edges = np.arange(1, 64, 4, dtype=np.int64)
+    cx = np.ones(len(edges), dtype=np.float64)
+    cy = np.ones(len(edges), dtype=np.float64)
+
+    t0 = time.perf_counter()
+    _kernels.rolling_std(block, 5, 1.0)
+    _kernels.rolling_zscore(block, 5)
+    _kernels.rolling_mean(block, 5)
+    _kernels.ewma(block, 5)
+    _kernels.lttb_indices(xf, y, edges, cx, cy)
+    print(f"Kernels compilados em {time.perf_counter() - t0:.1f}s -> {numba.config.CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orçamento de tokens de entrada dos prompts do LLM.
+
+count_tokens usa o tiktoken (encoding do gpt-4o-mini) quando instalado;
+sem ele, estima ~4 caracteres por token. fit_to_budget corta linhas do
+bloco de contexto, na ordem de prioridade dada, até system + user caberem
+em max_input_tokens.
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# bem acima do prompt atual (~600 tokens): só corta se o contexto crescer
+MAX_INPUT_TOKENS = 3000
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken  # opcional: contagem exata de tokens
+        return tiktoken.encoding_for_model("gpt-4o-mini")
+    except Exception:  # sem o pacote ou sem o arquivo BPE (offline)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def fit_to_budget(
+    system: str,
+    user: str,
+    max_input_tokens: int = MAX_INPUT_TOKENS,
+    drop: Iterable[str] = (),
+    fixed: Optional[str] = None,
+) -> str:
+    """
+    Devolve user (o contexto do dia) dentro do orçamento. Acima dele, remove
+    as linhas que contêm cada marcador de drop, um marcador por vez, na ordem
+    (o primeiro é o menos importante), até caber. Linhas fora de drop nunca
+    saem: se ainda não couber, devolve o que sobrou. fixed é texto que também
+    vai no prompt (ex.: o cabeçalho fixo do user) e entra só na conta.
+    """
+    base = count_tokens(system) + (count_tokens(fixed) if fixed else 0)
+    if base + count_tokens(user) <= max_input_tokens:
+        return user
+
+    lines = user.split("\n")
+    for marker in drop:
+        lines = [ln for ln in lines if marker not in ln]
+        if base + count_tokens("\n".join(lines)) <= max_input_tokens:
+            break
+    return "\n".join(lines)
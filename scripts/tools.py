@@ -1,44 +1,427 @@
 import os
+import sys
 import json
-import requests
-from datetime import date
+import time
+import random
+import asyncio
+import functools
+import inspect
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+try:
+    import orjson  # opcional: (de)serialização JSON em C
+except ImportError:  # pragma: no cover
+    orjson = None
+
+BRT = timezone(timedelta(hours=-3))
+_MESES = (
+    "janeiro", "fevereiro", "março", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+)
+
+# limite do sendMessage é 4096; folga para o prefixo "(parte i/n)"
+TELEGRAM_MAX_LEN = 4000
+
+# status transitórios (mesma lista do Retry das sessões) e teto do Retry-After
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_AFTER_MAX = 60.0
+# (connect, read): host fora do ar falha em ~3 s em vez de segurar 30 s
+TELEGRAM_TIMEOUT = (3.05, 30)
+
+# envios em segundo plano (send_to_telegram_async). Uma thread só: a fila é
+# FIFO, então as mensagens chegam na ordem em que foram pedidas. As threads
+# do executor são aguardadas na saída do interpretador, sem atexit próprio.
+_TG_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tg-send")
+
+
+# requests/numpy/pandas são importados só dentro das funções que os usam:
+# os *_daily_llm.py importam este módulo e, quando a trava .sent já barrou
+# o envio do dia, saem sem pagar ~0,4 s de import do pandas
+
+@lru_cache(maxsize=None)
+def _session():
+    # conexões TLS reaproveitadas entre envios; o Retry só refaz falhas de
+    # conexão e 429/5xx de métodos idempotentes (o POST não é reenviado)
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry))
+    return session
+
+
+def _retry_delay(resp, attempt: int, base: float, cap: float) -> float:
+    # Retry-After do servidor (429/503) quando vier; senão backoff
+    # exponencial com full jitter, como o _retry_delay do LLMClient
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_AFTER_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _is_transport_error(exc: Exception) -> bool:
+    # só checa contra libs já carregadas: se não foram importadas, o erro
+    # não pode ter vindo delas
+    requests = sys.modules.get("requests")
+    httpx = sys.modules.get("httpx")
+    if requests is not None and isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return httpx is not None and isinstance(exc, httpx.TransportError)
+
+
+def retry_with_backoff(
+    max_attempts: int = 4,
+    retry_on=RETRY_STATUS,
+    retry_errors: bool = True,
+    base: float = 0.5,
+    cap: float = 8.0,
+):
+    """
+    Decorador para funções (sync ou async) que devolvem um Response de
+    requests/httpx: se o status está em retry_on (ou, com retry_errors, se
+    a chamada levantou erro de conexão/timeout), espera e repete, até
+    max_attempts tentativas. A última resposta volta ao chamador como veio
+    (quem chama decide o raise_for_status).
+
+    Para POST não idempotente (sendMessage), use retry_on=(429,) e
+    retry_errors=False: 429 garante que nada foi entregue.
+    """
+
+    def _retry_or_raise(attempt, resp=None, exc=None):
+        if attempt == max_attempts - 1:
+            if exc is not None:
+                raise exc
+            return None
+        if exc is not None and not (retry_errors and _is_transport_error(exc)):
+            raise exc
+        delay = _retry_delay(resp, attempt, base, cap)
+        reason = f"HTTP {resp.status_code}" if resp is not None else repr(exc)
+        print(f"[retry] {reason}; nova tentativa em {delay:.1f}s")
+        return delay
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                for attempt in range(max_attempts):
+                    try:
+                        resp = await fn(*args, **kwargs)
+                    except Exception as e:
+                        delay = _retry_or_raise(attempt, exc=e)
+                    else:
+                        if resp.status_code not in retry_on:
+                            return resp
+                        delay = _retry_or_raise(attempt, resp=resp)
+                        if delay is None:
+                            return resp
+                    await asyncio.sleep(delay)
+
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    resp = fn(*args, **kwargs)
+                except Exception as e:
+                    delay = _retry_or_raise(attempt, exc=e)
+                else:
+                    if resp.status_code not in retry_on:
+                        return resp
+                    delay = _retry_or_raise(attempt, resp=resp)
+                    if delay is None:
+                        return resp
+                time.sleep(delay)
+
+        return wrapper
+
+    return decorator
+
+
+def _hard_split(text: str, max_len: int) -> list:
+    # último recurso (uma "palavra" maior que max_len): fatia fixa, sem
+    # cortar uma entidade HTML (&amp; etc.) ao meio
+    parts = []
+    while len(text) > max_len:
+        cut = max_len
+        amp = text.rfind("&", max(0, cut - 10), cut)
+        if amp > 0 and text.find(";", amp, cut) == -1:
+            cut = amp
+        parts.append(text[:cut])
+        text = text[cut:]
+    if text:
+        parts.append(text)
+    return parts
+
+
+def _split_for_telegram(text: str, max_len: int = TELEGRAM_MAX_LEN, seps=("\n\n", "\n", " ")) -> list:
+    """
+    Quebra text em partes de até max_len juntando blocos inteiros, de
+    preferência por parágrafo; um parágrafo grande demais é quebrado por
+    linha e, depois, por espaço. Como título (<b>) e rodapé (<i>) ficam em
+    parágrafos próprios, as tags HTML não são cortadas.
+    """
+    if len(text) <= max_len:
+        return [text]
+    if not seps:
+        return _hard_split(text, max_len)
+    sep, rest = seps[0], seps[1:]
+    chunks, cur = [], ""
+    for piece in text.split(sep):
+        if len(piece) > max_len:
+            if cur:
+                chunks.append(cur)
+                cur = ""
+            chunks.extend(_split_for_telegram(piece, max_len, rest))
+            continue
+        cand = f"{cur}{sep}{piece}" if cur else piece
+        if len(cand) <= max_len:
+            cur = cand
+        else:
+            chunks.append(cur)
+            cur = piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def telegram_parts(text: str) -> list:
+    """Texto pronto para envio: uma parte, ou várias com "(parte i/n)" na frente."""
+    chunks = _split_for_telegram(text)
+    if len(chunks) == 1:
+        return chunks
+    return [f"(parte {i}/{len(chunks)})\n{c}" for i, c in enumerate(chunks, 1)]
+
+
+@retry_with_backoff(retry_on=(429,), retry_errors=False)
+def telegram_post(url: str, payload: dict):
+    """POST na Bot API; 429 (flood control) é repetido após o Retry-After."""
+    return _session().post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
+
+
+def summarize_series(df) -> dict:
+    """
+    Resumo de uma série date/yield_pct para os blocos de contexto dos
+    relatórios: última e penúltima leitura, variação (pp e bps), mínimo,
+    máximo e período. Os fetchers já devolvem a série ordenada por data; só
+    reordena se não estiver (checagem O(n) barata). min/max saem direto do
+    ndarray; só as quatro datas usadas viram datetime.date.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if len(df) == 0:
+        raise RuntimeError("Série vazia: nada a resumir.")
+    if not df["date"].is_monotonic_increasing:
+        df = df.sort_values("date")
+    dates = df["date"].to_numpy()
+    y = df["yield_pct"].to_numpy(dtype=np.float64)
+
+    def _d(x):
+        return pd.Timestamp(x).date()
+
+    s = {
+        "last_date": _d(dates[-1]),
+        "last_yield": float(y[-1]),
+        "prev_date": None,
+        "prev_yield": None,
+        "delta": 0.0,
+        "delta_bp": 0.0,
+        "min_y": float(np.nanmin(y)),  # NaN ignorado, como no Series.min
+        "max_y": float(np.nanmax(y)),
+        "start_date": _d(dates[0]),
+        "end_date": _d(dates[-1]),
+    }
+    if len(y) > 1:
+        s["prev_date"] = _d(dates[-2])
+        s["prev_yield"] = float(y[-2])
+        s["delta"] = s["last_yield"] - s["prev_yield"]
+        s["delta_bp"] = s["delta"] * 100.0
+    return s
 
-def title_counter(path: str, key: str) -> int:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if not os.path.exists(path):
-        data = {key: 1}
-    else:
-        with open(path, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except Exception:
-                data = {}
 
-    n = data.get(key, 0) + 1
-    data[key] = n
+@lru_cache(maxsize=1)
+def _today_brt() -> date:
+    # uma vez por processo: cada relatório é uma execução curta
+    return datetime.now(BRT).date()
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
 
-    return n
+def today_brt_str() -> str:
+    """Data de hoje em Brasília por extenso: "15 de outubro de 2026"."""
+    d = _today_brt()
+    return f"{d.day} de {_MESES[d.month - 1]} de {d.year}"
+
+
+def _json_loads(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _json_dumps(obj) -> bytes:
+    # mesmo formato nos dois caminhos: indent 2, UTF-8 sem escapes \uXXXX
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """
+    Grava em temporário (com fsync) + os.replace: quem lê vê o arquivo
+    antigo ou o novo, nunca um pela metade, mesmo se o job morrer no meio.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# upsert com RETURNING: um statement por incremento
+_SQLITE_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+def counter_db_path(path: str) -> str:
+    # data/counters.json -> data/counters.db
+    return os.path.splitext(path)[0] + ".db"
+
+
+class CounterFile:
+    """
+    Uma transação sobre os contadores de path: SQLite ao lado (ver
+    counter_db_path) com o JSON de path como espelho legível. BEGIN
+    IMMEDIATE no __enter__ serializa processos concorrentes (os outros
+    esperam até timeout); cada increment é um UPDATE por chave; no __exit__
+    o espelho é regravado (atômico) uma vez só, se algo mudou, e a transação
+    é confirmada. Exceção dentro do with desfaz tudo.
+
+        with CounterFile("data/counters.json") as c:
+            n10 = c.increment("diario_us10y")
+            n2 = c.increment("diario_us2y")
+
+    Na criação do banco, os contadores vêm do JSON antigo; sem JSON, a
+    primeira chave incrementada parte de seed_if_missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dirty = False
+        self._conn = None
+        self._ready = False
+
+    def __enter__(self):
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = sqlite3.connect(counter_db_path(self.path), timeout=30, isolation_level=None)
+        try:
+            # WAL: o commit é um append no -wal (sem reescrever o journal);
+            # com synchronous=NORMAL, um fsync só nos checkpoints
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            conn.close()
+            raise
+        self._conn = conn
+        return self
+
+    def increment(self, key: str, seed_if_missing: int = 0) -> int:
+        conn = self._conn
+        if not self._ready:
+            self._create(key, seed_if_missing)
+            self._ready = True
+        if _SQLITE_RETURNING:
+            (n,) = conn.execute(
+                "INSERT INTO counters VALUES (?, 1) ON CONFLICT(k) DO UPDATE SET v = v + 1 RETURNING v",
+                (key,),
+            ).fetchone()
+        else:  # SQLite < 3.35 (sem RETURNING)
+            conn.execute("INSERT OR IGNORE INTO counters VALUES (?, 0)", (key,))
+            conn.execute("UPDATE counters SET v = v + 1 WHERE k = ?", (key,))
+            (n,) = conn.execute("SELECT v FROM counters WHERE k = ?", (key,)).fetchone()
+        self.dirty = True
+        return n
+
+    def _create(self, key: str, seed_if_missing: int) -> None:
+        conn = self._conn
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'counters'"
+        ).fetchone() is not None:
+            return
+        seed = {key: seed_if_missing} if seed_if_missing else {}
+        conn.execute("CREATE TABLE counters (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+        conn.executemany(
+            "INSERT INTO counters VALUES (?, ?)",
+            ((k, int(v)) for k, v in _load_counters_json(self.path, seed).items()),
+        )
+
+    def __exit__(self, exc_type, exc, tb):
+        conn, self._conn = self._conn, None
+        try:
+            if exc_type is None:
+                if self.dirty:
+                    rows = conn.execute("SELECT k, v FROM counters ORDER BY rowid")
+                    _atomic_write(self.path, _json_dumps(dict(rows)))
+                conn.execute("COMMIT")
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+        return False
+
+
+def _load_counters_json(path: str, seed_missing: dict) -> dict:
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return dict(seed_missing)
+    try:
+        return _json_loads(raw or b"{}")
+    except ValueError as e:
+        # não recomeça a numeração em silêncio: o Nº sai no título
+        raise RuntimeError(f"{path} não é um JSON válido ({e}); corrija ou apague o arquivo.") from e
+
+
+def title_counter(path: str, key: str, counters: CounterFile = None) -> int:
+    # sem arquivo nenhum a numeração começa em 2, como sempre foi aqui.
+    # counters: CounterFile já aberto, para vários incrementos numa transação
+    if counters is not None:
+        return counters.increment(key, seed_if_missing=1)
+    with CounterFile(path) as c:
+        return c.increment(key, seed_if_missing=1)
 
 
 def sent_guard(path: str) -> bool:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
     today = str(date.today())
 
-    if os.path.exists(path):
+    # EAFP: um open só (sem exists + open); a pasta só é criada para gravar
+    try:
         with open(path, "r", encoding="utf-8") as f:
             last = f.read().strip()
-        if last == today:
-            return True
+    except FileNotFoundError:
+        last = ""
+    if last == today:
+        return True
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(today)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic_write(path, today.encode("utf-8"))
     return False
 
 
-def send_to_telegram(text: str, preview: bool = False):
+def _telegram_target(preview: bool = False):
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
 
@@ -48,17 +431,62 @@ def send_to_telegram(text: str, preview: bool = False):
     if not chat_id:
         raise RuntimeError("TELEGRAM_CHAT_ID não configurado (único permitido).")
 
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "HTML",
-        "disable_web_page_preview": not preview
-    }
-
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    r = requests.post(url, json=payload, timeout=30)
+    base = {"chat_id": chat_id, "parse_mode": "HTML", "disable_web_page_preview": not preview}
+    return f"https://api.telegram.org/bot{bot_token}/sendMessage", base
 
-    if r.status_code >= 300:
-        raise RuntimeError(f"Telegram erro {r.status_code}: {r.text}")
 
+def send_to_telegram(text: str, preview: bool = False):
+    url, base = _telegram_target(preview)
+    send_parts(url, base, text)
     return True
+
+
+def send_many_to_telegram(texts, preview: bool = False) -> int:
+    """
+    Junta textos curtos (trechos HTML completos) em mensagens de até
+    TELEGRAM_MAX_LEN, separados por linha em branco, na ordem: N trechos
+    pequenos viram um ou poucos sendMessage. Um texto nunca é partido entre
+    mensagens; sozinho acima do limite, send_to_telegram o quebra em partes.
+    Devolve quantas mensagens foram enviadas.
+    """
+    url, base = _telegram_target(preview)
+    sent = 0
+    buf, size = [], 0
+    for t in texts:
+        extra = len(t) + (2 if buf else 0)  # "\n\n" entre trechos
+        if buf and size + extra > TELEGRAM_MAX_LEN:
+            send_parts(url, base, "\n\n".join(buf))
+            sent += 1
+            buf, size, extra = [], 0, len(t)
+        buf.append(t)
+        size += extra
+    if buf:
+        send_parts(url, base, "\n\n".join(buf))
+        sent += 1
+    return sent
+
+
+def send_to_telegram_async(text: str, preview: bool = False):
+    """
+    Como send_to_telegram, mas devolve um Future na hora e o POST roda na
+    thread de envio: quem chamou segue trabalhando. Configuração ausente
+    levanta aqui mesmo; erro da API sai em future.result().
+    """
+    url, base = _telegram_target(preview)
+    return _TG_EXECUTOR.submit(send_parts, url, base, text)
+
+
+def send_parts(url: str, base: dict, text: str):
+    """
+    Envio único dos dois send_to_telegram (daqui e de scripts.bonds.tools):
+    posta text com os campos de base (chat_id, parse_mode, ...) em partes
+    sequenciais (a API recusa acima de 4096 caracteres). Status >= 300 vira
+    RuntimeError; devolve o Response da última parte.
+    """
+    for part in telegram_parts(text):
+        r = telegram_post(url, {**base, "text": part})
+
+        if r.status_code >= 300:
+            raise RuntimeError(f"Telegram erro {r.status_code}: {r.text}")
+
+    return r
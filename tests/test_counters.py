@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Contadores do título (scripts.tools.CounterFile / title_counter): numeração
+igual à do JSON antigo, migração do JSON para o SQLite, rollback em erro e
+incrementos concorrentes sem perda.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.tools import CounterFile, counter_db_path, title_counter  # noqa: E402
+
+
+def _path(tmp):
+    return os.path.join(tmp, "data", "counters.json")
+
+
+def _mirror(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_numbering_from_scratch():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _path(tmp)
+        # sem arquivo nenhum, a primeira chave começa em 2 (como no JSON antigo)
+        assert title_counter(path, "diario_us10y") == 2
+        assert title_counter(path, "diario_us2y") == 1
+        assert title_counter(path, "diario_us10y") == 3
+        assert _mirror(path) == {"diario_us10y": 3, "diario_us2y": 1}
+        assert os.path.exists(counter_db_path(path))
+
+
+def test_migrates_existing_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _path(tmp)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"diario_us10y": 41, "diario_us30y": 7}, f)
+        assert title_counter(path, "diario_us10y") == 42
+        assert title_counter(path, "diario_us30y") == 8
+        assert title_counter(path, "diario_us2y") == 1
+        assert _mirror(path) == {"diario_us10y": 42, "diario_us30y": 8, "diario_us2y": 1}
+
+
+def test_invalid_json_is_an_error():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _path(tmp)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{quebrado")
+        try:
+            title_counter(path, "diario_us10y")
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("esperava RuntimeError")
+
+
+def test_batch_in_one_transaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _path(tmp)
+        title_counter(path, "a")  # a=2
+        with CounterFile(path) as c:
+            assert title_counter(path, "a", counters=c) == 3
+            assert title_counter(path, "b", counters=c) == 1
+            assert title_counter(path, "a", counters=c) == 4
+        assert _mirror(path) == {"a": 4, "b": 1}
+
+
+def test_exception_rolls_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _path(tmp)
+        title_counter(path, "a")  # a=2
+        try:
+            with CounterFile(path) as c:
+                c.increment("a")
+                c.increment("b")
+                raise ValueError("falhou no meio")
+        except ValueError:
+            pass
+        assert _mirror(path) == {"a": 2}
+        assert title_counter(path, "a") == 3
+
+
+def test_concurrent_increments():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _path(tmp)
+        title_counter(path, "k")  # cria o banco: k=2
+        n_threads, n_each = 8, 25
+
+        def work():
+            for _ in range(n_each):
+                title_counter(path, "k")
+
+        threads = [threading.Thread(target=work) for _ in range(n_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert _mirror(path) == {"k": 2 + n_threads * n_each}
+
+
+if __name__ == "__main__":
+    test_numbering_from_scratch()
+    test_migrates_existing_json()
+    test_invalid_json_is_an_error()
+    test_batch_in_one_transaction()
+    test_exception_rolls_back()
+    test_concurrent_increments()
+    print("ok")
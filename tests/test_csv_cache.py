@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Cache dos CSVs de yields (scripts.bonds._io.read_csv_cached): o parquet
+irmão e o memo em processo são chaveados por (mtime, tamanho) do CSV, então
+um CSV trocado (inclusive por um com mtime mais antigo) nunca devolve dados
+velhos.
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.bonds import _io  # noqa: E402
+from scripts.bonds._io import read_csv_cached  # noqa: E402
+
+
+def _write(path, values, mtime=None):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("date,yield_pct,source\n")
+        for i, v in enumerate(values, 1):
+            f.write(f"2024-01-{i:02d},{v},FRED:DGS10\n")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _parquets(path):
+    return glob.glob(glob.escape(path) + ".*parquet")
+
+
+def test_reads_and_writes_one_parquet():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "us10y_daily.csv")
+        _write(path, ["4.10", "4.20"])
+        df = read_csv_cached(path)
+        assert list(df["yield_pct"]) == [4.1, 4.2]
+        assert str(df["date"].dtype).startswith("datetime64")
+        assert len(_parquets(path)) == 1
+
+
+def test_parquet_is_used_on_next_run():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "us10y_daily.csv")
+        _write(path, ["4.10", "4.20"])
+        read_csv_cached(path)
+        _io._CSV_MEMO.clear()  # como um processo novo
+        saved = _io.read_csv_fast
+        _io.read_csv_fast = None  # se tentar reler o CSV, quebra
+        try:
+            df = read_csv_cached(path)
+        finally:
+            _io.read_csv_fast = saved
+        assert list(df["yield_pct"]) == [4.1, 4.2]
+
+
+def test_replaced_csv_with_older_mtime_is_reread():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "us10y_daily.csv")
+        _write(path, ["4.10", "4.20"], mtime=2_000_000_000)
+        assert list(read_csv_cached(path)["yield_pct"]) == [4.1, 4.2]
+        old = _parquets(path)
+        # mesmo tamanho, mtime anterior (checkout, cp -p)
+        _write(path, ["5.10", "5.20"], mtime=1_000_000_000)
+        assert list(read_csv_cached(path)["yield_pct"]) == [5.1, 5.2]
+        # também num processo novo (sem memo), e o parquet velho foi apagado
+        _io._CSV_MEMO.clear()
+        assert list(read_csv_cached(path)["yield_pct"]) == [5.1, 5.2]
+        now = _parquets(path)
+        assert len(now) == 1 and now != old
+
+
+def test_returned_frame_does_not_leak_into_memo():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "us10y_daily.csv")
+        _write(path, ["4.10", "4.20"])
+        df = read_csv_cached(path)
+        df["yield_pct"] = 0.0
+        df["extra"] = 1
+        again = read_csv_cached(path)
+        assert list(again["yield_pct"]) == [4.1, 4.2]
+        assert "extra" not in again.columns
+
+
+if __name__ == "__main__":
+    test_reads_and_writes_one_parquet()
+    test_parquet_is_used_on_next_run()
+    test_replaced_csv_with_older_mtime_is_reread()
+    test_returned_frame_does_not_leak_into_memo()
+    print("ok")
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Cache das séries do FRED (scripts.bonds._io.FileCache / fred_frame_cached):
+TTL, retomada incremental (resume_from), junção em update() e a coluna date
+sempre datetime64, mesmo com entradas datetime.date misturadas.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.bonds._io import FileCache, fred_frame_cached  # noqa: E402
+
+
+def _frame(days, values, as_date=False):
+    dates = pd.to_datetime([f"2024-01-{d:02d}" for d in days])
+    return pd.DataFrame({
+        "date": dates.date if as_date else dates,
+        "yield_pct": values,
+        "source": "FRED:DGS10",
+    })
+
+
+def test_resume_from():
+    assert FileCache.resume_from(None, "2000-01-01") == "2000-01-01"
+    assert FileCache.resume_from(_frame([], []), "2000-01-01") == "2000-01-01"
+    assert FileCache.resume_from(_frame([2, 3, 5], [4.0, 4.1, 4.2]), "2000-01-01") == "2024-01-05"
+    assert FileCache.resume_from(_frame([2, 9], [4.0, 4.1], as_date=True), "2000-01-01") == "2024-01-09"
+
+
+def test_load_store_and_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCache(tmp, ttl=60)
+        assert cache.load("DGS10", "2000-01-01") == (None, False)
+        cache.store("DGS10", "2000-01-01", _frame([2, 3], [4.0, 4.1]))
+        df, fresh = cache.load("DGS10", "2000-01-01")
+        assert fresh and len(df) == 2
+        assert df["date"].dtype == "datetime64[ns]"
+        # outro start é outra entrada
+        assert cache.load("DGS10", "2010-01-01") == (None, False)
+        # vencido: devolve o que tem, com fresh=False
+        old = time.time() - 120
+        os.utime(cache.path("DGS10", "2000-01-01"), (old, old))
+        df, fresh = cache.load("DGS10", "2000-01-01")
+        assert not fresh and len(df) == 2
+
+
+def test_ttl_zero_disables():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCache(tmp, ttl=0)
+        cache.store("DGS10", "2000-01-01", _frame([2], [4.0]))
+        assert not os.listdir(tmp)
+        assert cache.load("DGS10", "2000-01-01") == (None, False)
+
+
+def test_update_merges_and_new_value_wins():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCache(tmp, ttl=60)
+        cached = _frame([2, 3, 4], [4.0, 4.1, 4.2])
+        new = _frame([4, 5], [9.9, 4.3])
+        out = cache.update("DGS10", "2000-01-01", cached, new)
+        assert list(out["date"].dt.day) == [2, 3, 4, 5]
+        assert list(out["yield_pct"]) == [4.0, 4.1, 9.9, 4.3]
+        stored, _ = cache.load("DGS10", "2000-01-01")
+        pd.testing.assert_frame_equal(stored, out)
+        # nada novo: mantém o que estava
+        out = cache.update("DGS10", "2000-01-01", cached, _frame([], []))
+        assert len(out) == 3
+
+
+def test_update_mixed_date_types():
+    # us2y/us30y já gravaram datetime.date na mesma entrada que o us10y usa
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCache(tmp, ttl=60)
+        cached = _frame([2, 3, 4], [4.0, 4.1, 4.2], as_date=True)
+        new = _frame([4, 5], [4.2, 4.3])
+        out = cache.update("DGS2", "2000-01-01", cached, new)
+        assert out["date"].dtype == "datetime64[ns]"
+        assert list(out["date"].dt.day) == [2, 3, 4, 5]
+        out = cache.update("DGS2", "2000-01-01", out, _frame([5, 8], [4.3, 4.4], as_date=True))
+        assert list(out["date"].dt.day) == [2, 3, 4, 5, 8]
+
+
+def test_fred_frame_cached_fetches_incrementally():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCache(tmp, ttl=60)
+        calls = []
+
+        def fetch(start):
+            calls.append(start)
+            if start == "2000-01-01":
+                return _frame([2, 3], [4.0, 4.1])
+            return _frame([3, 4], [4.1, 4.2])
+
+        df = fred_frame_cached("DGS10", "2000-01-01", fetch, cache)
+        assert calls == ["2000-01-01"] and len(df) == 2
+        # dentro do ttl: não chama fetch
+        df = fred_frame_cached("DGS10", "2000-01-01", fetch, cache)
+        assert calls == ["2000-01-01"] and len(df) == 2
+        # vencido: busca desde a última data guardada e junta
+        old = time.time() - 120
+        os.utime(cache.path("DGS10", "2000-01-01"), (old, old))
+        df = fred_frame_cached("DGS10", "2000-01-01", fetch, cache)
+        assert calls == ["2000-01-01", "2024-01-03"]
+        assert list(df["date"].dt.day) == [2, 3, 4]
+
+
+if __name__ == "__main__":
+    test_resume_from()
+    test_load_store_and_ttl()
+    test_ttl_zero_disables()
+    test_update_merges_and_new_value_wins()
+    test_update_mixed_date_types()
+    test_fred_frame_cached_fetches_incrementally()
+    print("ok")
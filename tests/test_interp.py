@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+build_curve_grid (vetorizado) contra o laço por linha com np.interp que
+os plots usavam antes, inclusive linhas com NaN (preenchidas com a média).
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.bonds._interp import build_curve_grid  # noqa: E402
+
+BASE_MATS = np.array([2, 10, 30])
+
+
+def _grid_loop(base_vals, base_mats, maturities):
+    grid = np.zeros((len(base_vals), len(maturities)))
+    for i in range(len(base_vals)):
+        row = base_vals[i]
+        row = np.nan_to_num(row, nan=np.nanmean(row))
+        grid[i] = np.interp(maturities, base_mats, row)
+    return grid
+
+
+def _base_vals(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    vals = rng.uniform(0.5, 6.0, size=(n, 3))
+    vals[5, 0] = np.nan
+    vals[17, 1] = np.nan
+    vals[42, 2] = np.nan
+    vals[99, [0, 2]] = np.nan
+    return vals
+
+
+def test_grid_matches_loop():
+    vals = _base_vals()
+    for mats in (np.linspace(2, 30, 29), np.linspace(1, 30, 50), np.arange(2, 31)):
+        got = build_curve_grid(vals, BASE_MATS, mats)
+        assert got.shape == (len(vals), len(mats))
+        assert np.allclose(got, _grid_loop(vals, BASE_MATS, mats))
+
+
+def test_grid_float32():
+    vals = _base_vals()
+    mats = np.linspace(2, 30, 29)
+    got = build_curve_grid(vals, BASE_MATS, mats, dtype=np.float32)
+    assert got.dtype == np.float32
+    assert np.allclose(got, _grid_loop(vals, BASE_MATS, mats), atol=1e-5)
+
+
+def test_grid_identity():
+    vals = _base_vals()
+    got = build_curve_grid(vals, BASE_MATS, BASE_MATS)
+    assert np.allclose(got, _grid_loop(vals, BASE_MATS, BASE_MATS))
+    assert not np.isnan(got).any()
+
+
+if __name__ == "__main__":
+    test_grid_matches_loop()
+    test_grid_float32()
+    test_grid_identity()
+    print("ok")
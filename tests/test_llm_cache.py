@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de respostas do LLM (providers.llm_cache): chave estável por
+requisição, FileCacheBackend com TTL e o LLMClient sem ida ao provider
+quando a resposta já está no cache.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from providers.llm_cache import FileCacheBackend, MemoryCacheBackend, make_cache_key  # noqa: E402
+from providers.llm_client import LLMClient  # noqa: E402
+
+MESSAGES = [{"role": "system", "content": "Você é um analista."}, {"role": "user", "content": "US10Y"}]
+
+
+def test_key_is_stable_and_sensitive():
+    key = make_cache_key("groq", "m", MESSAGES, 0, 100)
+    assert key == make_cache_key("groq", "m", [dict(reversed(list(m.items()))) for m in MESSAGES], 0, 100)
+    assert len(key) == 64
+    others = {
+        make_cache_key("openai", "m", MESSAGES, 0, 100),
+        make_cache_key("groq", "m2", MESSAGES, 0, 100),
+        make_cache_key("groq", "m", MESSAGES[:1], 0, 100),
+        make_cache_key("groq", "m", MESSAGES, 0.3, 100),
+        make_cache_key("groq", "m", MESSAGES, 0, 200),
+    }
+    assert key not in others and len(others) == 5
+
+
+def test_file_backend_roundtrip_and_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCacheBackend(os.path.join(tmp, "llm"))
+        assert cache.get("k") is None
+        cache.set("k", "relatório ✓", ttl=60)
+        assert cache.get("k") == "relatório ✓"
+        # outro processo (outra instância) vê a mesma entrada
+        assert FileCacheBackend(os.path.join(tmp, "llm")).get("k") == "relatório ✓"
+        cache.set("velho", "x", ttl=-1)
+        assert cache.get("velho") is None
+        assert not os.path.exists(cache._path("velho"))  # expirado é apagado
+        assert not [f for f in os.listdir(cache.directory) if f.endswith(".tmp")]
+
+
+def test_file_backend_ignores_corrupt_entry():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FileCacheBackend(tmp)
+        with open(cache._path("k"), "w", encoding="utf-8") as f:
+            f.write("{pela metade")
+        assert cache.get("k") is None
+
+
+def test_memory_backend_lru_and_ttl():
+    cache = MemoryCacheBackend(maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # "a" vira o mais recente
+    cache.set("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and cache.get("c") == "3"
+    cache.set("d", "4", ttl=-1)
+    assert cache.get("d") is None
+
+
+def test_client_hits_cache_only_for_deterministic_calls():
+    saved_env = os.environ.get("LLM_FALLBACK_ORDER")
+    saved_call = LLMClient._call_piapi
+    calls = []
+
+    def fake(self, system_prompt, user_prompt, temperature, max_tokens):
+        calls.append(temperature)
+        return f"resp {len(calls)}"
+
+    os.environ["LLM_FALLBACK_ORDER"] = "piapi"
+    LLMClient._call_piapi = fake
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            llm = LLMClient(provider="piapi", cache=FileCacheBackend(tmp))
+            assert llm.generate("S", "U", temperature=0) == "resp 1"
+            assert llm.generate("S", "U", temperature=0) == "resp 1"
+            assert llm.generate("S", "U2", temperature=0) == "resp 2"
+            # temperature > 0 sem cache_sampled: sempre vai ao provider
+            assert llm.generate("S", "U", temperature=0.3) == "resp 3"
+            assert llm.generate("S", "U", temperature=0.3) == "resp 4"
+            assert llm.stats == {"cache_hits": 1, "cache_misses": 2}
+            assert calls == [0, 0, 0.3, 0.3]
+    finally:
+        LLMClient._call_piapi = saved_call
+        if saved_env is None:
+            os.environ.pop("LLM_FALLBACK_ORDER", None)
+        else:
+            os.environ["LLM_FALLBACK_ORDER"] = saved_env
+
+
+if __name__ == "__main__":
+    test_key_is_stable_and_sensitive()
+    test_file_backend_roundtrip_and_ttl()
+    test_file_backend_ignores_corrupt_entry()
+    test_memory_backend_lru_and_ttl()
+    test_client_hits_cache_only_for_deterministic_calls()
+    print("ok")
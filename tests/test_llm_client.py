@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Retry e circuit breaker do LLMClient.
+
+- erros de conexão dos SDKs (groq/openai) são repetidos pelo _with_retry.
+  Os SDKs não precisam estar instalados: um módulo falso com as mesmas
+  classes entra em sys.modules durante o teste.
+- o breaker é por provider e compartilhado por todas as instâncias.
+"""
+
+import os
+import sys
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from providers import llm_client  # noqa: E402
+
+
+def _fake_sdk(name):
+    mod = types.ModuleType(name)
+
+    class APIConnectionError(Exception):
+        pass
+
+    class APITimeoutError(APIConnectionError):
+        pass
+
+    class BadRequestError(Exception):
+        status_code = 400
+
+    mod.APIConnectionError = APIConnectionError
+    mod.APITimeoutError = APITimeoutError
+    mod.BadRequestError = BadRequestError
+    return mod
+
+
+def _flaky(exc, fails):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= fails:
+            raise exc
+        return "ok"
+    return fn, calls
+
+
+def _with_sdk(name, check):
+    saved = sys.modules.get(name)
+    sys.modules[name] = mod = _fake_sdk(name)
+    try:
+        check(mod)
+    finally:
+        if saved is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = saved
+
+
+def test_sdk_connection_error_is_retried():
+    def check(mod):
+        for exc in (mod.APIConnectionError("reset"), mod.APITimeoutError("timeout")):
+            fn, calls = _flaky(exc, fails=2)
+            assert llm_client._with_retry(fn, attempts=3, base=0) == "ok"
+            assert len(calls) == 3
+    _with_sdk("openai", check)
+    _with_sdk("groq", check)
+
+
+def test_sdk_connection_error_gives_up_after_attempts():
+    def check(mod):
+        fn, calls = _flaky(mod.APIConnectionError("reset"), fails=5)
+        try:
+            llm_client._with_retry(fn, attempts=3, base=0)
+        except mod.APIConnectionError:
+            pass
+        else:
+            raise AssertionError("esperava APIConnectionError")
+        assert len(calls) == 3
+    _with_sdk("openai", check)
+
+
+def test_sdk_bad_request_is_not_retried():
+    def check(mod):
+        fn, calls = _flaky(mod.BadRequestError("bad"), fails=1)
+        try:
+            llm_client._with_retry(fn, attempts=3, base=0)
+        except mod.BadRequestError:
+            pass
+        else:
+            raise AssertionError("esperava BadRequestError")
+        assert len(calls) == 1
+    _with_sdk("openai", check)
+
+
+def test_unknown_error_is_not_retried():
+    fn, calls = _flaky(ValueError("x"), fails=1)
+    try:
+        llm_client._with_retry(fn, attempts=3, base=0)
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+
+def _with_breakers(check):
+    saved = dict(llm_client._BREAKERS)
+    llm_client._BREAKERS.clear()
+    try:
+        check()
+    finally:
+        llm_client._BREAKERS.clear()
+        llm_client._BREAKERS.update(saved)
+
+
+def test_breaker_is_shared_across_instances():
+    def check():
+        # cada relatório cria o seu LLMClient: as falhas somam mesmo assim
+        for _ in range(llm_client.BREAKER_THRESHOLD - 1):
+            llm_client.LLMClient()._record_failure("groq")
+        assert not llm_client.LLMClient()._breaker_open("groq")
+        llm_client.LLMClient()._record_failure("groq")
+        assert llm_client.LLMClient()._breaker_open("groq")
+        assert not llm_client.LLMClient()._breaker_open("openai")
+    _with_breakers(check)
+
+
+def test_breaker_success_resets_and_cooldown_expires():
+    def check():
+        llm = llm_client.LLMClient()
+        for _ in range(llm_client.BREAKER_THRESHOLD - 1):
+            llm._record_failure("groq")
+        llm._record_success("groq")
+        llm._record_failure("groq")
+        assert not llm._breaker_open("groq")  # contagem recomeçou
+
+        for _ in range(llm_client.BREAKER_THRESHOLD):
+            llm._record_failure("openai")
+        assert llm._breaker_open("openai")
+        llm_client._BREAKERS["openai"]["open_until"] = time.time() - 1
+        assert not llm._breaker_open("openai")
+    _with_breakers(check)
+
+
+def test_breaker_open_provider_is_skipped():
+    def check():
+        saved_env = os.environ.get("LLM_FALLBACK_ORDER")
+        saved = llm_client.LLMClient._call_piapi, llm_client.LLMClient._call_deepseek
+        calls = []
+
+        def down(self, *a):
+            calls.append("piapi")
+            raise RuntimeError("down")
+
+        def up(self, *a):
+            calls.append("deepseek")
+            return "ok"
+
+        os.environ["LLM_FALLBACK_ORDER"] = "piapi,deepseek"
+        llm_client.LLMClient._call_piapi, llm_client.LLMClient._call_deepseek = down, up
+        try:
+            for _ in range(llm_client.BREAKER_THRESHOLD):
+                assert llm_client.LLMClient(provider="piapi").generate("S", "U") == "ok"
+            assert calls.count("piapi") == llm_client.BREAKER_THRESHOLD
+            calls.clear()
+            llm = llm_client.LLMClient(provider="piapi")
+            assert llm.generate("S", "U") == "ok"
+            assert calls == ["deepseek"] and llm.active_provider == "deepseek"
+        finally:
+            llm_client.LLMClient._call_piapi, llm_client.LLMClient._call_deepseek = saved
+            if saved_env is None:
+                os.environ.pop("LLM_FALLBACK_ORDER", None)
+            else:
+                os.environ["LLM_FALLBACK_ORDER"] = saved_env
+    _with_breakers(check)
+
+
+def test_breaker_counts_concurrent_failures():
+    def check():
+        llm = llm_client.LLMClient()
+        n_threads, n_each = 8, 500
+
+        def work():
+            for _ in range(n_each):
+                llm._record_failure("groq")
+
+        threads = [threading.Thread(target=work) for _ in range(n_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert llm_client._BREAKERS["groq"]["fails"] == n_threads * n_each
+    _with_breakers(check)
+
+
+if __name__ == "__main__":
+    test_sdk_connection_error_is_retried()
+    test_sdk_connection_error_gives_up_after_attempts()
+    test_sdk_bad_request_is_not_retried()
+    test_unknown_error_is_not_retried()
+    test_breaker_is_shared_across_instances()
+    test_breaker_success_resets_and_cooldown_expires()
+    test_breaker_open_provider_is_skipped()
+    test_breaker_counts_concurrent_failures()
+    print("ok")
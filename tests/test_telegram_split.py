@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Quebra de mensagens longas do Telegram (scripts.tools._split_for_telegram /
+telegram_parts): partes dentro do limite, cortes em parágrafo/linha/espaço,
+nenhuma entidade HTML cortada ao meio e numeração "(parte i/n)".
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.tools import TELEGRAM_MAX_LEN, _split_for_telegram, telegram_parts  # noqa: E402
+
+TELEGRAM_HARD_LIMIT = 4096  # limite da API do Telegram
+
+
+def test_short_text_is_one_part():
+    text = "<b>Título</b>\n\nCorpo curto.\n\n<i>rodapé</i>"
+    assert _split_for_telegram(text) == [text]
+    assert telegram_parts(text) == [text]
+
+
+def test_splits_on_paragraphs():
+    paras = [f"parágrafo {i} " + "x" * 30 for i in range(10)]
+    text = "\n\n".join(paras)
+    parts = _split_for_telegram(text, max_len=100)
+    assert len(parts) > 1
+    assert all(len(p) <= 100 for p in parts)
+    # só cortes entre parágrafos: juntando de volta, o texto é o mesmo
+    assert "\n\n".join(parts) == text
+
+
+def test_long_paragraph_falls_back_to_lines_and_words():
+    lines = [" ".join(f"w{i}_{j}" for j in range(8)) for i in range(12)]
+    text = "<b>Título</b>\n\n" + "\n".join(lines) + "\n\n<i>rodapé</i>"
+    parts = _split_for_telegram(text, max_len=60)
+    assert all(len(p) <= 60 for p in parts)
+    assert parts[0] == "<b>Título</b>"
+    assert parts[-1] == "<i>rodapé</i>"
+    # nenhuma palavra é cortada
+    words = {w for p in parts for w in p.split()}
+    assert words == set(text.split())
+
+
+def test_hard_split_keeps_html_entities():
+    text = ("ab&amp;" * 40).strip()
+    parts = _split_for_telegram(text, max_len=25)
+    assert all(len(p) <= 25 for p in parts)
+    assert "".join(parts) == text
+    for p in parts:
+        # toda entidade aberta na parte fecha na mesma parte
+        assert p.count("&") == p.count(";")
+
+
+def test_telegram_parts_numbering():
+    text = "\n\n".join("y" * 1500 for _ in range(6))
+    parts = telegram_parts(text)
+    n = len(parts)
+    assert n > 1
+    for i, p in enumerate(parts, 1):
+        assert p.startswith(f"(parte {i}/{n})\n")
+        assert len(p) <= TELEGRAM_HARD_LIMIT
+        assert len(p.split("\n", 1)[1]) <= TELEGRAM_MAX_LEN
+
+
+if __name__ == "__main__":
+    test_short_text_is_one_part()
+    test_splits_on_paragraphs()
+    test_long_paragraph_falls_back_to_lines_and_words()
+    test_hard_split_keeps_html_entities()
+    test_telegram_parts_numbering()
+    print("ok")